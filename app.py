@@ -1,17 +1,23 @@
 import dash
-import dash_table
 import dash_core_components as dcc
 import dash_html_components as html
-import pandas as pd
 import dash_bootstrap_components as dbc
-from dash.dependencies import Output, Input
-import ruptures as rpt
-import plotly.express as px
+from dash.dependencies import MATCH, ClientsideFunction, Output, Input, State
 import plotly.graph_objects as go
 import datetime
+import os
 from datetime import  date
+from functools import lru_cache
 import uuid
 import random
+import threading
+import time
+import callback_cache
+import compression
+import exports
+import rankings
+import series
+import timing
 
 FA = "https://use.fontawesome.com/releases/v5.12.1/css/all.css"
 external_stylesheets = [
@@ -26,110 +32,304 @@ external_stylesheets = [
     },
 
 ]
-# import data 
-covid_data = pd.read_csv('covid_preds.csv')
-subway_data = pd.read_csv('subway_preds.csv')
-
-# round figures
-covid_data["Abs 7 day Difference"] = covid_data["Abs 7 day Difference"].round(2)
-subway_data["Abs 7 day Difference"] = subway_data["Abs 7 day Difference"].round(2)
-covid_data["Abs 14 day Difference"] = covid_data["Abs 14 day Difference"].round(2)
-subway_data["Abs 14 day Difference"] = subway_data["Abs 14 day Difference"].round(2)
-
-# Convert dates to datetime format
-covid_data["Date"] = pd.to_datetime(covid_data["Date"])
-subway_data["Date"] = pd.to_datetime((subway_data["Date"]))
-
-# Converting String dates to datetime format
-jhu_df = pd.read_csv('jhu_events.csv')
-ds = jhu_df["Date"]
-nds = []
-for d in ds:
-    d = d.replace(',', '')
-    #d = datetime.datetime.strptime(d, '%b %d %Y').strftime('%Y-%m-%d')
-    nds.append(d)
-jhu_df["Date"] = nds
-jhu_df = jhu_df[["Date", "Event Descriptions"]]
-jhu_df["Date"] = pd.to_datetime(jhu_df["Date"])
-jhu_df = jhu_df.loc[jhu_df["Date"] < "2021-03-01"]
-#print(nds)
-#print(jhu_df.loc[(jhu_df["Date"] =="2020-09-03")].sort_values(by="Date"))
-
-# condense all events on the same day to 1 cell
-event_data = jhu_df.groupby('Date')["Event Descriptions"].apply('----> \n'.join).reset_index()
-event_data.to_csv("all_events.csv", index= False)
-
-covid_data = covid_data.merge(event_data, left_on="Date", right_on="Date", how="left")
-covid_data["Event Descriptions"].fillna(method="ffill", inplace=True)
-
-subway_data = subway_data.merge(event_data, left_on="Date", right_on="Date", how="left")
-subway_data["Event Descriptions"].fillna(method="ffill", inplace=True)
-
-
-
-ev_covid_fig = go.Figure(data=go.Scatter(x=covid_data["Date"], y=covid_data["MA Cases"], mode="lines",
-                                         name="Moving Average of COVID-19 Cases"))
-ev_covid_fig.add_trace(go.Scatter(x=covid_data["Date"], y=covid_data["14 days Ahead Forecasted Values"], mode="lines",
-                                  name="LSTM 7 Prediction"))
-
-ev_covid_fig.update_layout(
-    xaxis_tickformat='%B <br>%Y',
-legend = dict(
-    yanchor="top",
-    y=0.99,
-    xanchor="right",
-    x=0.69
-)
-)
-ev_covid_fig.update_layout(
-    {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', })
+# draw the Dynp change points in the browser from one preloaded payload instead
+# of asking the server for a new figure on every dropdown change
+CLIENTSIDE_CHANGEPOINTS = os.environ.get("CLIENTSIDE_CHANGEPOINTS", "1") != "0"
+
+
+# Everything below that needs pandas, numpy or the change point stack is loaded
+# on first use, so a fresh worker can serve the home page without it. Under
+# gunicorn --preload the master warms all of it before forking (gunicorn.conf.py).
+@lru_cache(maxsize=None)
+def load_data():
+    from data import load_frames
+
+    # import data (from the columnar snapshot when there is one, see snapshot.py)
+    return load_frames(store=event_store()), changepoint_index()
+
+
+@lru_cache(maxsize=None)
+def event_store():
+    from events import EventStore
+
+    # the events read so far, persisted per date by the store's writer (events.py)
+    return EventStore(read_only=True)
+
+
+# same file as data.SOURCES["events"], without importing pandas
+EVENTS_SOURCE = os.path.join(os.environ.get("DATA_DIR") or os.path.dirname(os.path.abspath(__file__)),
+                             "jhu_events.csv")
+events_polled = {"at": None, "version": None}
+events_lock = threading.Lock()
+
+
+def events_file_version():
+    # size and modification time of the events CSV, nothing is read
+    stat = os.stat(EVENTS_SOURCE)
+    return "{}.{}".format(stat.st_size, stat.st_mtime_ns)
+
+
+def events_version():
+    """Pick up events added to, edited in or removed from the events CSV, at most
+    every EVENTS_POLL_SECONDS, and drop everything built from the old ones.
+    Returns ``events_file_version`` as of the last poll."""
+    from data import refresh_events
+    from events import POLL_SECONDS
+
+    frames, cp_index = load_data()
+    with events_lock:
+        now = time.monotonic()
+        if events_polled["at"] is None or now - events_polled["at"] >= POLL_SECONDS:
+            events_polled["at"] = now
+            events_polled["version"] = events_file_version()
+            if refresh_events(frames, event_store()) is not None:
+                for cached in (series_impacts, load_rankings, top_impacts_patch, export_files):
+                    cached.cache_clear()
+        return events_polled["version"]
+
+
+def current_data():
+    events_version()
+    return load_data()
+
+
+def current_rankings():
+    events_version()
+    return load_rankings()
+
+
+@lru_cache(maxsize=None)
+def changepoint_index():
+    from changepoint_index import ChangePointIndex
+
+    # breakpoints for every number of change points, fitted once per series
+    return ChangePointIndex()
+
+
+@lru_cache(maxsize=None)
+def artifact_store():
+    from precompute import ArtifactStore
+
+    # results of the offline batch (python precompute.py) for the other detectors
+    return ArtifactStore()
+
+
+# Every series is described once (series.py); the events page, the rankings and
+# the exports cover the ones with events, /series/<name> pages exist for all.
+SERIES = series.SeriesRegistry()
+SERIES.register("covid", "COVID-19 Cases in NYC", "MA Cases", lambda: load_data()[0]["covid"], events=True)
+SERIES.register("subway", "Subway Entries in NYC", "MA Entries", lambda: load_data()[0]["subway"], events=True)
+if series.SERIES_DIR:
+    SERIES.discover(series.SERIES_DIR)
+
+
+def warm_changepoints():
+    frames, cp_index = load_data()
+    cp_index.warm(*(frames[s.name][s.value].values for s in SERIES.event_series()))
+    load_rankings()
+    for s in SERIES.event_series():
+        top_impacts_patch(s.name)
+
+
+@lru_cache(maxsize=None)
+def series_impacts(series, value_col=None):
+    """Impacts at the change points of ``series``, indexed by date (impacts.ImpactIndex)."""
+    from impacts import ImpactIndex, event_impacts
+
+    frames, cp_index = load_data()
+    with timing.phase("fit"):
+        cps = cp_index.breakpoints(frames[series][value_col or SERIES[series].value].values, 160)
+    with timing.phase("query"):
+        return ImpactIndex(event_impacts(frames[series], cps))
+
 
+@lru_cache(maxsize=None)
+def load_rankings():
+    """Top-K impact tables of the event series, sorted once (rankings.py)."""
+    from rankings import Rankings
 
-ev_subway_fig = go.Figure(data=go.Scatter(x=subway_data["Date"], y=subway_data["MA Entries"], mode="lines",
-                                          name="Moving Average of Subway Entries"))
-ev_subway_fig.add_trace(go.Scatter(x=subway_data["Date"], y=subway_data["14 days Ahead Forecasted Values"], mode="lines",
-                                   name="LSTM 7 Prediction"))
-ev_subway_fig.update_layout(
-    xaxis_tickformat='%B <br>%Y',
-    legend=dict(
+    return Rankings({s.name: series_impacts(s.name).impacts for s in SERIES.event_series()})
+
+
+@lru_cache(maxsize=None)
+def top_impacts_patch(series):
+    # bars at the top 10 impacts by the 7 day difference, sized by the 14 day one
+    top = load_rankings().top(series, 7, 10)
+    return append_traces(go.Bar(x=top["Date"], y=top["Abs 14 day Difference"], name="Top 10 Event Impacts"))
+
+
+def warm_pages():
+    for page in (index_page, events_page, change_points_page, real_time_data, teams):
+        page()
+
+
+def changepoint_base_figure(data, value_col):
+    import plotly.express as px
+    from figures import CHANGEPOINTS_AXIS
+
+    # the forecast line where the series has one
+    figure = px.line(
+        data, x="Date", y=[value_col] + [c for c in [series.FORECAST_COLUMN] if c in data.columns],
+    )
+    figure.update_layout({'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)',})
+    figure.update_layout(yaxis2=CHANGEPOINTS_AXIS)
+    return figure
+
+
+@lru_cache(maxsize=series.CACHE_SIZE)
+def changepoint_figure(name):
+    # the full resolution lines, as a dict; pages and zooms send resampled copies
+    data, value_col = SERIES.load(name)
+    return changepoint_base_figure(data, value_col).to_plotly_json()
+
+
+def changepoint_payload(data, value_col):
+    cp_index = changepoint_index()
+    return cp_index.client_payload(data[value_col].values, data["Date"].dt.strftime("%Y-%m-%d").tolist())
+
+
+@lru_cache(maxsize=None)
+def events_covid_figure():
+    covid_data = load_data()[0]["covid"]
+    ev_covid_fig = go.Figure(data=go.Scatter(x=covid_data["Date"], y=covid_data["MA Cases"], mode="lines",
+                                             name="Moving Average of COVID-19 Cases"))
+    ev_covid_fig.add_trace(go.Scatter(x=covid_data["Date"], y=covid_data["14 days Ahead Forecasted Values"], mode="lines",
+                                      name="LSTM 7 Prediction"))
+
+    ev_covid_fig.update_layout(
+        xaxis_tickformat='%B <br>%Y',
+    legend = dict(
         yanchor="top",
         y=0.99,
         xanchor="right",
-        x=0.99
-    ))
+        x=0.69
+    )
+    )
+    ev_covid_fig.update_layout(
+        {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', })
+    return ev_covid_fig
 
-ev_subway_fig.update_layout(
-    {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', })
 
+@lru_cache(maxsize=None)
+def events_subway_figure():
+    subway_data = load_data()[0]["subway"]
+    ev_subway_fig = go.Figure(data=go.Scatter(x=subway_data["Date"], y=subway_data["MA Entries"], mode="lines",
+                                              name="Moving Average of Subway Entries"))
+    ev_subway_fig.add_trace(go.Scatter(x=subway_data["Date"], y=subway_data["14 days Ahead Forecasted Values"], mode="lines",
+                                       name="LSTM 7 Prediction"))
+    ev_subway_fig.update_layout(
+        xaxis_tickformat='%B <br>%Y',
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="right",
+            x=0.99
+        ))
 
-rt_covid_df = pd.read_csv('rt_covid.csv')
+    ev_subway_fig.update_layout(
+        {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', })
+    return ev_subway_fig
 
-rt_subway_df = pd.read_csv('rt_subway.csv')
 
-rt_covid_fig = go.Figure(data=go.Scatter(x=rt_covid_df["date_of_interest"], y=rt_covid_df["MA Cases"], mode="lines",
-                                         name="Moving Average of COVID-19 Cases"))
-rt_covid_fig.add_trace((go.Scatter(x= rt_covid_df["date_of_interest"], y= rt_covid_df["CASE_COUNT"], mode="lines", name="COVID-19 Cases in New York City")))
-#rt_covid_fig.update_xaxes(showgrid=False)
-#rt_covid_fig.update_yaxes(showgrid=False)
-rt_covid_fig.update_layout(template= "plotly_dark")
+@lru_cache(maxsize=None)
+def daily_streams():
+    """The Daily Data series, extended as rows arrive (daily.py)."""
+    from daily import DailyStreams
 
-rt_covid_fig.update_layout(
-    {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', })
+    return DailyStreams(load_data()[0])
 
-rt_subway_fig = go.Figure(data=go.Scatter(x=rt_subway_df["Date"], y=rt_subway_df["MA Entries"], mode="lines",
-                                         name="Moving Average of COVID-19 Cases"),)
-#rt_subway_fig.update_xaxes(showgrid=False)
-#rt_subway_fig.update_yaxes(showgrid=False)
-rt_subway_fig.update_layout(template= "plotly_dark")
 
-rt_subway_fig.add_trace(go.Scatter(x=rt_subway_df["Date"], y=rt_subway_df["Subways: Total Estimated Ridership"], mode="lines",
-                                   name="Subway Usage Numbers in New York City"))
-rt_subway_fig.update_layout(
-    {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', }
-)
+@lru_cache(maxsize=None)
+def online_changepoints():
+    """Change points flagged as the daily series grow, checkpointed (online.py)."""
+    from online import OnlineChangePoints
+
+    return OnlineChangePoints(daily_streams())
+
+
+def daily_version():
+    # poll for new days and run them through the online detectors
+    version = daily_streams().poll()
+    online_changepoints().sync()
+    return version
+
+
+def daily_extension(name, start):
+    """The rows a page has not seen from ``start`` on, and the change points they
+    flagged (trace 2), as extendData."""
+    from figures import changepoint_segments
+
+    detector = online_changepoints()[name]
+    update, indices = daily_streams()[name].extend_data(start, detector.rows)
+    flagged = detector.flagged(start)
+    if flagged:
+        x, y = changepoint_segments(flagged)
+        update["x"].append(x.tolist())
+        update["y"].append(y.tolist())
+        indices.append(2)
+    return [update, indices]
+
+
+daily_figures = {}
+daily_figures_lock = threading.Lock()
+
+
+def daily_figure(name, build):
+    # built once, then extended as a dict by the rows added since (figures.extend_traces)
+    from figures import add_changepoints, extend_traces
+
+    stream, detector = daily_streams()[name], online_changepoints()[name]
+    with daily_figures_lock:
+        rows, figure = daily_figures.get(name, (0, None))
+        if figure is None:
+            figure = build(stream.frame.iloc[:detector.rows])
+            # the online change points are trace 2, after the moving average and the values
+            figure = add_changepoints(figure, detector.flagged()).to_plotly_json()
+        elif rows < detector.rows:
+            figure = extend_traces(figure, daily_extension(name, rows))
+        daily_figures[name] = (detector.rows, figure)
+    return figure
+
+
+def rt_covid_figure():
+    return daily_figure("rt_covid", build_rt_covid_figure)
+
+
+def rt_subway_figure():
+    return daily_figure("rt_subway", build_rt_subway_figure)
 
 
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True)
+def build_rt_covid_figure(rt_covid_df):
+    rt_covid_fig = go.Figure(data=go.Scatter(x=rt_covid_df["date_of_interest"], y=rt_covid_df["MA Cases"], mode="lines",
+                                             name="Moving Average of COVID-19 Cases"))
+    rt_covid_fig.add_trace((go.Scatter(x= rt_covid_df["date_of_interest"], y= rt_covid_df["CASE_COUNT"], mode="lines", name="COVID-19 Cases in New York City")))
+    #rt_covid_fig.update_xaxes(showgrid=False)
+    #rt_covid_fig.update_yaxes(showgrid=False)
+    rt_covid_fig.update_layout(template= "plotly_dark")
+
+    rt_covid_fig.update_layout(
+        {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', })
+    return rt_covid_fig
+
+
+def build_rt_subway_figure(rt_subway_df):
+    rt_subway_fig = go.Figure(data=go.Scatter(x=rt_subway_df["Date"], y=rt_subway_df["MA Entries"], mode="lines",
+                                             name="Moving Average of COVID-19 Cases"),)
+    #rt_subway_fig.update_xaxes(showgrid=False)
+    #rt_subway_fig.update_yaxes(showgrid=False)
+    rt_subway_fig.update_layout(template= "plotly_dark")
+
+    rt_subway_fig.add_trace(go.Scatter(x=rt_subway_df["Date"], y=rt_subway_df["Subways: Total Estimated Ridership"], mode="lines",
+                                       name="Subway Usage Numbers in New York City"))
+    rt_subway_fig.update_layout(
+        {'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)', }
+    )
+    return rt_subway_fig
+
+
+# compression.py takes over from Dash's gzip-only Flask-Compress hook
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True,
+                compress=False)
 app.title = "COVID-19 and Subway Usage Event Impact"
 #app.scripts.config.serve_locally = True
 #app.scripts.append_script({
@@ -166,6 +366,15 @@ app.index_string = """<!DOCTYPE html>
     </body>
 </html>"""
 server = app.server
+# brotli/gzip responses, precompressed once for assets and cacheable payloads
+compressed = compression.register(app)
+# fit/query/figure/serialize timings of every callback as Server-Timing headers,
+# and their histograms at /metrics (timing.py); before the first app.callback
+callback_metrics = timing.register(app)
+# top 10 and event tables as CSV downloads, see exports.py
+export_files = exports.register(server, exports.export_specs(SERIES), current_data)
+# top-K impact tables as versioned JSON, see rankings.py
+rankings.register(server, current_rankings)
 app.layout = html.Div(
     children=[
         html.Div(
@@ -196,6 +405,7 @@ nav_item = dbc.Nav(
         dbc.NavItem(dbc.NavLink("Event Impact", href="/events"), ),
         dbc.NavItem(dbc.NavLink("Change Point Detection", href="/changepoints"), ),
         dbc.NavItem(dbc.NavLink("Daily Data", href="/daily-data"), ),
+        dbc.NavItem(dbc.NavLink("All Series", href="/series"), ),
         dbc.NavItem(dbc.NavLink("Team", href="/team"), )
     ],
     horizontal= "end"
@@ -400,134 +610,164 @@ real_time_title = html.Div(
             ],
             className="non-main-page-header",
         )
-event_graphs = html.Div(
-            children=[
-                    html.Div("Event Impact Tool", className="subheading2"),
-                    html.Div(
-                        children="Add an Event",
-                        className="subheading2"
-                    ),
-                    dcc.DatePickerSingle(
-                        id="calendar-date-picker",
-                        min_date_allowed=subway_data.Date.min().date(),
-                        max_date_allowed=subway_data.Date.max().date(),
-                        initial_visible_month=subway_data.Date.min().date(),
-                        date=date(2020, 3, 3),
-                        className="calendar"
-                    ),
-                    html.Div(className="container2",
-                             children=[
-                                 dbc.Button("Calculate Top 10 Most Impactful Events", id="calculate-btn", n_clicks=0, className="btn"),
-                                 dbc.Button("Clear", id="clear-btn", n_clicks=0, className="btn")],),
-
-                    dbc.Spinner(children=[html.Div("COVID-19 Cases in NYC", className="subheading2"),
-                                          dcc.Graph(
-                        id="events-covid-chart",
-                        figure= ev_covid_fig,
-                        config={"displayModeBar": False, "edits": {"legendPosition":False}},
-
-                    ),], color="dark", fullscreen=False),
-
-
-
-                    dbc.Spinner(children=[
-                    html.Div("LSTM 7 Table", className= "table-name"),
-                    dash_table.DataTable(
-                        style_cell={
-                            'whiteSpace': 'normal',
-                            'height': 'auto',
-                            'fontSize': 14, 'font-family': 'sans-serif'
-                        },
-                        style_cell_conditional=[
-                            {
-                                'if': {'column_id': 'Event Descriptions'},
-                                'textAlign': 'left'
-                            }
-                        ],
-                        id="covid-event-table",
-                        columns=[],
-                        data=[]
-                    ),html.Div("LSTM 14 Table", className= "table-name"),
-                                          dash_table.DataTable(
-                        style_cell={
-                            'whiteSpace': 'normal',
-                            'height': 'auto',
-                            'fontSize': 14, 'font-family': 'sans-serif'
-                        },
-                        style_cell_conditional=[
-                            {
-                                'if': {'column_id': 'Event Descriptions'},
-                                'textAlign': 'left'
-                            }
-                        ],
-                        id="covid-event-14table",
-                        columns=[],
-                        data=[]
-                    ),],color="info", fullscreen=False),
-
-
-                    html.Div("Subway Entries in NYC", className="subheading2"),
-                    dbc.Spinner(children=[dcc.Graph(
-                        id="events-subway-chart",
-                        figure= ev_subway_fig,
-                        config={"displayModeBar": False}
-                    ),], color="dark", fullscreen= False, ),
-                    dbc.Spinner(children=[
-                    html.Div("LSTM 7 Table", className="table-name"),
-                    dash_table.DataTable(
-                        style_cell={
-                            'whiteSpace': 'normal',
-                            'height': 'auto',
-                            'fontSize': 14, 'font-family': 'sans-serif'
-                        },
-                        style_cell_conditional=[
-                            {
-                                'if': {'column_id': 'Event Descriptions'},
-                                'textAlign': 'left'
-                            }
-                        ],
-                        id="subway-event-table",
-                        columns=[],
-                        data=[]
-                    ),
-                    html.Div("LSTM 14 Table", className="table-name"),
-                    dash_table.DataTable(
-                        style_cell={
-                            'whiteSpace': 'normal',
-                            'height': 'auto',
-                            'fontSize': 14, 'font-family': 'sans-serif'
-                        },
-                        style_cell_conditional=[
-                            {
-                                'if': {'column_id': 'Event Descriptions'},
-                                'textAlign': 'left'
-                            }
-                        ],
-                        id="subway-event-14table",
-                        columns=[],
-                        data=[]
-                    ),], color="info", fullscreen=False)
-                    #table,
-            ],
-            className="graph-card",
-        )
-rt_graphs = html.Div(
-    children=[
-        html.Div("COVID-19 Cases in NYC", className="subheading2"),
-        dcc.Graph(
-            id="rt-covid-chart",
-            figure=rt_covid_fig,
-            config={"displayModeBar": False}
-        ),
-        html.Div("Subway Usage in NYC", className="subheading2"),
-        dbc.Spinner(children =[dcc.Graph(
-            id="rt-subway-chart",
-            figure=rt_subway_fig,
-            config={"displayModeBar": False}
-        )], size="lg", color= "dark", type= "border", fullscreen= True)
-    ]
+def event_graphs():
+    import dash_table
+    from resample import resample_figure
+
+    subway_data = load_data()[0]["subway"]
+    return html.Div(
+                children=[
+                        html.Div("Event Impact Tool", className="subheading2"),
+                        html.Div(
+                            children="Add an Event",
+                            className="subheading2"
+                        ),
+                        dcc.DatePickerSingle(
+                            id="calendar-date-picker",
+                            min_date_allowed=subway_data.Date.min().date(),
+                            max_date_allowed=subway_data.Date.max().date(),
+                            initial_visible_month=subway_data.Date.min().date(),
+                            date=date(2020, 3, 3),
+                            className="calendar"
+                        ),
+                        html.Div(className="container2",
+                                 children=[
+                                     dbc.Button("Calculate Top 10 Most Impactful Events", id="calculate-btn", n_clicks=0, className="btn"),
+                                     dbc.Button("Clear", id="clear-btn", n_clicks=0, className="btn")],),
 
-)
+                        dbc.Spinner(children=[html.Div("COVID-19 Cases in NYC", className="subheading2"),
+                                              dcc.Graph(
+                            id="events-covid-chart",
+                            figure= resample_figure(events_covid_figure()),
+                            config={"displayModeBar": False, "edits": {"legendPosition":False}},
+
+                        ),
+                                              dcc.Store(id="events-covid-patch"),
+                                              dcc.Store(id="events-covid-resample"),], color="dark", fullscreen=False),
+
+
+
+                        dbc.Spinner(children=[
+                        html.Div("LSTM 7 Table", className= "table-name"),
+                        dash_table.DataTable(
+                            style_cell={
+                                'whiteSpace': 'normal',
+                                'height': 'auto',
+                                'fontSize': 14, 'font-family': 'sans-serif'
+                            },
+                            style_cell_conditional=[
+                                {
+                                    'if': {'column_id': 'Event Descriptions'},
+                                    'textAlign': 'left'
+                                }
+                            ],
+                            id="covid-event-table",
+                            columns=[],
+                            data=[]
+                        ),html.Div("LSTM 14 Table", className= "table-name"),
+                                              dash_table.DataTable(
+                            style_cell={
+                                'whiteSpace': 'normal',
+                                'height': 'auto',
+                                'fontSize': 14, 'font-family': 'sans-serif'
+                            },
+                            style_cell_conditional=[
+                                {
+                                    'if': {'column_id': 'Event Descriptions'},
+                                    'textAlign': 'left'
+                                }
+                            ],
+                            id="covid-event-14table",
+                            columns=[],
+                            data=[]
+                        ),],color="info", fullscreen=False),
+
+
+                        html.Div("Subway Entries in NYC", className="subheading2"),
+                        dbc.Spinner(children=[dcc.Graph(
+                            id="events-subway-chart",
+                            figure= resample_figure(events_subway_figure()),
+                            config={"displayModeBar": False}
+                        ),
+                                              dcc.Store(id="events-subway-patch"),
+                                              dcc.Store(id="events-subway-resample"),], color="dark", fullscreen= False, ),
+                        dbc.Spinner(children=[
+                        html.Div("LSTM 7 Table", className="table-name"),
+                        dash_table.DataTable(
+                            style_cell={
+                                'whiteSpace': 'normal',
+                                'height': 'auto',
+                                'fontSize': 14, 'font-family': 'sans-serif'
+                            },
+                            style_cell_conditional=[
+                                {
+                                    'if': {'column_id': 'Event Descriptions'},
+                                    'textAlign': 'left'
+                                }
+                            ],
+                            id="subway-event-table",
+                            columns=[],
+                            data=[]
+                        ),
+                        html.Div("LSTM 14 Table", className="table-name"),
+                        dash_table.DataTable(
+                            style_cell={
+                                'whiteSpace': 'normal',
+                                'height': 'auto',
+                                'fontSize': 14, 'font-family': 'sans-serif'
+                            },
+                            style_cell_conditional=[
+                                {
+                                    'if': {'column_id': 'Event Descriptions'},
+                                    'textAlign': 'left'
+                                }
+                            ],
+                            id="subway-event-14table",
+                            columns=[],
+                            data=[]
+                        ),], color="info", fullscreen=False),
+                        html.Div(className="descr2",
+                                 children=["Download: "] + [
+                                     html.A(label, href=exports.EXPORT_ROUTE.replace("<name>", name), download=name + ".csv",
+                                            style={"marginRight": "1em"})
+                                     for name, label in [("covidhead", "COVID-19 LSTM 7"), ("covid14head", "COVID-19 LSTM 14"),
+                                                         ("subwayhead", "Subway LSTM 7"), ("subway14head", "Subway LSTM 14"),
+                                                         ("all_events", "All events")]
+                                 ]),
+                        #table,
+                ],
+                className="graph-card",
+            )
+def rt_graphs():
+    from daily import DAILY_SERIES, REFRESH_SECONDS
+    from resample import resample_figure
+
+    rt_covid_fig, rt_subway_fig = resample_figure(rt_covid_figure()), resample_figure(rt_subway_figure())
+    # the rows those figures were built or extended to
+    rows = {name: daily_figures[name][0] for name in DAILY_SERIES}
+    return html.Div(
+        children=[
+            # new days reach an open page as extendData (extend_daily_data)
+            dcc.Interval(id="daily-data-interval", interval=REFRESH_SECONDS * 1000),
+            dcc.Store(id="daily-data-rows", data=rows),
+            dcc.Store(id="daily-data-extension"),
+            dcc.Store(id="rt-covid-resample"),
+            dcc.Store(id="rt-subway-resample"),
+            html.Div("COVID-19 Cases in NYC", className="subheading2"),
+            dcc.Graph(
+                id="rt-covid-chart",
+                figure=rt_covid_fig,
+                config={"displayModeBar": False}
+            ),
+            html.Div("Subway Usage in NYC", className="subheading2"),
+            dbc.Spinner(children =[dcc.Graph(
+                id="rt-subway-chart",
+                figure=rt_subway_fig,
+                config={"displayModeBar": False}
+            )], size="lg", color= "dark", type= "border", fullscreen= True)
+        ]
+
+    )
 #team = html.Div(
 #        children=[
 ##            html.H1("Team", className="subheading"),
@@ -562,254 +802,320 @@ html.Div(id='output-data-upload'),
     ]
 )
 
-index_page = html.Div(
-    children=[
-        navbar,
-        title,
-        info,
-    ]
-    ,
-)
-events_page = html.Div(
-    children=[
-        navbar,
-        event_title,
-        html.Div(
-            children=[
-                html.Div(
-                    children="How to use this tool",
-                    className="subheading"
-                ),
-                html.P("This is the tool that we created to help measure the impacts of events on both COVID-19 and Subway entries in New York City. Check for your event impacts by adding an event below.", className="descr2"),
+@lru_cache(maxsize=None)
+def index_page():
+    return html.Div(
+        children=[
+            navbar,
+            title,
+            info,
+        ]
+        ,
+    )
+@lru_cache(maxsize=None)
+def events_page():
+    return html.Div(
+        children=[
+            navbar,
+            event_title,
+            html.Div(
+                children=[
+                    html.Div(
+                        children="How to use this tool",
+                        className="subheading"
+                    ),
+                    html.P("This is the tool that we created to help measure the impacts of events on both COVID-19 and Subway entries in New York City. Check for your event impacts by adding an event below.", className="descr2"),
+                ],
+                className="card",
+            ),
+            #upload,
+            event_graphs()
+        ]
+    )
+def changepoint_ids(name):
+    # the change points page's own ids, "change-point-filter" and "covid-chart" for
+    # covid, "subway-change-point-filter" and "subway-chart" for subway
+    prefix = "" if name == "covid" else name + "-"
+    ids = {"filter": prefix + "change-point-filter", "method": prefix + "change-point-method",
+           "penalty": prefix + "change-point-penalty", "chart": name + "-chart", "changepoints": name + "-changepoints",
+           "request": name + "-chart-request", "detected": name + "-chart-detected", "resample": name + "-chart-resample"}
+    return ids.__getitem__
+
+
+def series_ids(name):
+    # pattern-matching ids, one set of callbacks serves every /series/<name> page
+    return lambda kind: {"type": "series-" + kind, "series": name}
+
+
+def changepoint_card(name, ids, clientside=False, detector=None):
+    """Chart and detector controls of one registered series; ``ids(kind)`` names
+    the components. ``clientside`` adds the stores assets/changepoints.js uses."""
+    from detectors import DEFAULT_DETECTOR, DEFAULT_PENALTY, detector_options, max_bkps
+    from resample import resample_figure
+
+    data, value_col = SERIES.load(name)
+    controls = [
+        html.Div(children="Number of change points", className="subheading2"),
+        dcc.Dropdown(
+            id=ids("filter"),
+            options=[
+                {"label": number, "value": number}
+                # as many as the series has room for, short discovered ones included
+                for number in range(1, min(160, max_bkps(len(data)) + 1))
             ],
-            className="card",
+            value=1,
+            clearable=False,
+            className="dropdown",
         ),
-        #upload,
-        event_graphs
-    ]
-)
-change_points_page = html.Div(
-    children=[
-        navbar,
-        cpd_title,
-        html.Div(
-            children=[ html.Div("How to use this tool", className="subheading"),
-                       html.Div("This tool was made to help our users visualize how change point detection works. We want our users to understand where change points are detected.", className="descr2"),
-                       html.Div("You may change the number of changepoints being detected with the drop down menu to get a better understanding of how and when change points were detected.", className="descr2")
-            ],
-            className="card",
+        html.Div(children="Detection method", className="subheading2"),
+        dcc.Dropdown(
+            id=ids("method"),
+            options=detector_options(),
+            value=detector or DEFAULT_DETECTOR,
+            clearable=False,
+            className="dropdown",
         ),
-
-        html.Div(
-            children=[
-                html.Div(
-                    children=[
-                        html.Div(
-                            children=[
-                                html.Div(children="COVID-19 Cases in NYC", className="subheading2"),
-                                html.Div(
-                                    dbc.Spinner(children=[html.Div(children="Number of change points", className="subheading2"),
-                        dcc.Dropdown(
-                            id="change-point-filter",
-                            options=[
-                                {"label": number, "value": number}
-                                for number in range(1, 160)
-                            ],
-                            value=1,
-                            clearable=False,
-                            className="dropdown",
-                        ),
-                        dcc.Graph(
-                                        id="covid-chart",
-                                        config={"displayModeBar": False},
-                                    ), ], color="dark", fullscreen=False),
-
-                                    className="graph-card",
-                                ),
-                            ],
-                        ),
-                    ]
-                ),
-            ],
-            className="card2",
+        html.Div(children="Penalty (PELT, or instead of the number of change points)", className="subheading2"),
+        dcc.Input(
+            id=ids("penalty"),
+            type="number",
+            min=0,
+            debounce=True,
+            placeholder=str(DEFAULT_PENALTY),
+            className="dropdown",
         ),
+        dcc.Graph(
+            id=ids("chart"),
+            figure=resample_figure(changepoint_figure(name)) if clientside else None,
+            config={"displayModeBar": False},
+        ),
+    ]
+    if clientside:
+        controls += [dcc.Store(id=ids("changepoints"), data=changepoint_payload(data, value_col)),
+                     dcc.Store(id=ids("request")),
+                     dcc.Store(id=ids("detected")),
+                     dcc.Store(id=ids("resample"))]
+    return html.Div(
+        children=[
+            html.Div(
+                children=[
+                    html.Div(
+                        children=[
+                            html.Div(children=SERIES[name].label, className="subheading2"),
+                            html.Div(
+                                dbc.Spinner(children=controls, color="dark", fullscreen=False),
+                                className="graph-card",
+                            ),
+                        ],
+                    ),
+                ]
+            ),
+        ],
+        className="card2",
+    )
 
 
-        html.Div(
-            children=[
-                html.Div(
-                    children=[
-
-                        html.Div(
-                            children=[
-                                html.Div(children="Subway Entries in NYC", className="subheading2"),
-                                html.Div(
-                                    dbc.Spinner(children=[html.Div(children="Number of Change Points", className="subheading2"),
-                        dcc.Dropdown(
-                            id="subway-change-point-filter",
-                            options=[
-                                {"label": number, "value": number}
-                                for number in range(1, 160)
-                            ],
-                            value=1,
-                            clearable=False,
-                            className="dropdown",
-                        ),
-                                    dcc.Graph(
-                                        id="subway-chart",
-                                        config={"displayModeBar": False},
-                                    )], type="dark", fullscreen=False),
+@lru_cache(maxsize=None)
+def change_points_page():
+    return html.Div(
+        children=[
+            navbar,
+            cpd_title,
+            html.Div(
+                children=[ html.Div("How to use this tool", className="subheading"),
+                           html.Div("This tool was made to help our users visualize how change point detection works. We want our users to understand where change points are detected.", className="descr2"),
+                           html.Div("You may change the number of changepoints being detected with the drop down menu to get a better understanding of how and when change points were detected.", className="descr2"),
+                           html.Div("Dynp finds the exact best change points but gets slow on long series. PELT and the other methods are much faster; PELT (and the others, when a penalty is entered) picks the number of change points itself, and a higher penalty gives fewer change points.", className="descr2")
+                ],
+                className="card",
+            ),
+        ] + [changepoint_card(s.name, changepoint_ids(s.name), CLIENTSIDE_CHANGEPOINTS) for s in SERIES.event_series()]
+    )
 
-                                    className="graph-card",
-                                ),
-                            ],
-                        ),
-                    ]
-                ),
-            ],
-            className="card2",
-        ),
 
+@lru_cache(maxsize=series.CACHE_SIZE)
+def series_page(name):
+    if name not in SERIES:
+        return series_index_page()
+    return html.Div(
+        children=[
+            navbar,
+            html.Div(
+                children=[html.H1(children=SERIES[name].label, className="non-main-page-title")],
+                className="non-main-page-header",
+            ),
+            # binary segmentation first: Dynp fits every K up front, which is
+            # too slow for a first look at one of many series
+            changepoint_card(name, series_ids(name), detector="binseg"),
+        ]
+    )
 
 
-    ]
-)
-real_time_data = html.Div(
-    children=[
-        navbar,
-        real_time_title,
-        html.Div(
-            children=[
-                html.Div(
-                    children="Add an Event",
-                    className="subheading"
-                ),
-                dcc.DatePickerSingle(
-                    id="calendar-date-picker-rt",
-                    min_date_allowed=subway_data.Date.min().date(),
-                    max_date_allowed=subway_data.Date.max().date(),
-                    initial_visible_month=subway_data.Date.min().date(),
-                    date=date(2020, 3, 3),
-                    className="calendar"
-                ),
-            ],
-            className="card",
-        ),
-        rt_graphs
-    ]
-)
+@lru_cache(maxsize=None)
+def series_index_page():
+    return html.Div(
+        children=[
+            navbar,
+            html.Div(
+                children=[html.H1(children="All Series", className="non-main-page-title")],
+                className="non-main-page-header",
+            ),
+            html.Div(
+                children=[html.Div(dcc.Link(s.label, href="/series/" + s.name), className="descr2") for s in SERIES],
+                className="card",
+            ),
+        ]
+    )
 
 
-teams = html.Div(children=[
-    navbar,
-    team_title,
-    html.Div(className="container2",
-             children=[html.Div(className="team-card",
-             children=[
-                 html.Div("Amit Hiremath", className="subheading"),
-                 html.P("Research Assistant at NYIT",className="content"),
-                 html.Img(src="https://media-exp1.licdn.com/dms/image/C5603AQGuQkOG3uCLZg/profile-displayphoto-shrink_200_200/0/1625175763328?e=1638403200&v=beta&t=Sf7srb1MB1fJb-TsVnxYzIsFZPgCqa6EHV5DSBLfXCY", alt= "avatar", className="circle-img"),
-                 html.Div(className="container2",
-                          children=[
-                              dcc.Link(
-                              html.Button(className="social-btn hvr-radial-in",
-                                  children=html.I(className="fab fa-linkedin-in"),
-                              ),href="https://www.linkedin.com/in/the-amit-hiremath/", target="_blank"),
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=[html.I(className="far fa-envelope", )]
-                                              ),
-                                  href="mailto:avmh200611@gmail.com",
-                                  target="_blank"
-                              ),
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=[html.I(className="fas fa-globe-americas"), ]
-                                              ),
-                                  href="https://amits-portfolio-site.herokuapp.com/introduction",
-                                  target="_blank"
-                              ),
-
-                          ])
-             ]),
-    html.Div(className="team-card",
-             children=[
-                 html.Div("Ziqian Dong", className="subheading"),
-                 html.P("Professor at NYIT", className="content"),
-                 html.Img(src="https://www.nyit.edu/files/profiles/headshot/Ziqian.Dong.jpg", alt= "avatar", className="circle-img"),
-                 html.Div(className="container2",
-                          children=[
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=html.I(className="fab fa-linkedin-in"),
-                                              ),
-                                href="https://www.linkedin.com/in/ziqian-cecilia-dong-abb4532/",
-                                target="_blank"
-                              ),
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=[html.I(className="far fa-envelope", **{'aria-hidden': 'true'},
-                                                               children=None), ]
-                                              ),
-                                  href="mailto:ziqian.dong@nyit.edu",
-                                  target="_blank"
-                              ),
-
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=[
-                                                  html.I(className="fas fa-globe-americas", **{'aria-hidden': 'true'},
-                                                         children=None), ]
-                                              ),
-                                  href="https://www.nyit.edu/bio/Ziqian.Dong",
-                                  target="_blank"
-                              ),
-
-                          ])
-             ]),
-    html.Div(className="team-card",
-             children=[
-                 html.Div("Roberto Cessa-Rojas", className="subheading"),
-                 html.P("Professor at NJIT", className="content"),
-                 html.Img(src="https://web.njit.edu/~rojasces/roberto_pic.jpg", alt= "avatar", className="circle-img"),
-                 html.Div(className="container2",
-                          children=[
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=html.I(className="fab fa-linkedin-in text-red"),
-                                              ),
-                                  href="https://www.linkedin.com/in/roberto-rojas-cessa-90168910/",
-                                  target="_blank"
-                              ),
+def real_time_data():
+    return daily_data_page(daily_version())
 
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=[html.I(className="far fa-envelope"), ]
-                                              ),
-                                  href="mailto:roberto.rojas-cessa@njit.edu",
-                                  target="_blank"
-                              ),
 
-                              dcc.Link(
-                                  html.Button(className="social-btn hvr-radial-in",
-                                              children=[html.I(className="fas fa-globe-americas"), ]
-                                              ),
-                                  href="https://web.njit.edu/~rojasces/",
-                                  target="_blank"
-                              ),
+@lru_cache(maxsize=1)
+def daily_data_page(version):
+    subway_data = load_data()[0]["subway"]
+    return html.Div(
+        children=[
+            navbar,
+            real_time_title,
+            html.Div(
+                children=[
+                    html.Div(
+                        children="Add an Event",
+                        className="subheading"
+                    ),
+                    dcc.DatePickerSingle(
+                        id="calendar-date-picker-rt",
+                        min_date_allowed=subway_data.Date.min().date(),
+                        max_date_allowed=subway_data.Date.max().date(),
+                        initial_visible_month=subway_data.Date.min().date(),
+                        date=date(2020, 3, 3),
+                        className="calendar"
+                    ),
+                ],
+                className="card",
+            ),
+            rt_graphs()
+        ]
+    )
 
-                          ])
-             ]),
 
-    ]),
-    ]
-)
+@lru_cache(maxsize=None)
+def teams():
+    return html.Div(children=[
+        navbar,
+        team_title,
+        html.Div(className="container2",
+                 children=[html.Div(className="team-card",
+                 children=[
+                     html.Div("Amit Hiremath", className="subheading"),
+                     html.P("Research Assistant at NYIT",className="content"),
+                     html.Img(src="https://media-exp1.licdn.com/dms/image/C5603AQGuQkOG3uCLZg/profile-displayphoto-shrink_200_200/0/1625175763328?e=1638403200&v=beta&t=Sf7srb1MB1fJb-TsVnxYzIsFZPgCqa6EHV5DSBLfXCY", alt= "avatar", className="circle-img"),
+                     html.Div(className="container2",
+                              children=[
+                                  dcc.Link(
+                                  html.Button(className="social-btn hvr-radial-in",
+                                      children=html.I(className="fab fa-linkedin-in"),
+                                  ),href="https://www.linkedin.com/in/the-amit-hiremath/", target="_blank"),
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=[html.I(className="far fa-envelope", )]
+                                                  ),
+                                      href="mailto:avmh200611@gmail.com",
+                                      target="_blank"
+                                  ),
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=[html.I(className="fas fa-globe-americas"), ]
+                                                  ),
+                                      href="https://amits-portfolio-site.herokuapp.com/introduction",
+                                      target="_blank"
+                                  ),
+
+                              ])
+                 ]),
+        html.Div(className="team-card",
+                 children=[
+                     html.Div("Ziqian Dong", className="subheading"),
+                     html.P("Professor at NYIT", className="content"),
+                     html.Img(src="https://www.nyit.edu/files/profiles/headshot/Ziqian.Dong.jpg", alt= "avatar", className="circle-img"),
+                     html.Div(className="container2",
+                              children=[
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=html.I(className="fab fa-linkedin-in"),
+                                                  ),
+                                    href="https://www.linkedin.com/in/ziqian-cecilia-dong-abb4532/",
+                                    target="_blank"
+                                  ),
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=[html.I(className="far fa-envelope", **{'aria-hidden': 'true'},
+                                                                   children=None), ]
+                                                  ),
+                                      href="mailto:ziqian.dong@nyit.edu",
+                                      target="_blank"
+                                  ),
+
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=[
+                                                      html.I(className="fas fa-globe-americas", **{'aria-hidden': 'true'},
+                                                             children=None), ]
+                                                  ),
+                                      href="https://www.nyit.edu/bio/Ziqian.Dong",
+                                      target="_blank"
+                                  ),
+
+                              ])
+                 ]),
+        html.Div(className="team-card",
+                 children=[
+                     html.Div("Roberto Cessa-Rojas", className="subheading"),
+                     html.P("Professor at NJIT", className="content"),
+                     html.Img(src="https://web.njit.edu/~rojasces/roberto_pic.jpg", alt= "avatar", className="circle-img"),
+                     html.Div(className="container2",
+                              children=[
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=html.I(className="fab fa-linkedin-in text-red"),
+                                                  ),
+                                      href="https://www.linkedin.com/in/roberto-rojas-cessa-90168910/",
+                                      target="_blank"
+                                  ),
+
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=[html.I(className="far fa-envelope"), ]
+                                                  ),
+                                      href="mailto:roberto.rojas-cessa@njit.edu",
+                                      target="_blank"
+                                  ),
+
+                                  dcc.Link(
+                                      html.Button(className="social-btn hvr-radial-in",
+                                                  children=[html.I(className="fas fa-globe-americas"), ]
+                                                  ),
+                                      href="https://web.njit.edu/~rojasces/",
+                                      target="_blank"
+                                  ),
+
+                              ])
+                 ]),
+
+        ]),
+        ]
+    )
 
 
 
 # events-page callbacks
+# The events charts are only sent with the page. The callback below answers with
+# small patches ({"op": "append", "traces": [...]} or {"op": "clear", "keep": n})
+# that assets/figure_patches.js applies to the figure already in the browser.
 @app.callback(
-    [Output("events-covid-chart", "figure"), Output("events-subway-chart", "figure"),
+    [Output("events-covid-patch", "data"), Output("events-subway-patch", "data"),
      Output("covid-event-table", "columns"), Output("covid-event-table", "data"),
      Output("subway-event-table", "columns"), Output("subway-event-table", "data"),
     Output("covid-event-14table", "columns"), Output("covid-event-14table", "data"),
@@ -828,157 +1134,312 @@ def on_click_calc(n_clicks, clear, date_val):
     else:
         what_was_clicked = ctx.triggered[0]['prop_id'].split('.')[0]
 
-    no_cps = len(event_data["Date"].unique())
-
-    ma_cases = covid_data["MA Cases"].values
-    c_algo = rpt.Dynp(model="l2", jump=1).fit(ma_cases)
-    ccps = c_algo.predict(160)
-    covid_cps = covid_data.loc[covid_data.index.isin(ccps)]
+    # the impacts and rankings below are rebuilt when the events CSV changed
+    events_version()
+    covid_impacts = series_impacts("covid")
+    covid_cps = covid_impacts.impacts
     #covid_cps["Date"] = covid_cps['Date'].dt.strftime('%Y-%m-%d')
-    covid_cps = covid_cps.groupby("Event Descriptions").nth(0).reset_index()
 
-    ma_entries = subway_data["MA Entries"].values
-    s_algo = rpt.Dynp(model="l2", jump=1).fit(ma_entries)
-    scps = s_algo.predict(160)
-
-    subway_cps = subway_data.loc[subway_data.index.isin(scps)]
+    subway_impacts = series_impacts("subway")
+    subway_cps = subway_impacts.impacts
     #subway_cps["Date"] = subway_cps['Date'].dt.strftime('%Y-%m-%d')
-    subway_cps = subway_cps.groupby("Event Descriptions").nth(0).reset_index()
 
 
     if what_was_clicked == "calendar-date-picker":
-        cov_graph = ev_covid_fig
         date_val = datetime.datetime.strptime(date_val, "%Y-%m-%d")
         x_dates = [date_val] #, date_val + datetime.timedelta(days=30)] #, date_val+ datetime.timedelta(days=2), date_val + datetime.timedelta(days=3)]
-        impact = covid_cps.loc[covid_cps["Date"] <= date_val]
-        impact = impact.sort_values(by= "Date")
-        #print(impact[["Date", "7 day Difference", "MA Cases"]])
-        impact = impact.tail(1)
-        y_vals = impact["Abs 7 day Difference"]
+        # latest impact on or before the picked date, a binary search in the impact index
+        with timing.phase("query"):
+            y_vals = covid_impacts.impacts_at(x_dates, 7)
+            sub_y = subway_impacts.impacts_at(x_dates, 7)
         #width = [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.4]
-        cov_graph.add_trace(go.Bar(x=x_dates,y=y_vals, width= 1000 * 3600 * 24 *2, name="Added Event Impact"))
-
-        sub_graph = ev_subway_fig
-        sub_impact = subway_cps.loc[subway_cps["Date"] <= date_val]
-        sub_impact = sub_impact.sort_values(by= "Date")
-        sub_impact = sub_impact.tail(1)
-        sub_y = sub_impact["Abs 7 day Difference"]
-        sub_graph.add_trace(go.Bar(x= x_dates, y= sub_y, width= 1000*3600 *24 *2, name="Added Event Impact"))
+        with timing.phase("figure"):
+            cov_patch = append_traces(go.Bar(x=x_dates,y=y_vals, width= 1000 * 3600 * 24 *2, name="Added Event Impact"))
+            sub_patch = append_traces(go.Bar(x= x_dates, y= sub_y, width= 1000*3600 *24 *2, name="Added Event Impact"))
 
-        return cov_graph,sub_graph, [], [], [], [], [], [], [], []
+        return cov_patch, sub_patch, [], [], [], [], [], [], [], []
 
     elif what_was_clicked == "calculate-btn" and (n_clicks >0):
 
-        covid_cps7 = covid_cps.sort_values(by=["Abs 7 day Difference"], ascending=False).head(10)
-        covid_cps14 = covid_cps.sort_values(by=["Abs 14 day Difference"], ascending=False).head(10)
+        # the rankings are sorted once per data version and the records kept ready
+        # to send; the same tables are at /rankings/<series>/<days>.json?k=10 and,
+        # as CSV files, at /exports/<name>.csv (exports.py)
+        with timing.phase("query"):
+            rankings = load_rankings()
+        with timing.phase("figure"):
+            events_covid_patch = top_impacts_patch("covid")
+            events_subway_patch = top_impacts_patch("subway")
 
-        events_covid_chart_figure = ev_covid_fig
+        with timing.phase("query"):
+            cols, cols14 = rankings.columns(7), rankings.columns(14)
+            sub_cols, sub_cols14 = rankings.columns(7), rankings.columns(14)
 
-        events_covid_chart_figure.add_bar(x=covid_cps7["Date"].head(10),
-                                          y=covid_cps7["Abs 14 day Difference"].head(10),
-                                          name="Top 10 Event Impacts")
+            c_data = rankings.records("covid", 7)
+            c_data14 = rankings.records("covid", 14)
 
-        subway_cps7 = subway_cps.sort_values(by=["Abs 7 day Difference"], ascending=False).head(10)
-        subway_cps14 = subway_cps.sort_values(by=["Abs 14 day Difference"], ascending=False).head(10)
+            s_data = rankings.records("subway", 7)
+            s_data14 = rankings.records("subway", 14)
 
-        events_subway_chart_figure = ev_subway_fig
+        return events_covid_patch, events_subway_patch, cols, c_data, sub_cols, s_data, cols14, c_data14, sub_cols14, s_data14
+    elif what_was_clicked == "clear-btn" and (clear > 0):
+        # drop everything after the moving average and LSTM lines
+        clear_covid_patch = {"op": "clear", "keep": len(events_covid_figure().data)}
+        clear_subway_patch = {"op": "clear", "keep": len(events_subway_figure().data)}
 
-        events_subway_chart_figure.add_bar(x= subway_cps7["Date"].head(10),
-                                           y= subway_cps7["Abs 14 day Difference"].head(10),
-                                           name="Top 10 Event Impacts")
+        return clear_covid_patch, clear_subway_patch, [], [], [], [], [], [], [], []
+    else:
+        raise dash.exceptions.PreventUpdate
+    print(what_was_clicked)
+    print(date_val)
 
-        cols = ["Date", "Abs 7 day Difference", "Event Descriptions"]
-        cols = [{"name": i, "id": i} for i in cols]
 
-        cols14 = ["Date", "Abs 14 day Difference", "Event Descriptions"]
-        cols14 = [{"name": i, "id": i} for i in cols14]
+def append_traces(*traces):
+    return {"op": "append", "traces": [trace.to_plotly_json() for trace in traces]}
 
-        sub_cols =["Date", "Abs 7 day Difference", "Event Descriptions"]
-        sub_cols = [{"name": j, "id": j} for j in sub_cols]
 
-        sub_cols14 = ["Date", "Abs 14 day Difference", "Event Descriptions"]
-        sub_cols14 = [{"name": j, "id": j} for j in sub_cols14]
+@lru_cache(maxsize=None)
+def figure_json(build):
+    return build().to_plotly_json()
 
-        c_data = covid_cps7[["Date", "Abs 7 day Difference", "Event Descriptions"]].to_dict('records')
-        c_data14 = covid_cps14[["Date", "Abs 14 day Difference", "Event Descriptions"]].to_dict('records')
 
-        s_data = subway_cps7[["Date", "Abs 7 day Difference", "Event Descriptions"]].to_dict('records')
-        s_data14 = subway_cps14[["Date", "Abs 14 day Difference", "Event Descriptions"]].to_dict('records')
+def zoom_callback(lines, stop=None):
+    """A callback answering a chart's relayoutData with ``lines()`` (a figure
+    dict) resampled to the zoomed range, as a patch for assets/figure_patches.js.
+    ``stop(*state)`` limits the points used."""
+    def zoom(relayout, *state):
+        from resample import zoom_patch
 
-        covid_cps7[["Date", "Abs 7 day Difference", "Event Descriptions"]].to_csv('covidhead.csv')
-        covid_cps14[["Date", "Abs 14 day Difference", "Event Descriptions"]].to_csv('covid14head.csv')
-        subway_cps7[["Date", "Abs 7 day Difference", "Event Descriptions"]].to_csv('subwayhead.csv')
-        subway_cps14[["Date", "Abs 14 day Difference", "Event Descriptions"]].to_csv('subway14head.csv')
+        with timing.phase("figure"):
+            patch = zoom_patch(lines(), relayout, stop=stop(*state) if stop else None)
+        if patch is None:
+            raise dash.exceptions.PreventUpdate
+        return patch
+    return zoom
 
 
-        return events_covid_chart_figure, events_subway_chart_figure, cols, c_data, sub_cols, s_data, cols14, c_data14, sub_cols14, s_data14
-    elif what_was_clicked == "clear-btn" and (clear > 0):
-        clear_covid_fig = ev_covid_fig
-        clear_subway_fig = ev_subway_fig
-        clear_covid_fig.data = ev_covid_fig.data[0:2]
-        clear_subway_fig.data = ev_subway_fig.data[0:2]
+zoom_callbacks = []
+for graph_id, build in [("events-covid-chart", events_covid_figure), ("events-subway-chart", events_subway_figure)]:
+    app.clientside_callback(
+        ClientsideFunction(namespace="figures", function_name="apply_patch"),
+        Output(graph_id, "figure"),
+        [Input(graph_id.replace("chart", "patch"), "data"), Input(graph_id.replace("chart", "resample"), "data")],
+        [State(graph_id, "figure")],
+    )
+    zoom_callbacks.append(app.callback(Output(graph_id.replace("chart", "resample"), "data"),
+                                       [Input(graph_id, "relayoutData")])(
+        zoom_callback(lambda build=build: figure_json(build))))
 
-        return clear_covid_fig, clear_subway_fig, [], [], [], [], [], [], [], []
-    else:
+
+# change-points-page callbacks
+def update_series(name, no_cp, method=None, penalty=None, relayout=None):
+    """Change point figure of any registered series, resampled to the range of
+    the last zoom in ``relayout``."""
+    from detectors import DEFAULT_DETECTOR, bad_parameters, detect
+    from figures import changepoint_overlay
+    from resample import resample_figure, zoom_range
+
+    x_range = zoom_range(relayout)
+    if x_range is False and relayout is not None and "relayoutData" in dash.callback_context.triggered[0]["prop_id"]:
+        # a relayout that did not move the x axis
         raise dash.exceptions.PreventUpdate
-    print(what_was_clicked)
-    print(date_val)
+    with timing.phase("query"):
+        data, value_col = SERIES.load(name)
+    with timing.phase("fit"):
+        try:
+            cps = detect(data[value_col].values, method or DEFAULT_DETECTOR, n_bkps=no_cp, penalty=penalty,
+                         index=changepoint_index(), store=artifact_store())
+        except bad_parameters():
+            # more change points than the series has room for: the chart without markers
+            cps = []
+    with timing.phase("query"):
+        dates = data["Date"].loc[data.index.isin(cps)]
+    with timing.phase("figure"):
+        # the cached lines plus the markers, without building the figure again
+        base = changepoint_figure(name)
+        chart_figure = dict(base, data=list(base["data"]) + [changepoint_overlay(dates.values).to_plotly_json()])
+        return resample_figure(chart_figure, x_range or None)
+
+
+def series_update(name):
+    """The server-side change point callback of series ``name``'s card."""
+    def update(no_cp, method=None, penalty=None, relayout=None):
+        return update_series(name, no_cp, method, penalty, relayout)
+    # the name /metrics reports the callback under
+    update.__name__ = "update_" + name
+    return update
+
+
+# update_covid, update_subway, ... by series name (what benchmarks/suite.py times)
+updates = {entry.name: series_update(entry.name) for entry in SERIES.event_series()}
+
+
+def detected_dates(name, request):
+    from detectors import bad_parameters, detect
+
+    with timing.phase("query"):
+        data, value_col = SERIES.load(name)
+    with timing.phase("fit"):
+        try:
+            cps = detect(data[value_col].values, request["method"], n_bkps=request["n_bkps"],
+                         penalty=request["penalty"], index=changepoint_index(), store=artifact_store())
+        except bad_parameters():
+            cps = []
+    with timing.phase("query"):
+        dates = data["Date"].loc[data.index.isin(cps)]
+        return {"request": request, "dates": dates.dt.strftime("%Y-%m-%d").tolist()}
+
+
+def series_detect(name):
+    """The callback answering the change point requests of series ``name``'s card."""
+    def detect(request):
+        if request is None:
+            raise dash.exceptions.PreventUpdate
+        return detected_dates(name, request)
+    detect.__name__ = "detect_" + name
+    return detect
+
+
+def changepoint_controls(ids):
+    return [Input(ids("filter"), "value"), Input(ids("method"), "value"), Input(ids("penalty"), "value")]
+
+
+changepoint_callbacks = []
+if CLIENTSIDE_CHANGEPOINTS:
+    # Dynp answers come from the preloaded payload in assets/changepoints.js; only
+    # the other detectors send a request to the server.
+    for entry in SERIES.event_series():
+        ids = changepoint_ids(entry.name)
+        app.clientside_callback(
+            ClientsideFunction(namespace="changepoints", function_name="request"),
+            Output(ids("request"), "data"),
+            changepoint_controls(ids),
+        )
+        app.clientside_callback(
+            ClientsideFunction(namespace="changepoints", function_name="render"),
+            Output(ids("chart"), "figure"),
+            changepoint_controls(ids) + [Input(ids("detected"), "data"), Input(ids("resample"), "data")],
+            [State(ids("changepoints"), "data"), State(ids("chart"), "figure")],
+        )
+        zoom_callbacks.append(app.callback(Output(ids("resample"), "data"), [Input(ids("chart"), "relayoutData")])(
+            zoom_callback(lambda name=entry.name: changepoint_figure(name))))
+        changepoint_callbacks.append(app.callback(Output(ids("detected"), "data"), [Input(ids("request"), "data")])(
+            series_detect(entry.name)))
+else:
+    for entry in SERIES.event_series():
+        ids = changepoint_ids(entry.name)
+        changepoint_callbacks.append(app.callback(
+            Output(ids("chart"), "figure"), changepoint_controls(ids) + [Input(ids("chart"), "relayoutData")])(
+            updates[entry.name]))
+
+
+# series-page callbacks, one set for every series through pattern-matching ids
+@app.callback(Output({"type": "series-chart", "series": MATCH}, "figure"),
+              changepoint_controls(lambda kind: {"type": "series-" + kind, "series": MATCH})
+              + [Input({"type": "series-chart", "series": MATCH}, "relayoutData")])
+def update_matched_series(no_cp, method, penalty, relayout):
+    return update_series(dash.callback_context.outputs_list["id"]["series"], no_cp, method, penalty, relayout)
+
+
+# daily-data-page callbacks
+@app.callback([Output("daily-data-extension", "data"), Output("daily-data-rows", "data")],
+              [Input("daily-data-interval", "n_intervals")],
+              [State("daily-data-rows", "data")])
+def extend_daily_data(n_intervals, rows):
+    # only the days the page has not seen yet, never the whole series
+    daily_version()
+    if not rows:
+        raise dash.exceptions.PreventUpdate
+    detectors = online_changepoints()
+    with timing.phase("query"):
+        extension = {name: daily_extension(name, seen) for name, seen in rows.items()
+                     if detectors[name].rows > seen}
+    if not extension:
+        raise dash.exceptions.PreventUpdate
+    return extension, {name: detectors[name].rows for name in rows}
 
 
-# change-points-page callbacks
-@app.callback(
-    Output("covid-chart", "figure"),
-    [
-        Input("change-point-filter", "value")
-    ],
+app.clientside_callback(
+    ClientsideFunction(namespace="figures", function_name="extend_daily"),
+    [Output("rt-covid-chart", "extendData"), Output("rt-subway-chart", "extendData")],
+    [Input("daily-data-extension", "data")],
 )
-def update_covid(no_cp):
-    ma_cases = covid_data["MA Cases"].values
-    algo = rpt.Dynp(model="l2", jump= 1).fit(ma_cases)
-    cps = algo.predict(no_cp)
-    dates = covid_data["Date"].loc[covid_data.index.isin(cps)]
-    covid_chart_figure = px.line(
-        covid_data, x="Date", y= ["MA Cases", "7 days Ahead Forecasted Values"],
-    )
-    for date in dates:
-        covid_chart_figure.add_vline(x = date, line_width = 1, line_color = "green")
-    covid_chart_figure.update_layout({'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)',})
-    return covid_chart_figure
 
-@app.callback(
-    Output("subway-chart", "figure"),
-    [
-        Input("subway-change-point-filter", "value")
-    ],
-)
-def update_subway(no_cp):
-    ma_entries = subway_data["MA Entries"].values
-    algo = rpt.Dynp(model="l2", jump= 1).fit(ma_entries)
-    cps = algo.predict(no_cp)
-    dates = subway_data["Date"].loc[subway_data.index.isin(cps)]
-    subway_chart_figure = px.line(
-        subway_data, x="Date", y = ["MA Entries", "7 days Ahead Forecasted Values"],
+
+def daily_lines(name):
+    # the moving average and the values, traces 0 and 1
+    figure = {"rt_covid": rt_covid_figure, "rt_subway": rt_subway_figure}[name]()
+    return {"data": figure["data"][:2]}
+
+
+for name in ["rt_covid", "rt_subway"]:
+    graph_id = name.replace("_", "-") + "-chart"
+    app.clientside_callback(
+        ClientsideFunction(namespace="figures", function_name="apply_patch"),
+        Output(graph_id, "figure"),
+        [Input(graph_id.replace("chart", "resample"), "data")],
+        [State(graph_id, "figure")],
     )
-    for date in dates:
-        subway_chart_figure.add_vline(x = date, line_width = 1, line_color = "green")
-    subway_chart_figure.update_layout({'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)',})
-    return subway_chart_figure
+    zoom_callbacks.append(app.callback(Output(graph_id.replace("chart", "resample"), "data"),
+                                       [Input(graph_id, "relayoutData")], [State("daily-data-rows", "data")])(
+        # only up to the rows the page has, so a zoom never brings in days
+        # extendData is still going to append
+        zoom_callback(lambda name=name: daily_lines(name), stop=lambda rows, name=name: rows[name])))
+
 
 @app.callback(Output('page-content', 'children'),
               [Input('url','pathname')])
 def display_page(pathname):
-    if pathname == "/events":
-        return events_page
-    elif pathname == "/changepoints":
-        return change_points_page
-    elif pathname == "/daily-data":
-        return real_time_data
-    elif pathname =="/team":
-        return teams
+    # the page layouts, cached after they are first built
+    with timing.phase("figure"):
+        if pathname == "/events":
+            return events_page()
+        elif pathname == "/changepoints":
+            return change_points_page()
+        elif pathname == "/daily-data":
+            return real_time_data()
+        elif pathname =="/team":
+            return teams()
+        elif pathname == "/series":
+            return series_index_page()
+        elif pathname and pathname.startswith("/series/"):
+            return series_page(pathname[len("/series/"):])
+        else:
+            return index_page()
+
+
+@lru_cache(maxsize=None)
+def files_version():
+    # the source CSVs and the code that turns them into responses, and the
+    # discovered series (by size and modification time, nothing is read)
+    version = callback_cache.files_version(os.path.dirname(os.path.abspath(__file__)))
+    if os.environ.get("DATA_DIR"):
+        # the CSVs data.py reads instead
+        version += callback_cache.files_version(os.environ["DATA_DIR"], ("*.csv",))
+    return version + SERIES.version
+
+
+def cache_version():
+    # and the days streamed in since (daily.py) and the events CSV as last read;
+    # a worker that has not loaded them yet tags what it would load, so serving
+    # "/" stays free of pandas
+    if load_data.cache_info().currsize:
+        events = events_version()
     else:
-        return index_page
+        events = events_file_version()
+    if daily_streams.cache_info().currsize:
+        return "{}-{}-{}".format(files_version(), events, daily_version())
+    from daily import sources_version
+    return "{}-{}-{}".format(files_version(), events, sources_version())
+
+
+# Pure callbacks answer repeated requests from a response cache (callback_cache.py)
+pure_callbacks = [display_page, on_click_calc, update_matched_series] + changepoint_callbacks + zoom_callbacks
+response_cache = callback_cache.register(app, pure_callbacks, cache_version)
 
 if __name__ == '__main__':
+    from data import write_event_store
+
+    write_event_store()
     app.run_server(debug=True)
 
 # See PyCharm help at https://www.jetbrains.com/help/pycharm/
@@ -0,0 +1,57 @@
+// Change point markers drawn in the browser. The Dynp change points for every K
+// arrive once with the page (ChangePointIndex.client_payload), so moving the
+// dropdown never reaches the server; other detectors go through *-request /
+// *-detected stores filled by the server. Zooms arrive as resample patches in
+// *-resample (assets/figure_patches.js).
+(function() {
+    // same single trace as figures.changepoint_overlay builds on the server
+    function overlay(dates) {
+        var x = [], y = [];
+        dates.forEach(function(d) {
+            x.push(d, d, null);
+            y.push(0, 1, null);
+        });
+        return {type: "scatter", x: x, y: y, mode: "lines", line: {color: "green", width: 1},
+                yaxis: "y2", hoverinfo: "skip", showlegend: false, name: "Change points",
+                uid: "changepoints"};
+    }
+
+    function currentRequest(nBkps, method, penalty) {
+        return {method: method, n_bkps: nBkps, penalty: (penalty === undefined || penalty === "") ? null : penalty};
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        changepoints: {
+            request: function(nBkps, method, penalty) {
+                if (method === "dynp") {
+                    return window.dash_clientside.no_update;
+                }
+                return currentRequest(nBkps, method, penalty);
+            },
+            render: function(nBkps, method, penalty, detected, resampled, payload, figure) {
+                var dates, figures = window.dash_clientside.figures;
+                if (!figure || !payload) {
+                    return window.dash_clientside.no_update;
+                }
+                // a zoom: new points for the lines, the markers stay
+                if (figures.triggeredBy(window.dash_clientside.callback_context.inputs_list[4].id)) {
+                    return resampled ? figures.patched(resampled, figure) : window.dash_clientside.no_update;
+                }
+                if (method === "dynp") {
+                    var indices = payload.indices.slice(payload.offsets[nBkps - 1], payload.offsets[nBkps]);
+                    dates = indices.map(function(i) { return payload.dates[i]; });
+                } else if (detected && JSON.stringify(detected.request) ===
+                           JSON.stringify(currentRequest(nBkps, method, penalty))) {
+                    dates = detected.dates;
+                } else {
+                    // wait for the server answer to this request
+                    return window.dash_clientside.no_update;
+                }
+                var data = (figure.data || []).filter(function(trace) {
+                    return trace.uid !== "changepoints";
+                });
+                return Object.assign({}, figure, {data: data.concat([overlay(dates)])});
+            }
+        }
+    });
+})();
@@ -0,0 +1,54 @@
+// Applies the trace patches sent by on_click_calc to a figure already in the browser,
+// so the line traces never travel back to the server and back again. extend_daily
+// does the same for the days streamed into the Daily Data charts.
+(function() {
+    // true when the callback was fired by the input with this id
+    function triggeredBy(id) {
+        return window.dash_clientside.callback_context.triggered.some(function(t) {
+            return t.prop_id.split(".")[0] === id;
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        figures: {
+            triggeredBy: triggeredBy,
+            // {"op": "append", "traces": [...]}, {"op": "clear", "keep": n} or, for a
+            // zoom, {"op": "resample", "indices": [...], "x": [...], "y": [...]}
+            // (resample.zoom_patch) with new points for those traces
+            patched: function(patch, figure) {
+                var data = figure.data || [];
+                if (patch.op === "append") {
+                    data = data.concat(patch.traces);
+                } else if (patch.op === "clear") {
+                    data = data.slice(0, patch.keep);
+                } else if (patch.op === "resample") {
+                    data = data.slice();
+                    patch.indices.forEach(function(i, k) {
+                        data[i] = Object.assign({}, data[i], {x: patch.x[k], y: patch.y[k]});
+                    });
+                }
+                return Object.assign({}, figure, {data: data});
+            },
+            // patch callbacks have the patch stores as inputs and the figure as state;
+            // the patch applied is the one that fired
+            apply_patch: function() {
+                var figure = arguments[arguments.length - 1];
+                var fired = window.dash_clientside.callback_context.inputs_list.filter(function(input) {
+                    return triggeredBy(input.id);
+                })[0];
+                if (!figure || !fired || !fired.value) {
+                    return window.dash_clientside.no_update;
+                }
+                return window.dash_clientside.figures.patched(fired.value, figure);
+            },
+            // new days of the Daily Data series, as extendData for both charts
+            extend_daily: function(extension) {
+                var no_update = window.dash_clientside.no_update;
+                if (!extension) {
+                    return [no_update, no_update];
+                }
+                return [extension.rt_covid || no_update, extension.rt_subway || no_update];
+            }
+        }
+    });
+})();
@@ -0,0 +1,69 @@
+"""Callback response cache: first request vs. cache hit vs. revalidation.
+
+Sends each page's display_page callback (and, with CLIENTSIDE_CHANGEPOINTS=0, the
+server side change point figure) through the Flask test client three times: a
+cold request, a repeat, and a repeat with If-None-Match set to the ETag of the
+first response. Times are medians over ``--runs`` fresh caches.
+
+    python benchmarks/bench_callback_cache.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ["CLIENTSIDE_CHANGEPOINTS"] = "0"
+
+import app  # noqa: E402
+
+
+def page_body(path):
+    return {"output": "page-content.children", "outputs": {"id": "page-content", "property": "children"},
+            "inputs": [{"id": "url", "property": "pathname", "value": path}], "changedPropIds": ["url.pathname"]}
+
+
+def figure_body(n_bkps):
+    return {"output": "covid-chart.figure", "outputs": {"id": "covid-chart", "property": "figure"},
+            "inputs": [{"id": "change-point-filter", "property": "value", "value": n_bkps},
+                       {"id": "change-point-method", "property": "value", "value": "dynp"},
+                       {"id": "change-point-penalty", "property": "value", "value": None}],
+            "changedPropIds": ["change-point-filter.value"]}
+
+
+def timed_post(client, body, headers=None):
+    start = time.perf_counter()
+    response = client.post("/_dash-update-component", json=body, headers=headers or {})
+    return time.perf_counter() - start, response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    app.warm_changepoints()
+    app.warm_pages()
+    client = app.server.test_client()
+    cases = [("/events page", page_body("/events")), ("/changepoints page", page_body("/changepoints")),
+             ("/daily-data page", page_body("/daily-data")), ("Dynp figure, K=40", figure_body(40))]
+    print("| callback           | size     | first     | cached   | 304      |")
+    print("|:-------------------|---------:|----------:|---------:|---------:|")
+    for name, body in cases:
+        timings = []
+        for _ in range(args.runs):
+            app.response_cache.memory.clear()
+            first, response = timed_post(client, body)
+            again, _ = timed_post(client, body)
+            revalidated, not_modified = timed_post(client, body, {"If-None-Match": response.headers["ETag"]})
+            assert not_modified.status_code == 304
+            timings.append((first, again, revalidated))
+        first, again, revalidated = (statistics.median(t) * 1e3 for t in zip(*timings))
+        print("| {:18s} | {:6.1f} KB | {:6.2f} ms | {:5.2f} ms | {:5.2f} ms |".format(
+            name, len(response.data) / 1024, first, again, revalidated))
+
+
+if __name__ == "__main__":
+    main()
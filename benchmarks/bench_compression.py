@@ -0,0 +1,68 @@
+"""Compressed responses: payload sizes and the cost of compressing them.
+
+For the events, change points and daily data pages this sends the display_page
+callback (and, with CLIENTSIDE_CHANGEPOINTS=0, the server side change point
+figure) through the Flask test client without compression, as gzip and as br.
+"First" is a request whose response has to be compressed, "cached" a repeat
+answered from the precompressed variants. The static bundles the index page
+loads are totalled the same way.
+
+    python benchmarks/bench_compression.py --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ["CLIENTSIDE_CHANGEPOINTS"] = "0"
+
+import app  # noqa: E402
+from bench_callback_cache import figure_body, page_body  # noqa: E402
+
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def timed_post(client, body, encoding):
+    start = time.perf_counter()
+    response = client.post("/_dash-update-component", json=body, headers={"Accept-Encoding": encoding})
+    return time.perf_counter() - start, response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    app.warm_changepoints()
+    app.warm_pages()
+    client = app.server.test_client()
+    cases = [("/events page", page_body("/events")), ("/changepoints page", page_body("/changepoints")),
+             ("/daily-data page", page_body("/daily-data")), ("Dynp figure, K=40", figure_body(40))]
+    print("| callback           | identity  | gzip      | br        | br first  | br cached |")
+    print("|:-------------------|----------:|----------:|----------:|----------:|----------:|")
+    for name, body in cases:
+        sizes = {encoding: len(timed_post(client, body, encoding)[1].data) for encoding in ENCODINGS}
+        timings = []
+        for _ in range(args.runs):
+            # a cached callback response but no compressed variant of it yet
+            app.compressed.cache.clear()
+            timed_post(client, body, "identity")
+            timings.append((timed_post(client, body, "br")[0], timed_post(client, body, "br")[0]))
+        first, cached = (statistics.median(t) * 1e3 for t in zip(*timings))
+        print("| {:18s} | {} | {} | {} | {:6.2f} ms | {:6.2f} ms |".format(
+            name, *("{:6.1f} KB".format(sizes[encoding] / 1024) for encoding in ENCODINGS), first, cached))
+
+    page = client.get("/").get_data(as_text=True)
+    urls = re.findall(r'(?:src|href)="(/[^"]+)"', page)
+    totals = {encoding: sum(len(client.get(url, headers={"Accept-Encoding": encoding}).data) for url in urls)
+              for encoding in ENCODINGS}
+    print("\nstatic bundles ({} files): {}".format(
+        len(urls), ", ".join("{} {:.0f} KB".format(e, totals[e] / 1024) for e in ENCODINGS)))
+
+
+if __name__ == "__main__":
+    main()
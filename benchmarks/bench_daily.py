@@ -0,0 +1,79 @@
+"""Daily Data: reloading a regenerated CSV vs. streaming one new day.
+
+rt_covid.csv is grown ``--scale`` times by prepending copies of itself (dates
+shifted back). The reload path is what a new day used to cost: read the whole
+CSV, recompute the 7 day moving average and build the figure again. The streaming
+path appends the day to the drop directory, polls it (daily.DailyStreams) and
+extends the figure already built (figures.extend_traces).
+
+    python benchmarks/bench_daily.py --scale 1 10 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+import daily  # noqa: E402
+from figures import extend_traces  # noqa: E402
+
+
+def grown(frame, scale):
+    dates = pd.to_datetime(frame["date_of_interest"])
+    span = dates.iloc[-1] - dates.iloc[0] + pd.Timedelta(days=1)
+    copies = [frame.assign(date_of_interest=(dates - span * k).dt.strftime("%Y-%m-%d"))
+              for k in range(scale - 1, -1, -1)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def reload(path):
+    frame = pd.read_csv(path)
+    frame["MA Cases"] = frame["CASE_COUNT"].rolling(daily.WINDOW).mean().fillna(0.0)
+    return app.build_rt_covid_figure(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--days", type=int, default=20)
+    args = parser.parse_args()
+    base = pd.read_csv(os.path.join(ROOT, "rt_covid.csv"))
+    print("| scale |   rows | reload CSV | stream one day |")
+    print("|------:|-------:|-----------:|---------------:|")
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as root:
+            frame = grown(base, scale)
+            frames = {}
+            for name, spec in daily.DAILY_SERIES.items():
+                source = frame if name == "rt_covid" else pd.read_csv(os.path.join(ROOT, spec.source))
+                source.to_csv(os.path.join(root, spec.source), index=False)
+                frames[name] = source
+            drop = os.path.join(root, "drop")
+            streams = daily.DailyStreams(frames, root=root, drop_dir=drop, poll_seconds=0)
+            figure = app.build_rt_covid_figure(streams["rt_covid"].frame).to_plotly_json()
+            last = pd.Timestamp(streams["rt_covid"].last)
+            reloads, steps = [], []
+            for day in range(1, args.days + 1):
+                start = time.perf_counter()
+                daily.append_rows("rt_covid", [((last + pd.Timedelta(days=day)).date(), 1000 + day)], drop)
+                rows = len(streams["rt_covid"])
+                streams.poll()
+                figure = extend_traces(figure, streams["rt_covid"].extend_data(rows))
+                steps.append(time.perf_counter() - start)
+                if day <= 5:
+                    start = time.perf_counter()
+                    reload(os.path.join(root, "rt_covid.csv"))
+                    reloads.append(time.perf_counter() - start)
+            print("| {:5d} | {:6d} | {:7.1f} ms | {:11.2f} ms |".format(
+                scale, len(frame), statistics.median(reloads) * 1e3, statistics.median(steps) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cost-vs-accuracy comparison of the fast detectors against exact Dynp.
+
+For covid_preds.csv and subway_preds.csv every detector is asked for the same
+number of change points as Dynp (PELT, which only takes a penalty, is compared
+at whatever K its penalty produced). Reported per run: fit time, the l2 cost of
+the segmentation relative to the Dynp optimum for that K (1.000 is optimal) and
+the F1 score of its change points against Dynp's within a 7 day margin. A second
+table times the detectors on synthetic series up to 100x the bundled length.
+
+    python benchmarks/bench_detectors.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import detectors  # noqa: E402
+from detectors import DETECTORS, detect  # noqa: E402
+from segmentation import L2Dynp  # noqa: E402
+
+BUNDLED = [("covid_preds.csv", "MA Cases"), ("subway_preds.csv", "MA Entries")]
+
+
+def f1_score(reference, predicted, margin):
+    reference, predicted = reference[:-1], predicted[:-1]
+    if not reference or not predicted:
+        return 0.0
+    hits = sum(any(abs(p - r) <= margin for p in predicted) for r in reference)
+    precision = sum(any(abs(p - r) <= margin for r in reference) for p in predicted) / len(predicted)
+    recall = hits / len(reference)
+    return 0.0 if precision + recall == 0 else 2 * precision * recall / (precision + recall)
+
+
+def timed_detect(values, detector, **kwargs):
+    detectors._detect.cache_clear()
+    start = time.perf_counter()
+    bkps = detect(values, detector, **kwargs)
+    return bkps, time.perf_counter() - start
+
+
+def compare_bundled(ks, penalties, margin):
+    print("{:<18} {:<9} {:>4} {:>10} {:>10} {:>6}".format("series", "detector", "K", "time s", "cost/opt", "F1"))
+    for path, column in BUNDLED:
+        values = pd.read_csv(os.path.join(ROOT, path))[column].values
+        exact = L2Dynp(jump=1).fit(values)
+        optimum = exact.predict_all(max(ks + [160]))
+        rows = []
+        for k in ks:
+            for name, detector in DETECTORS.items():
+                if "n_bkps" in detector.modes:
+                    bkps, seconds = timed_detect(values, name, n_bkps=k)
+                    rows.append((name, k, seconds, bkps))
+        for pen in penalties:
+            bkps, seconds = timed_detect(values, "pelt", penalty=pen)
+            rows.append(("pelt", len(bkps) - 1, seconds, bkps))
+        for name, k, seconds, bkps in rows:
+            if k not in optimum:
+                continue
+            ratio = exact.sum_of_costs(bkps) / exact.sum_of_costs(optimum[k])
+            print("{:<18} {:<9} {:>4} {:>10.4f} {:>10.3f} {:>6.2f}".format(
+                path, name, k, seconds, ratio, f1_score(optimum[k], bkps, margin)))
+
+
+def scaling(lengths, k, dynp_max):
+    print()
+    print("{:>7} ".format("n") + " ".join("{:>10}".format(name) for name in DETECTORS))
+    rng = np.random.default_rng(0)
+    for n in lengths:
+        values = np.repeat(rng.normal(scale=5.0, size=k + 1), n // (k + 1) + 1)[:n] + rng.normal(size=n)
+        cells = []
+        for name, detector in DETECTORS.items():
+            if name == "dynp" and n > dynp_max:
+                cells.append("-")
+                continue
+            kwargs = {"n_bkps": k} if "n_bkps" in detector.modes else {"penalty": 10.0}
+            cells.append("{:.3f}".format(timed_detect(values, name, **kwargs)[1]))
+        print("{:>7} ".format(n) + " ".join("{:>10}".format(c) for c in cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ks", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--penalties", type=float, nargs="+", default=[0.5, 2.0, 10.0])
+    parser.add_argument("--margin", type=int, default=7)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[363, 3630, 36300])
+    parser.add_argument("--dynp-max", type=int, default=4000)
+    args = parser.parse_args()
+    compare_bundled(args.ks, args.penalties, args.margin)
+    scaling(args.lengths, 10, args.dynp_max)
@@ -0,0 +1,99 @@
+"""Event ingestion: full reparse and remerge vs. an incremental sync of new rows.
+
+The events CSV is jhu_events.csv repeated ``--scale`` times (dates shifted back by
+one year per copy so they stay before the cutoff). The full path is what
+data.prepare_frames used to do for the events on every load; the incremental
+path appends a week of new rows and runs data.refresh_events.
+
+    python benchmarks/bench_events.py --scale 1 10 100
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data  # noqa: E402
+import events  # noqa: E402
+
+
+def full_reload(root):
+    # the loop based loader data.prepare_frames used before events.py
+    covid_data = pd.read_csv(os.path.join(root, data.SOURCES["covid"]))
+    subway_data = pd.read_csv(os.path.join(root, data.SOURCES["subway"]))
+    covid_data["Date"] = pd.to_datetime(covid_data["Date"])
+    subway_data["Date"] = pd.to_datetime(subway_data["Date"])
+    jhu_df = pd.read_csv(os.path.join(root, data.SOURCES["events"]))
+    jhu_df["Date"] = [d.replace(',', '') for d in jhu_df["Date"]]
+    jhu_df = jhu_df[["Date", "Event Descriptions"]]
+    jhu_df["Date"] = pd.to_datetime(jhu_df["Date"])
+    jhu_df = jhu_df.loc[jhu_df["Date"] < "2021-03-01"]
+    event_data = jhu_df.groupby('Date')["Event Descriptions"].apply('----> \n'.join).reset_index()
+    covid_data = covid_data.merge(event_data, on="Date", how="left")
+    covid_data["Event Descriptions"].fillna(method="ffill", inplace=True)
+    subway_data = subway_data.merge(event_data, on="Date", how="left")
+    subway_data["Event Descriptions"].fillna(method="ffill", inplace=True)
+
+
+def scaled_events(scale):
+    raw = pd.read_csv(os.path.join(ROOT, data.SOURCES["events"]))
+    dates = pd.to_datetime(raw["Date"])
+    copies = [raw.assign(Date=(dates - pd.DateOffset(years=i)).dt.strftime("%Y-%m-%d"),
+                         **{"Event Descriptions": raw["Event Descriptions"] + (" ({})".format(i) if i else "")})
+              for i in range(scale)]
+    return pd.concat(copies[::-1], ignore_index=True)
+
+
+def timed(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--new-rows", type=int, default=10, help="rows in the appended week")
+    args = parser.parse_args()
+    print("| scale | event rows | full reload | sync + refresh |")
+    print("|------:|-----------:|------------:|---------------:|")
+    for scale in args.scale:
+        tmp = tempfile.mkdtemp()
+        try:
+            for name in data.SOURCES.values():
+                shutil.copy(os.path.join(ROOT, name), tmp)
+            rows = scaled_events(scale)
+            source = os.path.join(tmp, data.SOURCES["events"])
+            rows.to_csv(source, index=False)
+            full = timed(lambda: full_reload(tmp))
+
+            def incremental():
+                # fresh store and frames, then time appending one week only
+                store = events.EventStore(os.path.join(tmp, "store-{}".format(time.perf_counter())))
+                frames = data.prepare_frames(tmp, store.event_data() if store.sync(source) is not None else None)
+                week = pd.DataFrame({"Date": ["2021-02-2{}".format(i % 7) for i in range(args.new_rows)],
+                                     "Event Descriptions": ["new event {} {}".format(i, time.perf_counter())
+                                                            for i in range(args.new_rows)]})
+                week.to_csv(source, mode="a", header=False, index=False)
+                start = time.perf_counter()
+                data.refresh_events(frames, store, tmp)
+                return time.perf_counter() - start
+
+            inc = min(incremental() for _ in range(3))
+            print("| {:5d} | {:10d} | {:9.1f} ms | {:12.1f} ms |".format(scale, len(rows), full * 1e3, inc * 1e3))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Forecast columns: a model call per date vs. batched sliding windows.
+
+covid_preds.csv's moving average is repeated ``--scale`` times. The per-date path
+copies each date's window and predicts it alone, which is how a model gets
+called from a loop over the frame; the batched path is forecast.predict over the
+strided windows. Both give the same numbers. Times are for the 7 and 14 day
+columns together, fitting excluded (shown separately).
+
+    python benchmarks/bench_forecast.py --scale 1 10 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import forecast  # noqa: E402
+
+
+def per_date(forecaster, values, horizon):
+    windows = forecast.sliding_windows(values, forecaster.window, horizon)
+    return np.array([forecaster.predict(np.array(window)[None, :], horizon)[0] for window in windows])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+    base = pd.read_csv(os.path.join(ROOT, "covid_preds.csv"))["MA Cases"].values
+    print("| model       | scale |  rows |       fit |  per date |   batched |")
+    print("|:------------|------:|------:|----------:|----------:|----------:|")
+    for name in forecast.FORECASTERS:
+        for scale in args.scale:
+            values = np.tile(base, scale)
+            forecaster = forecast.forecaster_for(name)
+            fit, _ = timed(lambda: forecaster.fit(values))
+            slow, a = timed(lambda: [per_date(forecaster, values, h) for h in forecast.HORIZONS])
+            fast, b = timed(lambda: [forecast.predict(forecaster, values, h) for h in forecast.HORIZONS])
+            assert np.allclose(a, b)
+            print("| {:11s} | {:5d} | {:5d} | {:6.1f} ms | {:6.1f} ms | {:6.2f} ms |".format(
+                name, scale, len(values), fit * 1e3, slow * 1e3, fast * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Calendar pick: "impact in effect at date d" with pandas filtering vs. the impact index.
+
+The old path is what on_click_calc did for every pick: group the change point
+rows per event, filter them to Date <= d, sort by Date and take the last row.
+The index answers from a sorted date array (impacts.ImpactIndex), for one date
+or for a batch of dates in one call.
+
+    python benchmarks/bench_impacts.py --batch 10000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from changepoint_index import ChangePointIndex  # noqa: E402
+from data import load_frames  # noqa: E402
+from impacts import ImpactIndex, event_impacts  # noqa: E402
+
+
+def best(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=10000)
+    args = parser.parse_args()
+    frames = load_frames()
+    cp_index = ChangePointIndex()
+    day = pd.Timestamp("2020-06-15")
+    rng = np.random.default_rng(0)
+    batch = np.datetime64("2020-01-01", "ns") + rng.integers(0, 450, args.batch).astype("timedelta64[D]")
+
+    print("| series | old pick | old pick, impacts cached | values_at | impacts_at | batch per date |")
+    print("|:-------|---------:|-------------------------:|-----------:|-----------:|---------------:|")
+    for series, value_col in [("covid", "MA Cases"), ("subway", "MA Entries")]:
+        data = frames[series]
+        cps = cp_index.breakpoints(data[value_col].values, 160)
+        impacts = event_impacts(data, cps)
+        index = ImpactIndex(impacts)
+
+        def old(impacts=None):
+            impacts = event_impacts(data, cps) if impacts is None else impacts
+            impact = impacts.loc[impacts["Date"] <= day].sort_values(by="Date").tail(1)
+            return impact["Abs 7 day Difference"]
+
+        print("| {} | {:.0f} µs | {:.0f} µs | {:.1f} µs | {:.1f} µs | {:.3f} µs |".format(
+            series,
+            best(old, 50) * 1e6,
+            best(lambda: old(impacts), 200) * 1e6,
+            best(lambda: index.values_at([day], 7), 2000) * 1e6,
+            best(lambda: index.impacts_at([day], 7), 2000) * 1e6,
+            best(lambda: index.values_at(batch, 7), 20) / args.batch * 1e6,
+        ))
+
+
+if __name__ == "__main__":
+    main()
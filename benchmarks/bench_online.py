@@ -0,0 +1,75 @@
+"""Online change points: a new day through the CUSUM vs. refitting Dynp.
+
+rt_covid's moving average is grown ``--scale`` times as in bench_daily.py. For
+each size this times replaying the whole history through online.Cusum, one new
+day, resuming OnlineChangePoints from its checkpoint, and (up to
+``--max-dynp-rows``) the offline alternative: an exact Dynp refit of the
+history for 20 change points.
+
+    python benchmarks/bench_online.py --scale 1 10 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import daily  # noqa: E402
+import online  # noqa: E402
+from bench_daily import grown  # noqa: E402
+from segmentation import L2Dynp  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--max-dynp-rows", type=int, default=6000)
+    args = parser.parse_args()
+    base = pd.read_csv(os.path.join(ROOT, "rt_covid.csv"))
+    print("| scale |   rows | replay history | one new day | resume checkpoint | Dynp refit (K=20) |")
+    print("|------:|-------:|---------------:|------------:|------------------:|------------------:|")
+    for scale in args.scale:
+        frame = grown(base, scale)
+        days, values = frame["date_of_interest"].tolist(), frame["MA Cases"].tolist()
+
+        def replay():
+            detector = online.Cusum()
+            for day, value in zip(days, values):
+                detector.update(day, value)
+            return detector
+
+        replayed = min(timeit.repeat(replay, number=1, repeat=3))
+        detector = replay()
+        step = min(timeit.repeat(lambda: online.Cusum.update(detector, "9999-12-31", values[-1]),
+                                 number=1000, repeat=3)) / 1000
+        with tempfile.TemporaryDirectory() as root:
+            frames = {}
+            for name, spec in daily.DAILY_SERIES.items():
+                source = frame if name == "rt_covid" else pd.read_csv(os.path.join(ROOT, spec.source))
+                source.to_csv(os.path.join(root, spec.source), index=False)
+                frames[name] = source
+            streams = daily.DailyStreams(frames, root=root, drop_dir=os.path.join(root, "drop"))
+            online.OnlineChangePoints(streams, os.path.join(root, "online"))
+            start = time.perf_counter()
+            resumed = online.OnlineChangePoints(streams, os.path.join(root, "online"))
+            resume = time.perf_counter() - start
+            assert resumed["rt_covid"].rows == len(frame)
+        refit = "-"
+        if len(frame) <= args.max_dynp_rows:
+            start = time.perf_counter()
+            L2Dynp().fit(np.asarray(values, dtype=np.float64)).predict(n_bkps=20)
+            refit = "{:.0f} ms".format((time.perf_counter() - start) * 1e3)
+        print("| {:5d} | {:6d} | {:11.1f} ms | {:8.2f} µs | {:14.2f} ms | {:>17s} |".format(
+            scale, len(frame), replayed * 1e3, step * 1e6, resume * 1e3, refit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Change point figure build time: one add_vline per date vs figures.add_changepoints.
+
+Builds the Change Point Detection figure for the COVID-19 series with the Dynp
+change points for each K and reports build time, serialization time and JSON size.
+
+    python benchmarks/bench_overlay.py              # K = 1, 10, 40, 80, 159
+    python benchmarks/bench_overlay.py --all        # every K = 1..159 (slow for the add_vline side)
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+import plotly.express as px
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from figures import add_changepoints  # noqa: E402
+from segmentation import L2Dynp  # noqa: E402
+
+
+def base_figure(data):
+    figure = px.line(data, x="Date", y=["MA Cases", "7 days Ahead Forecasted Values"])
+    figure.update_layout({'plot_bgcolor': 'rgba(0, 0, 0, 0)', 'paper_bgcolor': 'rgba(0, 0, 0, 0)'})
+    return figure
+
+
+def with_vlines(data, dates):
+    figure = base_figure(data)
+    for date in dates:
+        figure.add_vline(x=date, line_width=1, line_color="green")
+    return figure
+
+
+def with_overlay(data, dates):
+    return add_changepoints(base_figure(data), dates.values)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 10, 40, 80, 159])
+    parser.add_argument("--all", action="store_true", help="every K = 1..159")
+    args = parser.parse_args()
+    data = pd.read_csv(os.path.join(ROOT, "covid_preds.csv"))
+    data["Date"] = pd.to_datetime(data["Date"])
+    solutions = L2Dynp(jump=1).fit(data["MA Cases"].values).predict_all(159)
+    ks = range(1, 160) if args.all else args.ks
+    print("{:>4} {:>10} {:>10} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+        "K", "vline s", "overlay s", "speedup", "vline ser", "ovl ser", "vline KB", "ovl KB"))
+    totals = [0.0, 0.0]
+    for k in ks:
+        dates = data["Date"].loc[data.index.isin(solutions[k])]
+        before, t_before = timed(with_vlines, data, dates)
+        after, t_after = timed(with_overlay, data, dates)
+        json_before, s_before = timed(before.to_json)
+        json_after, s_after = timed(after.to_json)
+        totals[0] += t_before
+        totals[1] += t_after
+        print("{:>4} {:>10.4f} {:>10.4f} {:>7.0f}x {:>10.4f} {:>10.4f} {:>10.1f} {:>10.1f}".format(
+            k, t_before, t_after, t_before / t_after, s_before, s_after,
+            len(json_before) / 1024, len(json_after) / 1024))
+    print("total build time: add_vline {:.2f}s, overlay {:.2f}s".format(*totals))
@@ -0,0 +1,48 @@
+"""Change point batch: throughput of precompute.py by worker count, and resume.
+
+``--series`` synthetic series (rt_covid's moving average, scaled) go through the
+default grid (Dynp for every K, binary segmentation for K = 1..159 and the
+penalties, PELT for the penalties) into a fresh store for each ``--workers``
+count. The last column is a second plan over the finished store, which is all
+a resumed run pays for results already there.
+
+    python benchmarks/bench_precompute.py --series 20 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import precompute  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+    base = pd.read_csv(os.path.join(ROOT, "rt_covid.csv"))["MA Cases"].values
+    series = {"series_{:03d}".format(i): base * (1 + i / args.series) for i in range(args.series)}
+    print("| workers | tasks | results |    wall | results/s | per core | busy | resume plan |")
+    print("|--------:|------:|--------:|--------:|----------:|---------:|-----:|------------:|")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as root:
+            store_dir, index_dir = os.path.join(root, "store"), os.path.join(root, "index")
+            tasks = precompute.plan(series, store_dir=store_dir, index_dir=index_dir)
+            summary = precompute.run(tasks, workers)
+            start = time.perf_counter()
+            assert not precompute.plan(series, store_dir=store_dir, index_dir=index_dir)
+            resume = time.perf_counter() - start
+        print("| {:7d} | {:5d} | {:7d} | {:5.2f} s | {:9.1f} | {:8.1f} | {:3.0f}% | {:8.1f} ms |".format(
+            workers, summary["tasks"], summary["results"], summary["wall"], summary["per_second"],
+            summary["per_core"], 100 * summary["cpu"] / (summary["wall"] * workers), resume * 1e3))
+
+
+if __name__ == "__main__":
+    main()
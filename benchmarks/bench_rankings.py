@@ -0,0 +1,73 @@
+""""Calculate Top 10": sorting per click vs. the precomputed rankings.
+
+The old path is what on_click_calc did on every click: sort both series' impacts
+by the 7 and 14 day differences, build the two bar traces and convert four
+tables with to_dict('records'). The new path slices the records kept by
+rankings.Rankings and reuses the cached bar patches. Both are timed without
+the JSON encoding Dash does afterwards, which is also shown.
+
+    python benchmarks/bench_rankings.py
+"""
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import plotly.graph_objects as go  # noqa: E402
+import plotly.utils  # noqa: E402
+
+import app  # noqa: E402
+from impacts import impact_table, top_impacts  # noqa: E402
+
+
+def best(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def old():
+    out = []
+    for series, value_col in [("covid", "MA Cases"), ("subway", "MA Entries")]:
+        impacts = app.series_impacts(series, value_col).impacts
+        top7, top14 = top_impacts(impacts, 7), top_impacts(impacts, 14)
+        out.append(app.append_traces(go.Bar(x=top7["Date"].head(10), y=top7["Abs 14 day Difference"].head(10),
+                                            name="Top 10 Event Impacts")))
+        out.append(impact_table(top7, 7).to_dict('records'))
+        out.append(impact_table(top14, 14).to_dict('records'))
+    return out
+
+
+def new():
+    rankings = app.load_rankings()
+    out = []
+    for series in ("covid", "subway"):
+        out.append(app.top_impacts_patch(series))
+        out.append(rankings.records(series, 7))
+        out.append(rankings.records(series, 14))
+    return out
+
+
+def encode(out):
+    return json.dumps(out, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def main():
+    app.warm_changepoints()
+    old_out, new_out = old(), new()
+    assert encode(old_out) == encode(new_out)
+    print("| path           | build      | JSON encode |")
+    print("|:---------------|-----------:|------------:|")
+    for name, fn, out in [("sort per click", old, old_out), ("rankings", new, new_out)]:
+        print("| {:14s} | {:7.1f} µs | {:8.1f} µs |".format(name, best(fn, 20) * 1e6,
+                                                            best(lambda: encode(out), 50) * 1e6))
+    rankings = app.load_rankings()
+    print("\nranking payload, first / cached: {:.1f} µs / {:.2f} µs".format(
+        best(lambda: (rankings.payload.cache_clear(), rankings.payload("covid", 7, 10)), 200) * 1e6,
+        best(lambda: rankings.payload("covid", 7, 10), 2000) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
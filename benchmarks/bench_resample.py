@@ -0,0 +1,64 @@
+"""Chart payloads: every point vs. resampled to the chart width.
+
+A series of ``--points`` values a minute apart (rt_subway's moving average,
+interpolated and noised) is put in a one-line figure dict with datetime x, as
+``to_plotly_json()`` gives it for the change point and events charts. For each
+size this measures the JSON a callback would send (encoded with plotly's
+encoder, like Dash) with every point; resampled to RESAMPLE_POINTS with
+resample.lttb, the first time (dates to positions) and again (positions
+cached); with resample.minmax; and the resample patch of a one-day zoom. Times
+include resampling and encoding.
+
+    python benchmarks/bench_resample.py --points 100000 1000000 5000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import resample  # noqa: E402
+
+
+def series(points):
+    base = pd.read_csv(os.path.join(ROOT, "rt_subway.csv"))["MA Entries"].values
+    t = np.linspace(0, len(base) - 1, points)
+    values = np.interp(t, np.arange(len(base)), base) * (1 + 0.05 * np.random.default_rng(0).standard_normal(points))
+    return pd.date_range("2020-03-01", periods=points, freq="min"), values
+
+
+def encoded(fn):
+    start = time.perf_counter()
+    body = json.dumps(fn(), cls=PlotlyJSONEncoder)
+    return len(body), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[100000, 1000000, 5000000])
+    args = parser.parse_args()
+    print("| points  | all points          | lttb, first       | lttb, cached      | minmax            | 1 day zoom        |")
+    print("|--------:|--------------------:|------------------:|------------------:|------------------:|------------------:|")
+    for points in args.points:
+        dates, values = series(points)
+        figure = {"data": [{"type": "scatter", "mode": "lines", "x": dates.to_pydatetime().tolist(), "y": values}],
+                  "layout": {}}
+        day = {"xaxis.range[0]": str(dates[points // 2]), "xaxis.range[1]": str(dates[points // 2] + pd.Timedelta(days=1))}
+        cells = [encoded(lambda: figure),
+                 encoded(lambda: resample.resample_figure(figure, method="lttb")),
+                 encoded(lambda: resample.resample_figure(figure, method="lttb")),
+                 encoded(lambda: resample.resample_figure(figure, method="minmax")),
+                 encoded(lambda: resample.zoom_patch(figure, day))]
+        print("| {:7d} | ".format(points) + " | ".join(
+            "{:7.1f} KB {:6.0f} ms".format(size / 1024, seconds * 1e3) for size, seconds in cells) + " |")
+
+
+if __name__ == "__main__":
+    main()
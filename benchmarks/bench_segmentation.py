@@ -0,0 +1,81 @@
+"""Compare segmentation.L2Dynp against rpt.Dynp(model="l2") across series lengths.
+
+Every timed run also checks that both return the same breakpoints, on longer
+series than the tests in tests/test_segmentation.py run:
+
+    python benchmarks/bench_segmentation.py
+    python benchmarks/bench_segmentation.py --lengths 363 1000 2000 --ruptures-max 500
+    python benchmarks/bench_segmentation.py --all-k   # every K on the bundled series
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import ruptures as rpt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from segmentation import L2Dynp  # noqa: E402
+
+BUNDLED = [("covid_preds.csv", "MA Cases"), ("subway_preds.csv", "MA Entries")]
+
+
+def synthetic(n, n_regimes=8, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = np.sort(rng.choice(np.arange(1, n), size=min(n_regimes, n - 1) - 1, replace=False))
+    means = rng.normal(scale=10.0, size=len(bounds) + 1)
+    return np.repeat(means, np.diff(np.r_[0, bounds, n])) + rng.normal(size=n)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_lengths(lengths, n_bkps, jump, ruptures_max):
+    print("{:>7} {:>12} {:>12} {:>9} {:>6}".format("n", "ruptures s", "L2Dynp s", "speedup", "same"))
+    for n in lengths:
+        signal = synthetic(n)
+        ours, t_ours = timed(lambda: L2Dynp(jump=jump).fit(signal).predict(n_bkps))
+        if n <= ruptures_max:
+            theirs, t_theirs = timed(lambda: rpt.Dynp(model="l2", jump=jump).fit(signal).predict(n_bkps))
+            print("{:>7} {:>12.4f} {:>12.4f} {:>8.1f}x {:>6}".format(
+                n, t_theirs, t_ours, t_theirs / t_ours, str(theirs == ours)))
+            if theirs != ours:
+                sys.exit("breakpoints differ for n={}: {} != {}".format(n, theirs, ours))
+        else:
+            print("{:>7} {:>12} {:>12.4f} {:>9} {:>6}".format(n, "-", t_ours, "-", "-"))
+
+
+def check_all_k(max_bkps):
+    for path, column in BUNDLED:
+        signal = pd.read_csv(os.path.join(ROOT, path))[column].values
+        ours, t_ours = timed(lambda: L2Dynp(jump=1).fit(signal).predict_all(max_bkps))
+        algo = rpt.Dynp(model="l2", jump=1).fit(signal)
+        theirs, t_theirs = timed(lambda: {k: algo.predict(k) for k in range(max_bkps, 0, -1)})
+        mismatched = [k for k in theirs if theirs[k] != ours[k]]
+        print("{}: K=1..{} ruptures {:.2f}s, L2Dynp {:.3f}s, mismatched K: {}".format(
+            path, max_bkps, t_theirs, t_ours, mismatched or "none"))
+        if mismatched:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 200, 363, 730, 1460, 2920])
+    parser.add_argument("--n-bkps", type=int, default=5)
+    parser.add_argument("--jump", type=int, default=1)
+    parser.add_argument("--ruptures-max", type=int, default=730,
+                        help="skip ruptures above this length, it is quadratic in pure Python")
+    parser.add_argument("--all-k", action="store_true",
+                        help="check every K = 1..160 on the bundled series instead")
+    args = parser.parse_args()
+    if args.all_k:
+        check_all_k(160)
+    else:
+        bench_lengths(args.lengths, args.n_bkps, args.jump, args.ruptures_max)
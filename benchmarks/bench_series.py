@@ -0,0 +1,80 @@
+"""Series registry: startup and memory with many series, few of them viewed.
+
+Writes ``--series`` synthetic daily series (rt_covid's moving average, scaled) to
+a temporary SERIES_DIR and, in a fresh interpreter each, imports app with it and
+then views ``--views`` of the series pages (page plus the binary segmentation
+figure). The eager columns load every series up front, what describing series
+in code used to mean. Memory is the peak resident set size of the process.
+
+    python benchmarks/bench_series.py --series 100 1000 5000 --views 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+client = app.server.test_client()
+names = [s.name for s in app.SERIES if not s.events]
+
+def post(body):
+    assert client.post("/_dash-update-component", json=body).status_code == 200
+
+start = time.perf_counter()
+if EAGER:
+    for name in names:
+        app.SERIES.load(name)
+for name in names[:VIEWS]:
+    post({"output": "page-content.children", "outputs": {"id": "page-content", "property": "children"},
+          "inputs": [{"id": "url", "property": "pathname", "value": "/series/" + name}],
+          "changedPropIds": ["url.pathname"]})
+    ids = lambda kind: {"series": name, "type": "series-" + kind}
+    post({"output": '{"series":["MATCH"],"type":"series-chart"}.figure',
+          "outputs": {"id": ids("chart"), "property": "figure"},
+          "inputs": [{"id": ids("filter"), "property": "value", "value": 5},
+                     {"id": ids("method"), "property": "value", "value": "binseg"},
+                     {"id": ids("penalty"), "property": "value", "value": None}],
+          "changedPropIds": [json.dumps(ids("filter"), separators=(",", ":")) + ".value"]})
+viewed = time.perf_counter() - start
+print(json.dumps({"import": imported, "views": viewed, "peak": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def run(directory, n, views, eager):
+    # eager keeps every series, as the old module level frames did
+    env = dict(os.environ, SERIES_DIR=directory, SERIES_CACHE_SIZE=str(n if eager else max(views, 1)))
+    code = PROBE.replace("EAGER", str(eager)).replace("VIEWS", str(views))
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--series", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--views", type=int, default=10)
+    args = parser.parse_args()
+    base = pd.read_csv(os.path.join(ROOT, "rt_covid.csv"))
+    print("| series | import  | view {:<3d} pages | peak RSS    | eager: load all + view | eager peak |".format(args.views))
+    print("|-------:|--------:|---------------:|------------:|-----------------------:|-----------:|")
+    for n in args.series:
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(n):
+                frame = pd.DataFrame({"Date": base["date_of_interest"], "MA Cases": base["MA Cases"] * (1 + i / n)})
+                frame.to_csv(os.path.join(directory, "series_{:05d}.csv".format(i)), index=False)
+            lazy, eager = run(directory, n, args.views, False), run(directory, n, args.views, True)
+        print("| {:6d} | {:5.2f} s | {:12.2f} s | {:8.1f} MB | {:20.2f} s | {:7.1f} MB |".format(
+            n, lazy["import"], lazy["views"], lazy["peak"] / 1024, eager["views"], eager["peak"] / 1024))
+
+
+if __name__ == "__main__":
+    main()
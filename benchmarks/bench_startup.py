@@ -0,0 +1,52 @@
+"""Cold start of app.py: import time and time to first response.
+
+Each run is a fresh interpreter that imports app, then asks the Flask test client
+for "/" (the index HTML plus the display_page callback for "/") and afterwards for
+the change point page. Reported numbers are medians over the runs.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.server.test_client()
+
+def page(path):
+    body = {"output": "page-content.children", "outputs": {"id": "page-content", "property": "children"},
+            "inputs": [{"id": "url", "property": "pathname", "value": path}], "changedPropIds": ["url.pathname"]}
+    assert client.post("/_dash-update-component", json=body).status_code == 200
+
+client.get("/")
+page("/")
+first = time.perf_counter()
+page("/changepoints")
+changepoints = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_response": first - start,
+                  "changepoints_page": changepoints - first}))
+"""
+
+
+def run_once():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, check=True,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    results = [run_once() for _ in range(args.runs)]
+    for key in ("import", "first_response", "changepoints_page"):
+        print("{:<18} {:.3f} s".format(key, statistics.median(r[key] for r in results)))
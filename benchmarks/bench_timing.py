@@ -0,0 +1,78 @@
+"""Cost of the callback timings (timing.py): requests with CALLBACK_TIMING on and off.
+
+Sends the same callbacks ``--requests`` times through the Flask test client in
+fresh interpreters with CALLBACK_TIMING=0 and 1, alternating for ``--rounds``
+rounds, and compares the best medians of each: the /events page from the
+response cache, and with the cache off (CALLBACK_CACHE_SIZE=0) the /events page
+and the server side Dynp figure for K=40 (CLIENTSIDE_CHANGEPOINTS=0). Prints the
+Server-Timing header of each.
+
+    python benchmarks/bench_timing.py --requests 500 --rounds 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_callback_cache import figure_body, page_body  # noqa: E402
+
+CASES = [("/events page, cached", "512", page_body("/events")),
+         ("/events page", "0", page_body("/events")),
+         ("Dynp figure, K=40", "0", figure_body(40))]
+
+
+def probe(requests):
+    # in a fresh interpreter, with the environment set by main
+    import app
+
+    app.warm_changepoints()
+    app.warm_pages()
+    client = app.server.test_client()
+    body = CASES[int(os.environ["BENCH_CASE"])][2]
+    response = client.post("/_dash-update-component", json=body)
+    times = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.post("/_dash-update-component", json=body)
+        times.append(time.perf_counter() - start)
+    print(json.dumps({"median": statistics.median(times), "header": response.headers.get("Server-Timing")}))
+
+
+def run(case, enabled, requests):
+    env = dict(os.environ, BENCH_CASE=str(case), CALLBACK_TIMING=enabled, CLIENTSIDE_CHANGEPOINTS="0",
+               CALLBACK_CACHE_SIZE=CASES[case][1])
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--probe", "--requests", str(requests)],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        return probe(args.requests)
+    headers = []
+    print("| callback             | timing off | timing on | overhead |")
+    print("|:---------------------|-----------:|----------:|---------:|")
+    for case, (name, _, _) in enumerate(CASES):
+        rounds = [(run(case, "0", args.requests), run(case, "1", args.requests)) for _ in range(args.rounds)]
+        off = min(result["median"] for result, _ in rounds)
+        on = min(result["median"] for _, result in rounds)
+        print("| {:20s} | {:7.3f} ms | {:6.3f} ms | {:5.0f} us |".format(name, off * 1e3, on * 1e3, (on - off) * 1e6))
+        headers.append((name, rounds[-1][1]["header"]))
+    print()
+    for name, header in headers:
+        print("{}: {}".format(name, header))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Per-worker memory of `gunicorn app:server` with and without preloading (Linux only).
+
+Starts gunicorn with N workers for each mode, sends every page and a few
+callbacks through each worker, then reads /proc/<pid>/smaps_rollup. PSS splits
+shared pages between the processes mapping them, so the PSS total is what the
+whole server really costs.
+
+    python benchmarks/bench_worker_rss.py --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["/", "/events", "/changepoints", "/daily-data", "/team"]
+
+
+def post(url, body):
+    request = urllib.request.Request(url + "/_dash-update-component", data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return response.read()
+
+
+def exercise(url, rounds):
+    for _ in range(rounds):
+        urllib.request.urlopen(url + "/").read()
+        for path in PAGES:
+            post(url, {"output": "page-content.children",
+                       "outputs": {"id": "page-content", "property": "children"},
+                       "inputs": [{"id": "url", "property": "pathname", "value": path}],
+                       "changedPropIds": ["url.pathname"]})
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open("/proc/{}/stat".format(entry)) as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError):
+                pass
+    return found
+
+
+def memory(pid):
+    fields = {}
+    with open("/proc/{}/smaps_rollup".format(pid)) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return fields
+
+
+def measure(preload, workers, port, rounds):
+    env = dict(os.environ, GUNICORN_PRELOAD="1" if preload else "0")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "app:server", "-w", str(workers),
+                               "-b", "127.0.0.1:{}".format(port)], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = "http://127.0.0.1:{}".format(port)
+    try:
+        for _ in range(600):
+            try:
+                urllib.request.urlopen(url + "/").read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        exercise(url, rounds)
+        time.sleep(1)
+        master = memory(server.pid)
+        per_worker = [memory(pid) for pid in children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return master, per_worker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    print("{:<11} {:>12} {:>12} {:>14} {:>15} {:>11}".format(
+        "mode", "worker RSS", "worker PSS", "worker shared", "worker private", "total PSS"))
+    for preload in (False, True):
+        master, workers = measure(preload, args.workers, args.port, args.rounds)
+        avg = {key: sum(w.get(key, 0) for w in workers) / len(workers)
+               for key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")}
+        total = master["Pss"] + sum(w["Pss"] for w in workers)
+        print("{:<11} {:>9.1f} MB {:>9.1f} MB {:>11.1f} MB {:>12.1f} MB {:>8.1f} MB".format(
+            "preload" if preload else "no preload", avg["Rss"], avg["Pss"],
+            avg["Shared_Clean"] + avg["Shared_Dirty"], avg["Private_Clean"] + avg["Private_Dirty"], total))
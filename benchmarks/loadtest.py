@@ -0,0 +1,336 @@
+"""Load test: concurrent users replaying Dash callback traffic against gunicorn.
+
+Starts ``gunicorn app:server`` (with gunicorn.conf.py, so preloaded) for every
+combination of ``--workers`` and ``--threads``, and has ``--users`` threads send
+visits to it for ``--duration`` seconds, each waiting for its answer before the
+next request (plus ``--think`` seconds on average, 0 for as fast as it answers).
+A visit is what a browser sends, built from the server's own
+``/_dash-dependencies`` so the bodies match the callbacks it registered:
+
+* the page, ``/_dash-layout`` and ``/_dash-dependencies``
+* page navigations through ``url.pathname``
+* on /events a calendar pick, "calculate" and "clear" (on_click_calc)
+* on /changepoints, for both series, dropdown changes of K and the detector;
+  with CLIENTSIDE_CHANGEPOINTS the Dynp ones never reach the server, the others
+  are the ``*-chart-request`` callbacks, otherwise every change asks for a figure
+
+Instead of generated visits, ``--replay`` sends requests recorded from a real
+browser with ``--record``, which proxies ``--listen`` to ``--url`` and writes every
+page and ``/_dash-*`` request going through:
+
+    python benchmarks/loadtest.py --workers 1 2 4 --threads 1 4 --users 16 --duration 30
+    python benchmarks/loadtest.py --record visits.jsonl --url http://127.0.0.1:8050 --listen 8051
+    python benchmarks/loadtest.py --replay visits.jsonl --workers 2 --threads 4
+    python benchmarks/loadtest.py --url http://127.0.0.1:8050 --users 8    # a running server
+
+Reports throughput, latency percentiles and the share of errors (HTTP 4xx/5xx,
+refused or timed out requests), overall and with ``--by-request`` per request.
+The first ``--warmup`` seconds are not counted. The users are threads of this
+process, so on a small machine they take CPU from the server they load.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPDATE = "/_dash-update-component"
+RECORDED = ("/", "/_dash-layout", "/_dash-dependencies", UPDATE)
+HEADERS = {"Content-Type": "application/json", "Accept-Encoding": "gzip, deflate, br"}
+PAGES = ["/", "/events", "/changepoints", "/daily-data", "/team"]
+SERIES = {"covid": "", "subway": "subway-"}
+METHODS = ["dynp", "dynp", "binseg", "pelt"]
+# dates the calendar offers
+FIRST_DAY, DAYS = datetime.date(2020, 3, 1), 480
+
+
+def key(item):
+    return "{}.{}".format(item["id"], item["property"])
+
+
+def outputs(output):
+    # "..a.b...c.d.." for several outputs, "a.b" for one
+    def split(spec):
+        component, prop = spec.rsplit(".", 1)
+        return {"id": component, "property": prop}
+    if output.startswith(".."):
+        return [split(spec) for spec in output[2:-2].split("...")]
+    return split(output)
+
+
+def label(method, path, body):
+    # what fired a callback, and the page for navigations
+    if body is None:
+        return method + " " + path
+    changed = (body.get("changedPropIds") or ["?"])[0]
+    if changed == "url.pathname":
+        return "{} {}".format(changed, next(item.get("value") for item in body["inputs"] if key(item) == changed))
+    return changed
+
+
+class Callbacks:
+    """Request bodies for the server side callbacks in ``/_dash-dependencies``."""
+
+    def __init__(self, dependencies):
+        self.by_input = {}
+        for dependency in dependencies:
+            if dependency.get("clientside_function"):
+                continue
+            for item in dependency["inputs"]:
+                self.by_input.setdefault(key(item), dependency)
+
+    def body(self, changed, values):
+        """The body of the callback fired by ``changed`` ("id.property"), with
+        ``values`` by "id.property" (None for the rest); None when no server
+        callback listens to it."""
+        dependency = self.by_input.get(changed)
+        if dependency is None:
+            return None
+
+        def filled(items):
+            return [dict(item, value=values.get(key(item))) for item in items]
+        return {"output": dependency["output"], "outputs": outputs(dependency["output"]),
+                "inputs": filled(dependency["inputs"]), "state": filled(dependency.get("state", [])),
+                "changedPropIds": [changed]}
+
+
+def visit(callbacks, rng):
+    """The requests of one generated visit, as (label, method, path, body)."""
+    for path in ("/", "/_dash-layout", "/_dash-dependencies"):
+        yield label("GET", path, None), "GET", path, None
+    values = {"calculate-btn.n_clicks": 0, "clear-btn.n_clicks": 0}
+
+    def fire(changed, **changes):
+        values.update(changes)
+        body = callbacks.body(changed, values)
+        if body is not None:
+            yield label("POST", UPDATE, body), "POST", UPDATE, body
+
+    for page in rng.sample(PAGES, len(PAGES)):
+        yield from fire("url.pathname", **{"url.pathname": page})
+        if page == "/events":
+            day = FIRST_DAY + datetime.timedelta(days=rng.randrange(DAYS))
+            yield from fire("calendar-date-picker.date", **{"calendar-date-picker.date": day.isoformat()})
+            values["calculate-btn.n_clicks"] += 1
+            yield from fire("calculate-btn.n_clicks")
+            values["clear-btn.n_clicks"] += 1
+            yield from fire("clear-btn.n_clicks")
+        elif page == "/changepoints":
+            for name, prefix in SERIES.items():
+                for _ in range(3):
+                    control = rng.choice(["change-point-filter", "change-point-method"])
+                    changes = {prefix + "change-point-filter.value": rng.randint(1, 159),
+                               prefix + "change-point-method.value": rng.choice(METHODS),
+                               prefix + "change-point-penalty.value": None}
+                    changed = prefix + control + ".value"
+                    if callbacks.body(changed, {}) is not None:
+                        # the figure is drawn on the server
+                        yield from fire(changed, **changes)
+                    elif changes[prefix + "change-point-method.value"] != "dynp":
+                        # what assets/changepoints.js sends for the other detectors
+                        request = {"method": changes[prefix + "change-point-method.value"],
+                                   "n_bkps": changes[prefix + "change-point-filter.value"], "penalty": None}
+                        yield from fire(name + "-chart-request.data", **{name + "-chart-request.data": request})
+
+
+def generated(url, seed):
+    with urllib.request.urlopen(url + "/_dash-dependencies") as response:
+        callbacks = Callbacks(json.load(response))
+    rng = random.Random(seed)
+    while True:
+        yield from visit(callbacks, rng)
+
+
+def replayed(path, seed):
+    with open(path) as f:
+        requests = [json.loads(line) for line in f if line.strip()]
+    # every user starts somewhere else in the recording
+    start = random.Random(seed).randrange(len(requests))
+    while True:
+        for request in requests[start:] + requests[:start]:
+            body = request.get("body")
+            yield label(request["method"], request["path"], body), request["method"], request["path"], body
+        start = 0
+
+
+def user(url, requests, deadline, think, seed, results):
+    target = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+    rng = random.Random(seed)
+    for label, method, path, body in requests:
+        start = time.perf_counter()
+        if start >= deadline:
+            break
+        try:
+            connection.request(method, path, body=None if body is None else json.dumps(body), headers=HEADERS)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = None
+            connection.close()
+        results.append((start, label, status, time.perf_counter() - start))
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+    connection.close()
+
+
+def load(url, requests, users, duration, think, warmup):
+    """Run ``users`` users on ``requests(seed)``; returns the counted results
+    (start, label, status, seconds) and the seconds they cover."""
+    results = []
+    start = time.perf_counter()
+    deadline = start + warmup + duration
+    threads = [threading.Thread(target=user, args=(url, requests(seed), deadline, think, seed, results))
+               for seed in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counted = [result for result in results if result[0] >= start + warmup]
+    return counted, time.perf_counter() - start - warmup
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else float("nan")
+
+
+def summary(results, seconds):
+    latencies = sorted(result[3] for result in results)
+    errors = sum(1 for result in results if result[2] is None or result[2] >= 400)
+    return {"requests": len(results), "per_second": len(results) / seconds if seconds else 0.0,
+            "p50": percentile(latencies, 0.5), "p90": percentile(latencies, 0.9),
+            "p99": percentile(latencies, 0.99), "max": latencies[-1] if latencies else float("nan"),
+            "errors": errors / len(results) if results else 0.0}
+
+
+def row(name, stats):
+    return "| {:34s} | {:8d} | {:7.1f} | {:7.1f} | {:7.1f} | {:7.1f} | {:8.1f} | {:6.2%} |".format(
+        name, stats["requests"], stats["per_second"], stats["p50"] * 1e3, stats["p90"] * 1e3, stats["p99"] * 1e3,
+        stats["max"] * 1e3, stats["errors"])
+
+
+HEADER = ["| {:34s} | requests |   req/s |  p50 ms |  p90 ms |  p99 ms |   max ms | errors |",
+          "|:-----------------------------------|---------:|--------:|--------:|--------:|--------:|---------:|-------:|"]
+
+
+def serve(workers, threads, port):
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "app:server", "-w", str(workers),
+                               "--threads", str(threads), "-b", "127.0.0.1:{}".format(port)],
+                              cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = "http://127.0.0.1:{}".format(port)
+    for _ in range(1200):
+        try:
+            urllib.request.urlopen(url + "/").read()
+            return server, url
+        except OSError:
+            if server.poll() is not None:
+                raise SystemExit("gunicorn exited with status {}".format(server.returncode))
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("gunicorn did not answer in 120 s")
+
+
+def record(url, listen, path):
+    """Proxy http://127.0.0.1:``listen`` to ``url``, appending the page and Dash
+    requests to ``path`` as JSON lines."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    lock = threading.Lock()
+    out = open(path, "a")
+
+    class Proxy(BaseHTTPRequestHandler):
+        def forward(self):
+            data = self.rfile.read(int(self.headers.get("Content-Length") or 0)) or None
+            headers = {name: value for name, value in self.headers.items() if name.lower() not in ("host", "connection")}
+            request = urllib.request.Request(url + self.path, data=data, headers=headers, method=self.command)
+            try:
+                response = urllib.request.urlopen(request)
+            except urllib.error.HTTPError as error:
+                response = error
+            body = response.read()
+            self.send_response(response.status)
+            for name, value in response.headers.items():
+                if name.lower() not in ("connection", "transfer-encoding", "content-length"):
+                    self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            if self.path.split("?")[0] in RECORDED:
+                with lock:
+                    out.write(json.dumps({"method": self.command, "path": self.path,
+                                          "body": json.loads(data) if data else None}) + "\n")
+                    out.flush()
+
+        do_GET = do_POST = forward
+
+        def log_message(self, *args):
+            pass
+
+    print("recording to {}: browse http://127.0.0.1:{}/ (Ctrl-C to stop)".format(path, listen))
+    try:
+        ThreadingHTTPServer(("127.0.0.1", listen), Proxy).serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds counted per server setup")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds run before counting")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds between a user's requests")
+    parser.add_argument("--url", help="load this running server instead of starting gunicorn")
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--replay", help="send the requests recorded in this file instead of generated visits")
+    parser.add_argument("--record", help="record the requests proxied from --listen to --url into this file")
+    parser.add_argument("--listen", type=int, default=8051)
+    parser.add_argument("--by-request", action="store_true", help="also report every kind of request")
+    args = parser.parse_args()
+    if args.record:
+        if not args.url:
+            parser.error("--record needs --url")
+        return record(args.url.rstrip("/"), args.listen, args.record)
+    setups = [(None, None)] if args.url else [(w, t) for w in args.workers for t in args.threads]
+    reports = []
+    print(HEADER[0].format("server"))
+    print(HEADER[1])
+    for workers, threads in setups:
+        server, url = (None, args.url.rstrip("/")) if args.url else serve(workers, threads, args.port)
+        try:
+            if args.replay:
+                requests = lambda seed: replayed(args.replay, seed)  # noqa: E731
+            else:
+                requests = lambda seed: generated(url, seed)  # noqa: E731
+            results, seconds = load(url, requests, args.users, args.duration, args.think, args.warmup)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        name = url if workers is None else "{} workers x {} threads".format(workers, threads)
+        print(row(name, summary(results, seconds)))
+        reports.append((name, results, seconds))
+    if args.by_request:
+        for name, results, seconds in reports:
+            print("\n" + name + "\n")
+            print(HEADER[0].format("request"))
+            print(HEADER[1])
+            for label in sorted({result[1] for result in results}):
+                print(row(label, summary([result for result in results if result[1] == label], seconds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Benchmark suite: callbacks, change point fitting, figures and startup, against a baseline.
+
+Every scale runs in a fresh interpreter against its own copy of the bundled CSVs,
+with the series grown ``scale`` times (earlier copies of the same days prepended,
+as in bench_daily.py), and its own snapshot, event store and change point index
+(DATA_DIR and the *_DIR variables), so runs share nothing with each other or with
+the checkout. The cases call the app's functions directly:
+
+* ``import app`` and the first "/" response (fresh interpreters, scale 1 only)
+* loading the data from the CSVs and from the snapshot
+* the Dynp fit behind the change point index, every K for both series
+* update_covid / update_subway for K = 1..159, Dynp (from the index) and binary
+  segmentation (a fit per K)
+* on_click_calc: a date pick, "calculate" the first time and again, "clear"
+* building and encoding the events, change point and daily figures as Dash does
+
+Times are medians of ``--repeat`` runs (one run for cases over ``SLOW`` seconds);
+peak memory is the tracemalloc peak of one more run. Cases that need an exact Dynp
+fit are skipped above ``--max-dynp-rows`` rows: the fit is quadratic in the length,
+minutes at 10x and hours at 100x.
+
+    python benchmarks/suite.py --save-baseline     # record benchmarks/baseline.json
+    python benchmarks/suite.py --compare           # exit status 1 on a regression
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# every dated source and its date column; the events are copied as they are
+DATED_SOURCES = {"covid_preds.csv": "Date", "subway_preds.csv": "Date",
+                 "rt_covid.csv": "date_of_interest", "rt_subway.csv": "Date"}
+SLOW = 5.0
+STATE_DIRS = ["SNAPSHOT_DIR", "EVENT_STORE_DIR", "CP_INDEX_DIR", "CP_STORE_DIR", "ONLINE_CP_DIR", "DAILY_DROP_DIR"]
+IMPORT_PROBE = r"""
+import json, sys, time, tracemalloc
+if sys.argv[1] == "memory":
+    tracemalloc.start()
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+client = app.server.test_client()
+client.get("/")
+assert client.post("/_dash-update-component", json={
+    "output": "page-content.children", "outputs": {"id": "page-content", "property": "children"},
+    "inputs": [{"id": "url", "property": "pathname", "value": "/"}], "changedPropIds": ["url.pathname"]}).status_code == 200
+first = time.perf_counter() - start
+print(json.dumps({"import": imported, "first": first,
+                  "peak": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0}))
+"""
+
+
+def grown(frame, column, scale):
+    """``frame`` with ``scale - 1`` earlier copies of itself before it, dated back to back."""
+    import pandas as pd
+
+    dates = pd.to_datetime(frame[column])
+    span = dates.iloc[-1] - dates.iloc[0] + pd.Timedelta(days=1)
+    copies = [frame.assign(**{column: (dates - span * k).dt.strftime("%Y-%m-%d")}) for k in range(scale - 1, -1, -1)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def write_data(directory, scale):
+    import pandas as pd
+
+    os.makedirs(directory, exist_ok=True)
+    for source, column in DATED_SOURCES.items():
+        frame = pd.read_csv(os.path.join(ROOT, source))
+        grown(frame, column, scale).to_csv(os.path.join(directory, source), index=False)
+    shutil.copy(os.path.join(ROOT, "jhu_events.csv"), directory)
+
+
+def environment(directory):
+    env = dict(os.environ, DATA_DIR=os.path.join(directory, "data"))
+    for name in STATE_DIRS:
+        env[name] = os.path.join(directory, name.lower())
+    env.pop("CALLBACK_CACHE_DIR", None)
+    return env
+
+
+def measure(run, setup=None, repeat=3, slow=SLOW):
+    times, size = [], None
+    # a case slower than ``slow`` seconds is timed once
+    while len(times) < repeat and not (times and times[0] > slow):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        out = run()
+        times.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if isinstance(out, (str, bytes)):
+        size = len(out)
+    return {"time": statistics.median(times), "peak": peak, "bytes": size}
+
+
+def cases(max_dynp_rows):
+    """(name, run, setup) of every case, against the data in DATA_DIR."""
+    import flask
+    from plotly.utils import PlotlyJSONEncoder
+
+    import app
+    import data
+    import detectors
+    from changepoint_index import CACHE_DIR, ChangePointIndex
+    from resample import resample_figure
+
+    frames, index = app.load_data()
+    rows = len(frames["covid"])
+    ks = range(1, 160)
+    calc = app.on_click_calc.__wrapped__
+
+    def clicked(prop_id, n_clicks, clear, date):
+        with app.server.test_request_context():
+            flask.g.triggered_inputs = [{"prop_id": prop_id, "value": None}]
+            return calc(n_clicks, clear, date)
+
+    def encoded(figure):
+        return json.dumps(figure, cls=PlotlyJSONEncoder)
+
+    yield "load data: CSV", data.prepare_frames, None
+    yield "load data: snapshot", data.load_frames, None
+    if rows <= max_dynp_rows:
+        # a fresh index on the app's cache directory, so every run fits both series
+        # from scratch and leaves the breakpoints where the Dynp cases below read them
+        fitter = ChangePointIndex(cache_dir=CACHE_DIR)
+        series = [frames[s.name][s.value].values for s in app.SERIES.event_series()]
+
+        def unfitted():
+            shutil.rmtree(CACHE_DIR, ignore_errors=True)
+            fitter.clear()
+
+        def fit():
+            for values in series:
+                fitter.all_breakpoints(values)
+
+        yield "fit change points: Dynp, K=1..160", fit, unfitted
+        app.warm_changepoints()
+        for update in app.updates.values():
+            yield "{}: dynp, K=1..159".format(update.__name__), lambda update=update: [update(k) for k in ks], None
+    for update in app.updates.values():
+        yield ("{}: binseg, K=1..159".format(update.__name__),
+               lambda update=update: [update(k, "binseg") for k in ks], detectors._detect.cache_clear)
+    if rows <= max_dynp_rows:
+        def cold():
+            for cached in (app.series_impacts, app.load_rankings, app.top_impacts_patch):
+                cached.cache_clear()
+
+        yield "on_click_calc: date pick", lambda: clicked("calendar-date-picker.date", 0, 0, "2020-06-01"), None
+        yield "on_click_calc: calculate, first", lambda: clicked("calculate-btn.n_clicks", 1, 0, None), cold
+        yield "on_click_calc: calculate", lambda: clicked("calculate-btn.n_clicks", 1, 0, None), None
+        yield "on_click_calc: clear", lambda: clicked("clear-btn.n_clicks", 1, 1, None), None
+    yield ("figure: events, build + encode", lambda: encoded(resample_figure(app.events_covid_figure())),
+           app.events_covid_figure.cache_clear)
+    yield "figure: change points, K=10 + encode", lambda: encoded(app.updates["covid"](10, "binseg")), None
+    yield ("figure: daily, build + encode",
+           lambda: encoded(resample_figure(app.build_rt_covid_figure(frames["rt_covid"]))), None)
+
+
+def probe(args):
+    # inside the fresh interpreter of one scale, whose state directories it may clear
+    if "DATA_DIR" not in os.environ:
+        raise SystemExit("--probe runs in the environment set up by run_scale")
+    import app
+
+    results = {"rows": len(app.load_data()[0]["covid"]), "cases": {}}
+    for name, run, setup in cases(args.max_dynp_rows):
+        results["cases"][name] = measure(run, setup, args.repeat)
+        print(name, file=sys.stderr)
+    print(json.dumps(results))
+
+
+def import_case(env, repeat):
+    def once(mode):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE, mode], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    timed = [once("time") for _ in range(repeat)]
+    peak = once("memory")["peak"]
+    return {"import app": {"time": statistics.median(t["import"] for t in timed), "peak": peak, "bytes": None},
+            "first response": {"time": statistics.median(t["first"] for t in timed), "peak": peak, "bytes": None}}
+
+
+def run_scale(scale, args):
+    with tempfile.TemporaryDirectory() as directory:
+        write_data(os.path.join(directory, "data"), scale)
+        env = environment(directory)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--probe", "--repeat", str(args.repeat),
+                              "--max-dynp-rows", str(args.max_dynp_rows)],
+                             cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True, check=True)
+        results = json.loads(out.stdout.strip().splitlines()[-1])
+        if scale == 1:
+            results["cases"] = dict(import_case(env, args.repeat), **results["cases"])
+    return results
+
+
+def compare(results, baseline, tolerance, noise):
+    """Rows of the report, and whether any case got slower or bigger than
+    ``tolerance`` times its baseline (and by more than ``noise`` seconds)."""
+    report, regressed = [], False
+    for scale, entry in results.items():
+        for name, now in entry["cases"].items():
+            before = baseline.get(scale, {}).get("cases", {}).get(name)
+            change = ""
+            if before:
+                ratio, memory = now["time"] / before["time"], now["peak"] / max(before["peak"], 1)
+                slower = ratio > tolerance and now["time"] - before["time"] > noise
+                bigger = memory > tolerance and now["peak"] - before["peak"] > 2 ** 20
+                change = "{:+.0%} time, {:+.0%} memory{}".format(ratio - 1, memory - 1,
+                                                                 " REGRESSION" if slower or bigger else "")
+                regressed = regressed or slower or bigger
+            report.append((name, scale, entry["rows"], now, before, change))
+    return report, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-dynp-rows", type=int, default=4000)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="exit with status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown or growth counted as a regression")
+    parser.add_argument("--noise", type=float, default=0.01, help="seconds below which a slowdown is noise")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        return probe(args)
+    results = {str(scale): run_scale(scale, args) for scale in args.scale}
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+    report, regressed = compare(results, baseline, args.tolerance, args.noise)
+    print("| case                                   | scale |  rows |         time | peak memory |     baseline | change |")
+    print("|:---------------------------------------|------:|------:|-------------:|------------:|-------------:|:-------|")
+    for name, scale, rows, now, before, change in report:
+        print("| {:38s} | {:>5s} | {:5d} | {:9.1f} ms | {:8.1f} MB | {:>12s} | {} |".format(
+            name, scale, rows, now["time"] * 1e3, now["peak"] / 2 ** 20,
+            "{:.1f} ms".format(before["time"] * 1e3) if before else "-", change))
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=1)
+    if args.compare and regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Response cache for pure Dash callbacks.
+
+Callbacks like ``update_covid`` or ``display_page`` always give the same answer
+for the same inputs, yet every request used to rebuild the figure and encode it
+to JSON again. For the callbacks registered here the serialized response of
+``/_dash-update-component`` is cached under a key made of the callback, its
+inputs, state and triggering props, and a version tag of the data and code. A
+repeated request is answered with those bytes before Dash runs anything.
+
+The memory tier is a cachetools LRU (or TTL, with ``CALLBACK_CACHE_TTL``) cache of
+``CALLBACK_CACHE_SIZE`` responses. With ``CALLBACK_CACHE_DIR`` set, entries
+evicted from memory spill to files there and are read back on a miss, which also
+shares them between workers. Responses carry the key as ETag, so a client that
+sends it back in If-None-Match gets a 304 without a body.
+"""
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+from cachetools import LRUCache, TTLCache
+
+from files import atomic_write
+
+CACHE_SIZE = int(os.environ.get("CALLBACK_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.environ.get("CALLBACK_CACHE_TTL", "0")) or None
+CACHE_DIR = os.environ.get("CALLBACK_CACHE_DIR") or None
+
+
+class _Spill:
+    # called with (key, value) for every entry evicted to make room
+    spill = None
+
+    def popitem(self):
+        key, value = super().popitem()
+        if self.spill is not None:
+            self.spill(key, value)
+        return key, value
+
+
+class _LRU(_Spill, LRUCache):
+    pass
+
+
+class _TTL(_Spill, TTLCache):
+    pass
+
+
+class CallbackCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, spill_dir=CACHE_DIR):
+        self.memory = _TTL(maxsize, ttl) if ttl else _LRU(maxsize)
+        self.spill_dir = spill_dir
+        if spill_dir:
+            self.memory.spill = self._spill
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(version, body):
+        """Cache key of a ``/_dash-update-component`` request body."""
+        request = {
+            "output": body.get("output"),
+            "inputs": _values(body.get("inputs", [])),
+            "state": _values(body.get("state", [])),
+            "changed": sorted(body.get("changedPropIds", [])),
+        }
+        blob = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha1((version + "\0" + blob).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            data = self.memory.get(key)
+        if data is None and self.spill_dir:
+            data = self._load(key)
+            if data is not None:
+                self.put(key, data)
+        with self.lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, key, data):
+        with self.lock:
+            self.memory[key] = data
+
+    def _path(self, key):
+        return os.path.join(self.spill_dir, key[:2], key + ".json")
+
+    def _spill(self, key, data):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with atomic_write(path, "wb") as f:
+                f.write(data)
+        except OSError:
+            pass
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+def files_version(root, patterns=("*.py", "*.csv")):
+    """Digest of the files matching ``patterns`` in ``root``: the data and the code."""
+    import glob
+
+    digest = hashlib.sha1()
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            digest.update(os.path.basename(path).encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _values(items):
+    # pattern matching callbacks send lists of inputs, keep them as they are
+    return [item if isinstance(item, list) else [item.get("id"), item.get("property"), item.get("value")]
+            for item in items]
+
+
+def register(app, callbacks, version, cache=None):
+    """Cache the responses of ``callbacks`` (the functions given to app.callback).
+
+    ``version()`` returns the data/code version tag that is part of every key.
+    Call this after the callbacks are registered.
+    """
+    import flask
+
+    cache = CallbackCache() if cache is None else cache
+    if cache.memory.maxsize <= 0:
+        # CALLBACK_CACHE_SIZE=0 turns the cache off
+        return cache
+    # app.callback returns its wrapper when used as a decorator, around the
+    # function or around timing.py's wrapper of it
+    wrapped = {inspect.unwrap(callback) for callback in callbacks}
+    outputs = {output for output, spec in app.callback_map.items()
+               if spec.get("callback") is not None and inspect.unwrap(spec["callback"]) in wrapped}
+    path = app.config.routes_pathname_prefix + "_dash-update-component"
+
+    @app.server.before_request
+    def cached_callback_response():
+        if flask.request.path != path or flask.request.method != "POST":
+            return None
+        body = flask.request.get_json(silent=True) or {}
+        if body.get("output") not in outputs:
+            return None
+        key = flask.g.callback_cache_key = cache.key(version(), body)
+        data = cache.get(key)
+        if data is None:
+            return None
+        return validated(flask.Response(data, mimetype="application/json"), key)
+
+    @app.server.after_request
+    def store_callback_response(response):
+        key = flask.g.pop("callback_cache_key", None)
+        if key is None or response.status_code != 200 or response.direct_passthrough:
+            return response
+        if response.get_etag()[0] is None:
+            # a fresh response, keep it (a cached one already has its ETag)
+            cache.put(key, response.get_data())
+            return validated(response, key)
+        return response
+
+    def validated(response, key):
+        # make_conditional only looks at GET and HEAD, callbacks are POSTs; a
+        # compressed variant comes back as "<key>:<encoding>" (compression.py)
+        response.set_etag(key)
+        if any(tag.split(":")[0] == key for tag in flask.request.if_none_match.as_set()):
+            return flask.Response(status=304, headers={"ETag": response.headers["ETag"]})
+        return response
+
+    return cache
@@ -0,0 +1,129 @@
+"""Precomputed change point breakpoints for every number of change points.
+
+The change point pages only ever ask for an l2 Dynp segmentation of a handful of
+series with K = 1..160 breakpoints, so instead of refitting on every request the
+breakpoints for every K are computed once per series (with ``segmentation.L2Dynp``
+for the l2 model), keyed by a hash of the series values, and persisted to disk so
+restarted workers only have to read them back.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from files import atomic_write
+from segmentation import BadSegmentationParameters, L2Dynp
+
+CACHE_DIR = os.environ.get(
+    "CP_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cp_index")
+)
+# the dropdowns go up to 159 and the events page asks for 160
+MAX_BKPS = 160
+
+
+def series_key(values, model="l2", jump=1, max_bkps=MAX_BKPS):
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    digest = hashlib.sha1(values.tobytes())
+    digest.update("{}:{}:{}:{}".format(model, jump, max_bkps, values.shape).encode())
+    return digest.hexdigest()
+
+
+class ChangePointIndex:
+    def __init__(self, cache_dir=CACHE_DIR, model="l2", jump=1, max_bkps=MAX_BKPS):
+        self.cache_dir = cache_dir
+        self.model = model
+        self.jump = jump
+        self.max_bkps = max_bkps
+        self._entries = {}
+        # ruptures memoizes Dynp.seg on the class, so fits must not interleave
+        self._lock = threading.Lock()
+
+    def breakpoints(self, values, n_bkps):
+        """Return the same list as ``rpt.Dynp(model, jump).fit(values).predict(n_bkps)``."""
+        entry = self.all_breakpoints(values)
+        try:
+            return list(entry[n_bkps])
+        except KeyError:
+            raise BadSegmentationParameters
+
+    def all_breakpoints(self, values):
+        key = series_key(values, self.model, self.jump, self.max_bkps)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._load(key)
+                    if entry is None:
+                        entry = self._fit(values)
+                        self._save(key, entry)
+                    self._entries[key] = entry
+        return entry
+
+    def client_payload(self, values, dates, max_bkps=MAX_BKPS - 1):
+        """Change point dates for every K in one compact structure for the browser.
+
+        The change points for K are ``dates[i]`` for ``i`` in
+        ``indices[offsets[K - 1]:offsets[K]]``.
+        """
+        entry = self.all_breakpoints(values)
+        offsets, indices = [0], []
+        for n_bkps in range(1, max_bkps + 1):
+            # the last breakpoint is the end of the series, not a change point
+            indices.extend(b for b in entry.get(n_bkps, ()) if b < len(dates))
+            offsets.append(len(indices))
+        return {"dates": list(dates), "offsets": offsets, "indices": indices}
+
+    def stored(self, values):
+        """Whether the breakpoints of ``values`` are on disk already."""
+        return os.path.exists(self._path(series_key(values, self.model, self.jump, self.max_bkps)))
+
+    def clear(self):
+        """Forget the breakpoints held in memory; the files on disk stay."""
+        with self._lock:
+            self._entries.clear()
+
+    def warm(self, *series):
+        for values in series:
+            self.all_breakpoints(values)
+
+    def _fit(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self.model == "l2":
+            # one pass of the vectorized program yields every K
+            solutions = L2Dynp(jump=self.jump).fit(values).predict_all(self.max_bkps)
+            return {k: tuple(bkps) for k, bkps in solutions.items()}
+        import ruptures as rpt
+        from ruptures.utils import sanity_check
+        algo = rpt.Dynp(model=self.model, jump=self.jump).fit(values)
+        entry = {}
+        # solving the largest K fills the memo for every smaller K as well
+        for n_bkps in range(self.max_bkps, 0, -1):
+            if sanity_check(values.shape[0], n_bkps, algo.jump, algo.min_size):
+                entry[n_bkps] = tuple(algo.predict(n_bkps))
+        algo.seg.cache_clear()
+        return entry
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _load(self, key):
+        try:
+            with open(self._path(key)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {int(k): tuple(v) for k, v in stored["breakpoints"].items()}
+
+    def _save(self, key, entry):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # several workers may warm the same series at once
+            with atomic_write(self._path(key)) as f:
+                json.dump({"model": self.model, "jump": self.jump,
+                           "breakpoints": {str(k): list(v) for k, v in entry.items()}}, f)
+        except OSError:
+            # a read-only checkout still works, it just refits after a restart
+            pass
@@ -0,0 +1,117 @@
+"""Brotli and gzip compressed responses, negotiated on Accept-Encoding.
+
+Replaces Dash's own Flask-Compress hook, which only gzips, compresses the same
+bytes again on every request, and leaves the Dash and plotly bundles alone
+because they are served as text/javascript.
+
+Responses of a compressible type above ``COMPRESS_MIN_SIZE`` bytes are sent as
+``br`` or ``gzip``, whichever the client prefers. Bodies with a stable identity
+are compressed once, at a higher level, and kept in an LRU cache of
+``PRECOMPRESSED_CACHE_MB``:
+
+* responses with a strong ETag, by URL and ETag, which includes the cached
+  callback responses (callback_cache.py) and the ranking payloads
+* files under ``assets/`` and ``_dash-component-suites/``, whose URLs carry a
+  version or modification time
+
+Everything else is compressed per request at a cheaper level.
+"""
+import gzip
+import os
+import threading
+
+import brotli
+from cachetools import LRUCache
+
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+CACHE_BYTES = int(os.environ.get("PRECOMPRESSED_CACHE_MB", "64")) * 2 ** 20
+MIMETYPES = {"text/html", "text/css", "text/csv", "text/plain", "text/javascript", "application/javascript",
+             "application/json", "image/svg+xml"}
+ENCODINGS = ("br", "gzip")
+# levels for bodies compressed on every request, and once for the cache
+LEVELS = {"br": 4, "gzip": 6}
+CACHED_LEVELS = {"br": 9, "gzip": 9}
+STATIC_PREFIXES = ("assets/", "_dash-component-suites/")
+
+
+def compress(data, encoding, levels=LEVELS):
+    if encoding == "br":
+        return brotli.compress(data, quality=levels["br"])
+    # mtime=0 keeps the output (and so its ETag) the same across workers
+    return gzip.compress(data, compresslevel=levels["gzip"], mtime=0)
+
+
+class Precompressed:
+    """Compressed variants by (key, encoding), bounded by their total size."""
+
+    def __init__(self, maxbytes=CACHE_BYTES):
+        self.cache = LRUCache(maxbytes, getsizeof=len)
+        self.lock = threading.Lock()
+
+    def get(self, key, encoding, data):
+        with self.lock:
+            body = self.cache.get((key, encoding))
+        if body is None:
+            body = compress(data, encoding, CACHED_LEVELS)
+            with self.lock:
+                try:
+                    self.cache[key, encoding] = body
+                except ValueError:
+                    # larger than the whole cache
+                    pass
+        return body
+
+
+def register(app, store=None):
+    """Compress ``app``'s responses; call right after creating the app, so this
+    hook runs after every other after_request hook."""
+    import flask
+
+    store = Precompressed() if store is None else store
+    static = tuple(app.config.routes_pathname_prefix + prefix for prefix in STATIC_PREFIXES)
+
+    @app.server.after_request
+    def compress_response(response):
+        request = flask.request
+        if (response.status_code != 200 or response.mimetype not in MIMETYPES
+                or "Content-Encoding" in response.headers):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        if encoding is None:
+            return response
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # an ETag only identifies a body together with its URL
+            key = ("etag", request.full_path, etag)
+        elif request.method == "GET" and request.path.startswith(static):
+            key = ("url", request.full_path)
+        else:
+            key = None
+        response.set_data(store.get(key, encoding, data) if key else compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            # another representation, another validator ("abc" -> "abc:br")
+            response.set_etag("{}:{}".format(etag, encoding), weak)
+            if request.if_none_match.contains_weak(response.get_etag()[0]):
+                return flask.Response(status=304, headers={"ETag": response.headers["ETag"],
+                                                           "Vary": response.headers["Vary"]})
+        return response
+
+    return store
+
+
+def warm(app, paths=("/",)):
+    """Precompress the static files the pages in ``paths`` load (gunicorn master)."""
+    import re
+
+    client = app.server.test_client()
+    for path in paths:
+        page = client.get(path).get_data(as_text=True)
+        for url in re.findall(r'(?:src|href)="(/[^"]+)"', page):
+            for encoding in ENCODINGS:
+                client.get(url, headers={"Accept-Encoding": encoding})
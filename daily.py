@@ -0,0 +1,241 @@
+"""Streaming ingestion of the daily series behind the Daily Data page.
+
+rt_covid.csv and rt_subway.csv used to be fixed snapshots with their 7 day moving
+averages computed offline. ``DailyStreams`` keeps both series growing while the
+app runs. It picks up
+
+* rows appended to rt_covid.csv / rt_subway.csv after they were loaded, and
+* CSV files in the drop directory (``DAILY_DROP_DIR``) named after a series,
+  e.g. ``rt_covid.csv`` or ``rt_covid-2021-09.csv``, including rows appended to
+  them later,
+
+reading only the bytes added since the last poll. Each file needs a header with
+the series' date and value columns (``DAILY_SERIES``); a moving average column is
+ignored and computed here. Rows dated on or before the last known day are
+skipped. The moving average is a ``RollingMean`` over the last ``WINDOW`` values,
+so every new day costs O(1) no matter how long the series is.
+
+Polling is a stat of the watched files, at most once per ``DAILY_POLL_SECONDS``;
+every worker polls on its own, so the drop directory is the one place to write
+new data to. Open pages ask for new days every ``DAILY_REFRESH_SECONDS`` and get
+them as ``extendData``.
+
+    python daily.py rt_covid 2021-08-30 1234
+
+appends one row to the drop directory.
+"""
+import glob
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+from files import tail_lines
+
+# same data directory as data.py
+ROOT = os.environ.get("DATA_DIR") or os.path.dirname(os.path.abspath(__file__))
+DROP_DIR = os.environ.get("DAILY_DROP_DIR", os.path.join(ROOT, ".daily"))
+POLL_SECONDS = float(os.environ.get("DAILY_POLL_SECONDS", "5"))
+# how often an open Daily Data page asks for new days
+REFRESH_SECONDS = float(os.environ.get("DAILY_REFRESH_SECONDS", "60"))
+WINDOW = 7
+
+DailySeries = namedtuple("DailySeries", ["source", "date", "value", "mean"])
+DAILY_SERIES = {
+    "rt_covid": DailySeries("rt_covid.csv", "date_of_interest", "CASE_COUNT", "MA Cases"),
+    "rt_subway": DailySeries("rt_subway.csv", "Date", "Subways: Total Estimated Ridership", "MA Entries"),
+}
+
+
+class RollingMean:
+    """Mean of the last ``window`` values, updated in O(1) per value.
+
+    Like ``rolling(window).mean()`` with the first ``window - 1`` means as 0.0,
+    which is how rt_covid.csv was computed. Integer counts keep the running
+    total exact.
+    """
+
+    def __init__(self, window=WINDOW, values=()):
+        self.values = deque(maxlen=window)
+        self.total = 0
+        for value in values:
+            self.push(value)
+
+    def push(self, value):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        if len(self.values) < self.values.maxlen:
+            return 0.0
+        return self.total / len(self.values)
+
+
+class DailyStream:
+    """One daily series: its frame and the state needed to extend it."""
+
+    def __init__(self, name, frame):
+        self.spec = DAILY_SERIES[name]
+        self.frame = frame.reset_index(drop=True)
+        values = self.frame[self.spec.value].values[-WINDOW:]
+        # plain ints/floats, a numpy int64 total would wrap silently
+        self.rolling = RollingMean(values=[value.item() for value in values])
+        self.last = str(self.frame[self.spec.date].iloc[-1]) if len(self.frame) else ""
+
+    def __len__(self):
+        return len(self.frame)
+
+    def append(self, rows):
+        """Add the rows of ``rows`` dated after the last day; returns how many."""
+        import pandas as pd
+
+        spec = self.spec
+        dates = pd.to_datetime(rows[spec.date]).dt.strftime("%Y-%m-%d")
+        new = {spec.date: [], spec.value: [], spec.mean: []}
+        for day, value in zip(dates, rows[spec.value].tolist()):
+            if day <= self.last or value != value:
+                continue
+            new[spec.date].append(day)
+            new[spec.value].append(value)
+            new[spec.mean].append(self.rolling.push(value))
+            self.last = day
+        if not new[spec.date]:
+            return 0
+        self.frame = pd.concat([self.frame, pd.DataFrame(new)], ignore_index=True)
+        return len(new[spec.date])
+
+    def extend_data(self, start, stop=None):
+        """Rows ``start`` to ``stop`` in dcc.Graph's ``extendData`` form, for a
+        figure whose traces are the moving average and the values, in that order."""
+        rows = self.frame.iloc[start:stop]
+        x = rows[self.spec.date].astype(str).tolist()
+        update = {"x": [x, x], "y": [rows[self.spec.mean].tolist(), rows[self.spec.value].tolist()]}
+        return [update, [0, 1]]
+
+
+class DailyStreams:
+    """The daily series of ``frames``, kept up to date from their sources."""
+
+    def __init__(self, frames, root=ROOT, drop_dir=DROP_DIR, poll_seconds=POLL_SECONDS):
+        self.frames = frames
+        self.root = root
+        self.drop_dir = drop_dir
+        self.poll_seconds = poll_seconds
+        self.streams = {name: DailyStream(name, frames[name]) for name in DAILY_SERIES}
+        # path -> (series, offset, header); the sources were read up to their current size
+        self.offsets = {}
+        for name, spec in DAILY_SERIES.items():
+            path = os.path.join(root, spec.source)
+            with open(path, "rb") as f:
+                header = f.readline()
+            self.offsets[path] = (name, os.path.getsize(path), header)
+        self.polled = None
+        self.lock = threading.Lock()
+        self.poll(force=True)
+
+    def __getitem__(self, name):
+        return self.streams[name]
+
+    @property
+    def version(self):
+        """Tag of the bytes read from every source, the same in every worker that
+        has read them (and what ``sources_version`` gives for the files)."""
+        return _signature((path, offset) for path, (_, offset, _) in self.offsets.items())
+
+    def poll(self, force=False):
+        """Ingest what was appended since the last poll; returns ``version``."""
+        now = time.monotonic()
+        if force or self.polled is None or now - self.polled >= self.poll_seconds:
+            with self.lock:
+                self.polled = now
+                for path, name in self._watched():
+                    self._read(path, name)
+        return self.version
+
+    def _watched(self):
+        for path, (name, _, _) in list(self.offsets.items()):
+            yield path, name
+        for name in DAILY_SERIES:
+            for path in sorted(glob.glob(os.path.join(self.drop_dir, name + "*.csv"))):
+                if path not in self.offsets and _series_of(path) == name:
+                    yield path, name
+
+    def _read(self, path, name):
+        import io
+
+        import pandas as pd
+
+        _, offset, header = self.offsets.get(path, (name, 0, b""))
+        try:
+            if os.path.getsize(path) < offset:
+                # truncated or replaced, rows already known are skipped below
+                offset, header = 0, b""
+            with open(path, "rb") as f:
+                header, body, offset = tail_lines(f, offset, header)
+        except OSError:
+            return 0
+        self.offsets[path] = (name, offset, header)
+        if not body.strip():
+            return 0
+        stream = self.streams[name]
+        try:
+            rows = pd.read_csv(io.BytesIO(header + body), usecols=[stream.spec.date, stream.spec.value])
+        except ValueError:
+            # no such columns; skip the file rather than fail the poll
+            return 0
+        added = stream.append(rows)
+        if added:
+            self.frames[name] = stream.frame
+        return added
+
+
+def sources_version(root=ROOT, drop_dir=DROP_DIR):
+    """``DailyStreams.version`` from the file sizes alone, without loading anything."""
+    paths = [os.path.join(root, spec.source) for spec in DAILY_SERIES.values()]
+    paths += [path for name in DAILY_SERIES for path in glob.glob(os.path.join(drop_dir, name + "*.csv"))
+              if _series_of(path) == name]
+    sizes = []
+    for path in paths:
+        try:
+            sizes.append((path, os.path.getsize(path)))
+        except OSError:
+            pass
+    return _signature(sizes)
+
+
+def _signature(sizes):
+    import hashlib
+
+    digest = hashlib.sha1()
+    for path, size in sorted(sizes):
+        digest.update("{}:{}\n".format(os.path.basename(path), size).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _series_of(path):
+    # "rt_covid-2021-09.csv" -> "rt_covid"; the longest matching name wins
+    base = os.path.basename(path)[:-len(".csv")]
+    names = [name for name in DAILY_SERIES if base == name or base.startswith(name + "-")
+             or base.startswith(name + "_")]
+    return max(names, key=len) if names else None
+
+
+def append_rows(name, rows, drop_dir=DROP_DIR):
+    """Append ``rows`` of (date, value) to the drop directory file of ``name``."""
+    spec = DAILY_SERIES[name]
+    os.makedirs(drop_dir, exist_ok=True)
+    path = os.path.join(drop_dir, name + ".csv")
+    lines = [] if os.path.exists(path) else ["{},{}\n".format(spec.date, spec.value)]
+    lines += ["{},{}\n".format(day, value) for day, value in rows]
+    # one write, so a poll sees whole rows or none of them
+    with open(path, "a") as f:
+        f.write("".join(lines))
+    return path
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 4 or sys.argv[1] not in DAILY_SERIES:
+        sys.exit("usage: python daily.py {} DATE VALUE".format("|".join(DAILY_SERIES)))
+    print(append_rows(sys.argv[1], [(sys.argv[2], sys.argv[3])]))
@@ -0,0 +1,97 @@
+"""The data frames the pages are built from.
+
+``prepare_frames`` parses and prepares the bundled CSVs. ``load_frames`` serves the
+same frames from the columnar snapshot written by ``python snapshot.py`` when one
+exists for the current CSVs, and writes one when it does not. Events come from the
+incremental event store in events.py and are attached to the series on load.
+"""
+import os
+
+import pandas as pd
+
+from events import EventStore, attach_events, group_events, parse_events
+
+# DATA_DIR points the app at another copy of the CSVs below (benchmarks/suite.py)
+ROOT = os.environ.get("DATA_DIR") or os.path.dirname(os.path.abspath(__file__))
+SOURCES = {
+    "covid": "covid_preds.csv",
+    "subway": "subway_preds.csv",
+    "events": "jhu_events.csv",
+    "rt_covid": "rt_covid.csv",
+    "rt_subway": "rt_subway.csv",
+}
+# frames that carry the "Event Descriptions" in effect on each date
+EVENT_SERIES = ("covid", "subway")
+
+
+def prepare_frames(root=ROOT, event_data=None):
+    # import data
+    covid_data = pd.read_csv(os.path.join(root, SOURCES["covid"]))
+    subway_data = pd.read_csv(os.path.join(root, SOURCES["subway"]))
+
+    # round figures
+    covid_data["Abs 7 day Difference"] = covid_data["Abs 7 day Difference"].round(2)
+    subway_data["Abs 7 day Difference"] = subway_data["Abs 7 day Difference"].round(2)
+    covid_data["Abs 14 day Difference"] = covid_data["Abs 14 day Difference"].round(2)
+    subway_data["Abs 14 day Difference"] = subway_data["Abs 14 day Difference"].round(2)
+
+    # Convert dates to datetime format
+    covid_data["Date"] = pd.to_datetime(covid_data["Date"])
+    subway_data["Date"] = pd.to_datetime((subway_data["Date"]))
+
+    # events are parsed vectorized and attached to both series by date (events.py)
+    if event_data is None:
+        event_data = group_events(parse_events(pd.read_csv(os.path.join(root, SOURCES["events"]))))
+    for frame in (covid_data, subway_data):
+        attach_events(frame, event_data)
+
+    rt_covid_df = pd.read_csv(os.path.join(root, SOURCES["rt_covid"]))
+    rt_subway_df = pd.read_csv(os.path.join(root, SOURCES["rt_subway"]))
+
+    return {
+        "covid": covid_data,
+        "subway": subway_data,
+        "events": event_data,
+        "rt_covid": rt_covid_df,
+        "rt_subway": rt_subway_df,
+    }
+
+
+def load_frames(root=ROOT, store=None):
+    import snapshot
+    store = EventStore() if store is None else store
+    store.sync(os.path.join(root, SOURCES["events"]))
+    event_data = store.event_data()
+    frames = snapshot.load(root)
+    if frames is None:
+        frames = prepare_frames(root, event_data)
+        snapshot.write(frames, root)
+    else:
+        # the snapshot leaves the events out, so new events do not invalidate it
+        for name in EVENT_SERIES:
+            attach_events(frames[name], event_data)
+        frames["events"] = event_data
+    return frames
+
+
+def write_event_store(root=ROOT):
+    """Sync the persisted event store with the events CSV. Only the store's one
+    writer calls this (gunicorn.conf.py, ``python app.py``); the app reads it."""
+    return EventStore().sync(os.path.join(root, SOURCES["events"]))
+
+
+def refresh_events(frames, store, root=ROOT):
+    """Pick up events added to the events CSV since the last sync.
+
+    Costs parsing the new rows and refilling the series from the first new date
+    on; an edited or shortened CSV is read again in full (EventStore.rebuild).
+    Returns the first date whose events changed, or None when nothing did.
+    """
+    since = store.sync(os.path.join(root, SOURCES["events"]))
+    if since is not None:
+        event_data = store.event_data()
+        for name in EVENT_SERIES:
+            attach_events(frames[name], event_data, since)
+        frames["events"] = event_data
+    return since
+
@@ -0,0 +1,103 @@
+"""Selectable change point detectors around the l2 segmentation.
+
+Exact Dynp is O(K * n^2) and only accepts a number of change points. PELT and
+binary segmentation are close to linear and can instead stop on a penalty, which
+is what keeps long daily or hourly series interactive.
+
+In penalty mode the series is standardized first, so a penalty is expressed in
+units of the series variance and the same value is meaningful for COVID-19
+cases and subway entries.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from segmentation import BadSegmentationParameters, L2Binseg, L2Dynp, L2Pelt
+
+Detector = namedtuple("Detector", ["label", "modes", "build"])
+# shortest segment every detector allows
+MIN_SIZE = 2
+
+
+def _ruptures(name, **kwargs):
+    def build(jump):
+        import ruptures as rpt
+        return getattr(rpt, name)(model="l2", min_size=MIN_SIZE, jump=jump, **kwargs)
+    return build
+
+
+DETECTORS = {
+    "dynp": Detector("Dynp (exact)", ("n_bkps",), lambda jump: L2Dynp(min_size=MIN_SIZE, jump=jump)),
+    "pelt": Detector("PELT (penalty)", ("pen",), lambda jump: L2Pelt(min_size=MIN_SIZE, jump=jump)),
+    "binseg": Detector("Binary segmentation", ("n_bkps", "pen"), lambda jump: L2Binseg(min_size=MIN_SIZE, jump=jump)),
+    "bottomup": Detector("Bottom-up", ("n_bkps", "pen"), _ruptures("BottomUp")),
+    "window": Detector("Sliding window", ("n_bkps", "pen"), _ruptures("Window", width=14)),
+}
+DEFAULT_DETECTOR = "dynp"
+DEFAULT_PENALTY = 2.0
+
+
+def detector_options():
+    return [{"label": d.label, "value": name} for name, d in DETECTORS.items()]
+
+
+def max_bkps(n_samples):
+    """The most change points a series of ``n_samples`` values has room for."""
+    return max(n_samples // MIN_SIZE - 1, 0)
+
+
+def bad_parameters():
+    """What the detectors raise for parameters the series is too short for; the
+    ruptures ones have their own exception. Use as ``except bad_parameters():``,
+    which only imports ruptures when something was raised."""
+    from ruptures.exceptions import BadSegmentationParameters as RupturesBadParameters
+
+    return BadSegmentationParameters, RupturesBadParameters
+
+
+def resolve_mode(detector, penalty):
+    # a penalty wins whenever the detector can use one, PELT always needs one
+    modes = DETECTORS[detector].modes
+    if "pen" in modes and (penalty is not None or "n_bkps" not in modes):
+        return "pen"
+    return "n_bkps"
+
+
+def detect(values, detector=DEFAULT_DETECTOR, n_bkps=None, penalty=None, index=None, jump=1, store=None):
+    """Return breakpoints (ruptures style, last one is ``len(values)``).
+
+    Exact Dynp answers come from ``index`` (a ChangePointIndex) when given, the
+    others from ``store`` (a precompute.ArtifactStore) when it holds them.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    mode = resolve_mode(detector, penalty)
+    if mode == "pen" and penalty is None:
+        penalty = DEFAULT_PENALTY
+    if detector == "dynp" and index is not None:
+        return index.breakpoints(values, n_bkps)
+    param = float(penalty) if mode == "pen" else int(n_bkps)
+    if store is not None:
+        stored = store.breakpoints(values, detector, mode, param, jump)
+        if stored is not None:
+            return stored
+    return list(_detect(values.tobytes(), values.shape, detector, mode, param, jump))
+
+
+def fitted(values, detector, mode, jump=1):
+    """``detector`` fitted to ``values``, ready to predict any parameter of ``mode``."""
+    if mode == "pen":
+        std = values.std()
+        values = (values - values.mean()) / (std if std > 0 else 1.0)
+    return DETECTORS[detector].build(jump).fit(values)
+
+
+def predict(algo, mode, param):
+    bkps = algo.predict(pen=param) if mode == "pen" else algo.predict(n_bkps=param)
+    return [int(b) for b in bkps]
+
+
+@lru_cache(maxsize=256)
+def _detect(raw, shape, detector, mode, param, jump):
+    values = np.frombuffer(raw).reshape(shape)
+    return tuple(predict(fitted(values, detector, mode, jump), mode, param))
@@ -0,0 +1,244 @@
+"""Incremental ingestion of jhu_events.csv.
+
+Event rows are parsed with vectorized string and date operations, deduplicated,
+and appended to a persisted per-date event store (``EVENT_STORE_DIR``). The store
+remembers how far into the source CSV it has read, so appending a week of events
+to jhu_events.csv costs reading and parsing those new rows only, and the series
+frames only get their "Event Descriptions" refilled from the earliest new date on
+(``attach_events`` with ``since``). Edited or removed rows make the store read
+the CSV again in full. The app looks at the CSV at most every
+``EVENTS_POLL_SECONDS`` and rebuilds the impacts, rankings and exports when the
+events changed.
+
+The store has one writer: gunicorn's master when it starts, or
+
+    python events.py [events.csv ...]
+
+which syncs the store with the given CSVs (jhu_events.csv by default) and can run
+from cron. The app's workers open it ``read_only``: they start from what was
+persisted and follow the CSV in memory, so polling never writes to disk and
+workers never append the same rows twice.
+"""
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from files import atomic_write, tail_lines
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+EVENT_STORE_DIR = os.environ.get("EVENT_STORE_DIR", os.path.join(ROOT, ".events"))
+EVENT_CUTOFF = np.datetime64("2021-03-01", "ns")
+SEPARATOR = '----> \n'
+COLUMNS = ["Date", "Event Descriptions"]
+# bytes before the read offset that have to match for the source to count as appended to
+CHECK_BYTES = 4096
+# how often the app looks at the events CSV again
+POLL_SECONDS = float(os.environ.get("EVENTS_POLL_SECONDS", "5"))
+
+
+def parse_events(raw):
+    """Date-parsed, cut off and deduplicated event rows of a raw events frame."""
+    rows = raw[COLUMNS].copy()
+    rows["Date"] = pd.to_datetime(rows["Date"].astype(str).str.replace(",", "", regex=False))
+    rows = rows.loc[rows["Date"].values < EVENT_CUTOFF]
+    return rows.drop_duplicates().reset_index(drop=True)
+
+
+def group_events(rows):
+    """One row per date with all its descriptions joined, sorted by date."""
+    return rows.groupby("Date")["Event Descriptions"].apply(SEPARATOR.join).reset_index()
+
+
+def attach_events(frame, event_data, since=None):
+    """Fill ``frame["Event Descriptions"]`` with the event in effect on each date.
+
+    Same as merging ``event_data`` on Date and forward filling: only event dates
+    that appear in the frame take effect. With ``since``, only rows from that date
+    on are refilled. ``frame`` has to be sorted by Date.
+    """
+    dates = frame["Date"].values
+    if "Event Descriptions" not in frame.columns:
+        frame["Event Descriptions"] = np.full(len(frame), np.nan, dtype=object)
+        since = None
+    start = 0 if since is None else int(np.searchsorted(dates, np.datetime64(since, "ns")))
+    event_dates = event_data["Date"].values
+    present = np.flatnonzero(np.isin(event_dates, dates))
+    position = np.searchsorted(event_dates[present], dates[start:], side="right") - 1
+    descriptions = np.append(event_data["Event Descriptions"].values[present], np.nan).astype(object)
+    # position -1 (before the first event) picks the trailing NaN
+    filled = descriptions[np.where(position >= 0, position, len(present))]
+    column = frame.columns.get_loc("Event Descriptions")
+    frame.iloc[start:, column] = filled
+    return frame
+
+
+class EventStore:
+    """Deduplicated event rows persisted under ``directory``, grouped per date."""
+
+    def __init__(self, directory=EVENT_STORE_DIR, read_only=False):
+        self.directory = directory
+        # a reader follows the sources in memory and leaves the files to the writer
+        self.read_only = read_only
+        self.path = os.path.join(directory, "events.csv")
+        self.state_path = os.path.join(directory, "state.json")
+        self.sources = {}
+        self.by_date = {}
+        # sorted event dates and their joined descriptions, what event_data() returns
+        self.dates = np.array([], dtype="datetime64[ns]")
+        self.descriptions = np.array([], dtype=object)
+        self._keys = set()
+        self._grouped = None
+        self._load()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def sync(self, source):
+        """Add the rows appended to ``source`` since the last sync.
+
+        Returns the earliest date that got a new event, or None. A source that was
+        rewritten rather than appended to (rows edited or removed) rebuilds the
+        store, see ``rebuild``. Nothing is written when nothing was read.
+        """
+        key = os.path.abspath(source)
+        state = self.sources.get(key)
+        with open(source, "rb") as f:
+            rewritten = state is not None and _check(f, state["offset"]) != state["check"]
+        if rewritten:
+            return self.rebuild()
+        new = self._read(key)
+        if self.sources[key] != state and not self.read_only:
+            if len(new):
+                self._write(new, "a")
+            self._save_state()
+        return pd.Timestamp(new["Date"].min()) if len(new) else None
+
+    def rebuild(self):
+        """Read every source again from the start, so edited and removed rows are
+        gone; returns the earliest date whose events may have changed, or None."""
+        dates = [self.dates[0]] if len(self.dates) else []
+        sources = [source for source in self.sources if os.path.exists(source)]
+        self.sources, self.by_date, self._keys = {}, {}, set()
+        self.dates = np.array([], dtype="datetime64[ns]")
+        self.descriptions = np.array([], dtype=object)
+        self._grouped = None
+        for source in sources:
+            self._read(source)
+        if len(self.dates):
+            dates.append(self.dates[0])
+        if not self.read_only:
+            rows = [(d, text) for d in sorted(self.by_date) for text in self.by_date[d]]
+            self._write(pd.DataFrame(rows, columns=COLUMNS), "w")
+            self._save_state()
+        return pd.Timestamp(min(dates)) if dates else None
+
+    def event_data(self):
+        """Events grouped per date, like ``group_events`` over every stored row."""
+        if self._grouped is None:
+            self._grouped = pd.DataFrame({"Date": self.dates, "Event Descriptions": self.descriptions})
+        return self._grouped
+
+    def _read(self, key):
+        # the rows appended to the source since its offset, added in memory only
+        state = self.sources.get(key)
+        with open(key, "rb") as f:
+            if state is not None:
+                offset, header = state["offset"], state["header"].encode("utf-8")
+            else:
+                offset, header = 0, b""
+            header, body, offset = tail_lines(f, offset, header)
+            new = pd.DataFrame(columns=COLUMNS)
+            if body.strip():
+                new = self._add(parse_events(pd.read_csv(io.BytesIO(header + body))))
+            self.sources[key] = {"offset": offset, "check": _check(f, offset), "header": header.decode("utf-8")}
+        return new
+
+    def _add(self, rows):
+        # the rows not yet in the store, inserted
+        new = [(d, text) for d, text in zip(rows["Date"].values, rows["Event Descriptions"].astype(str))
+               if (d, text) not in self._keys]
+        frame = pd.DataFrame(new, columns=COLUMNS)
+        if new:
+            self._insert(new)
+            frame["Date"] = pd.to_datetime(frame["Date"])
+        return frame
+
+    def _insert(self, new):
+        touched = {}
+        for d, text in new:
+            if (d, text) in self._keys:
+                continue
+            self._keys.add((d, text))
+            self.by_date.setdefault(d, []).append(text)
+            touched[d] = SEPARATOR.join(self.by_date[d])
+        # only the touched dates are joined again; new dates are inserted in order
+        touched_dates = np.array(sorted(touched), dtype="datetime64[ns]")
+        position = np.searchsorted(self.dates, touched_dates)
+        known = np.isin(touched_dates, self.dates)
+        joined = np.array([touched[d] for d in touched_dates], dtype=object)
+        self.descriptions[position[known]] = joined[known]
+        self.dates = np.insert(self.dates, position[~known], touched_dates[~known])
+        self.descriptions = np.insert(self.descriptions, position[~known], joined[~known])
+        self._grouped = None
+
+    def _load(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            sources, size = state["sources"], state["size"]
+            rows = pd.DataFrame(columns=COLUMNS)
+            if size:
+                # only the rows the state covers, the writer may be appending more
+                with open(self.path, "rb") as f:
+                    blob = f.read(size)
+                rows = pd.read_csv(io.BytesIO(blob[:blob.rfind(b"\n") + 1]), parse_dates=["Date"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self.sources = sources
+        if len(rows):
+            self._insert(list(zip(rows["Date"].values, rows["Event Descriptions"].astype(str))))
+
+    def _write(self, rows, mode):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if mode == "a":
+                rows.to_csv(self.path, mode="a", header=not os.path.exists(self.path), index=False,
+                            date_format="%Y-%m-%d")
+            else:
+                # replaced in one go, so a reader never sees a half written store
+                with atomic_write(self.path) as f:
+                    rows.to_csv(f, index=False, date_format="%Y-%m-%d")
+        except OSError:
+            # read-only checkout, the events still count for this process
+            pass
+
+    def _save_state(self):
+        try:
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            os.makedirs(self.directory, exist_ok=True)
+            with atomic_write(self.state_path) as f:
+                # the events file size goes with the offsets, readers load that much of it
+                json.dump({"sources": self.sources, "size": size}, f)
+        except OSError:
+            pass
+
+
+def _check(f, offset):
+    # digest of the bytes just before offset, to tell an appended file from a rewritten one
+    start = max(offset - CHECK_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = EventStore()
+    for source in sys.argv[1:] or [os.path.join(ROOT, "jhu_events.csv")]:
+        since = store.sync(source)
+        print(source, "new events from {}".format(since.date()) if since is not None else "up to date")
+    print(len(store), "events on", len(store.by_date), "dates")
@@ -0,0 +1,89 @@
+"""CSV exports of the event tables, built on demand instead of on every click.
+
+The app used to write all_events.csv at import and the four top 10 tables
+(covidhead.csv, covid14head.csv, subwayhead.csv, subway14head.csv) on every click
+of "Calculate", from every worker into the same files. Now the tables are served
+from ``/exports/<name>.csv`` (rendered once per process), and
+
+    python exports.py [directory]
+
+writes them all as a batch job, each file atomically, so a reader never sees a
+half written table.
+"""
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from files import atomic_write
+
+EXPORT_ROUTE = "/exports/<name>.csv"
+# series and its value column for the change points, days ahead of the difference
+TopTable = namedtuple("TopTable", ["series", "value_col", "days"])
+# number of change points the top 10 tables are taken from, as on the events page
+N_BKPS = 160
+
+
+def export_specs(series):
+    """The exports of the event series of ``series`` (series.SeriesRegistry) by
+    name: ``all_events``, and per series ``<name>head`` and ``<name>14head``,
+    its top 10 tables 7 and 14 days ahead."""
+    specs = {"all_events": None}
+    for entry in series.event_series():
+        specs[entry.name + "head"] = TopTable(entry.name, entry.value, 7)
+        specs[entry.name + "14head"] = TopTable(entry.name, entry.value, 14)
+    return specs
+
+
+def export_csv(spec, frames, cp_index):
+    """The CSV text of the export ``spec`` (a TopTable, or None for all events)."""
+    from impacts import event_impacts, impact_table, top_impacts
+
+    if spec is None:
+        return frames["events"].to_csv(index=False)
+    data = frames[spec.series]
+    cps = cp_index.breakpoints(data[spec.value_col].values, N_BKPS)
+    return impact_table(top_impacts(event_impacts(data, cps), spec.days), spec.days).to_csv()
+
+
+def write_all(directory, specs, frames, cp_index):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, spec in specs.items():
+        path = os.path.join(directory, name + ".csv")
+        with atomic_write(path, newline="") as f:
+            f.write(export_csv(spec, frames, cp_index))
+        paths.append(path)
+    return paths
+
+
+def register(server, specs, load):
+    """Serve the exports ``specs`` (export_specs) from ``server``; ``load()``
+    returns ``(frames, cp_index)``.
+
+    Returns the cached renderer, whose ``cache_clear`` drops the rendered files."""
+    from flask import Response, abort
+
+    @lru_cache(maxsize=None)
+    def render(name):
+        return export_csv(specs[name], *load()).encode("utf-8")
+
+    @server.route(EXPORT_ROUTE)
+    def download_export(name):
+        if name not in specs:
+            abort(404)
+        return Response(render(name), mimetype="text/csv",
+                        headers={"Content-Disposition": "attachment; filename={}.csv".format(name)})
+
+    return render
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app import SERIES
+    from changepoint_index import ChangePointIndex
+    from data import ROOT, load_frames
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else ROOT
+    for path in write_all(directory, export_specs(SERIES), load_frames(), ChangePointIndex()):
+        print(path)
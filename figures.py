@@ -0,0 +1,80 @@
+"""Figure building helpers shared by the pages."""
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+CHANGEPOINTS_UID = "changepoints"
+# hidden axis spanning the plot height, so markers look like add_vline lines
+CHANGEPOINTS_AXIS = dict(overlaying="y", range=[0, 1], visible=False, fixedrange=True)
+# line traces are drawn with WebGL (scattergl) once a figure has more than
+# WEBGL_POINTS of their points ("auto"), always ("1") or never ("0"); the points
+# are counted before resample.py thins the traces out
+WEBGL = os.environ.get("WEBGL", "auto")
+WEBGL_POINTS = int(os.environ.get("WEBGL_POINTS", "5000"))
+
+
+def changepoint_overlay(dates, color="green", width=1):
+    """All change point markers as one trace of vertical segments.
+
+    Every date becomes a (date, 0) -> (date, 1) segment on ``yaxis2`` followed by
+    a gap, which draws the same lines as one ``add_vline`` per date without a
+    layout shape (and a figure revalidation) per marker.
+    """
+    x, y = changepoint_segments(dates)
+    return go.Scatter(x=x, y=y, mode="lines", line=dict(color=color, width=width), yaxis="y2",
+                      hoverinfo="skip", showlegend=False, name="Change points", uid=CHANGEPOINTS_UID)
+
+
+def changepoint_segments(dates):
+    """x and y of the overlay segments for ``dates``; extending the overlay by
+    these for more dates draws their markers too."""
+    dates = np.asarray(dates)
+    if np.issubdtype(dates.dtype, np.datetime64):
+        dates = np.datetime_as_string(dates, unit="D")
+    x = np.empty(3 * len(dates), dtype=object)
+    x[0::3] = dates
+    x[1::3] = dates
+    y = np.tile(np.array([0, 1, None], dtype=object), len(dates))
+    return x, y
+
+
+def add_changepoints(figure, dates, **kwargs):
+    figure.add_trace(changepoint_overlay(dates, **kwargs))
+    figure.update_layout(yaxis2=CHANGEPOINTS_AXIS)
+    return figure
+
+
+def extend_traces(figure, extension):
+    """A copy of the figure dict ``figure`` with the points of ``extension``
+    appended to its traces.
+
+    ``extension`` has dcc.Graph's ``extendData`` form, ``[{"x": [...], "y": [...]},
+    trace_indices]``, so the browser and the server extend a figure the same way.
+    Works on the plain dict (``to_plotly_json()``): going through go.Figure would
+    validate every point again.
+    """
+    update, indices = extension
+    data = list(figure["data"])
+    for i, x, y in zip(indices, update["x"], update["y"]):
+        trace = data[i]
+        data[i] = dict(trace, x=np.concatenate([np.asarray(trace["x"], dtype=object), np.asarray(x, dtype=object)]),
+                       y=np.concatenate([np.asarray(trace["y"]), np.asarray(y)]))
+    return dict(figure, data=data)
+
+
+def _line(trace):
+    return trace.get("type", "scatter") == "scatter" and trace.get("uid") != CHANGEPOINTS_UID
+
+
+def webgl(figure, mode=WEBGL, threshold=WEBGL_POINTS):
+    """The figure dict with its line traces as ``scattergl`` when it is dense.
+
+    Only the trace type changes: the change point overlay and the bars stay SVG
+    on the same axes, so they line up with the WebGL lines, and extendData and
+    the resample patches work on both kinds of trace.
+    """
+    lines = [trace for trace in figure["data"] if _line(trace)]
+    if mode == "0" or not lines or mode == "auto" and sum(len(trace.get("y", ())) for trace in lines) <= threshold:
+        return figure
+    return dict(figure, data=[dict(trace, type="scattergl") if _line(trace) else trace for trace in figure["data"]])
@@ -0,0 +1,43 @@
+"""File helpers shared by the on-disk stores: atomic writes and tailing appended CSVs."""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode="w", **kwargs):
+    """Write ``path`` through a temporary file in the same directory.
+
+    The temporary file replaces ``path`` when the block finishes, so readers (and
+    other workers writing the same file) only ever see a complete one; when the
+    block raises, it is removed and ``path`` is left as it was.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(dir=directory or ".", prefix="." + name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def tail_lines(f, offset, header=b""):
+    """The lines of the binary file ``f`` appended after ``offset``.
+
+    Returns ``(header, body, end)``. Read from the start, the first line is the
+    header and not part of the body; otherwise ``header`` is passed through.
+    Only complete lines count, so a row still being written is picked up by the
+    next read from ``end``.
+    """
+    f.seek(offset)
+    blob = f.read()
+    complete = blob[:blob.rfind(b"\n") + 1]
+    if offset:
+        return header, complete, offset + len(complete)
+    header = complete[:complete.find(b"\n") + 1]
+    return header, complete[len(header):], len(complete)
@@ -0,0 +1,213 @@
+"""Counterfactual forecasts: the "N days Ahead Forecasted Values" columns.
+
+covid_preds.csv and subway_preds.csv hold the output of an offline LSTM: for
+every date, the moving average predicted from the ``window`` days that ended N
+days earlier, and how far the actual value ended up from it ("N day Difference",
+"Abs N day Difference"). This module produces the same columns in one batch.
+
+A forecaster maps windows of past values to the value ``horizon`` days after
+each window ends. ``sliding_windows`` lays every window out as a strided view of
+one array, so a whole series is predicted with a few array operations per
+``BATCH_SIZE`` rows instead of a model call per date. Rows with less history than
+a window use the first value for the missing days.
+
+Forecasters are picked by name from ``FORECASTERS`` or given as
+``module:Class`` (anything with ``window``, ``fit(values, horizons)`` and
+``predict(windows, horizon)``), so a trained model can be plugged in without
+changes here. The bundled ones run on the CPU with numpy only:
+
+* ``persistence``: the last value of the window
+* ``trend``: the least squares line through the window, extended
+* ``ar`` (default): a ridge autoregression on log values, fitted per horizon,
+  whose predicted change is kept within the changes seen while fitting
+
+    python forecast.py --output-dir DIR [--model ar] [--window 28] [--horizons 7 14]
+
+writes both files to DIR with new forecast and difference columns; the bundled
+CSVs are only replaced when DIR is the checkout itself.
+"""
+import importlib
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# file and value column of every series with forecasts
+PREDICTED_SERIES = {
+    "covid": ("covid_preds.csv", "MA Cases"),
+    "subway": ("subway_preds.csv", "MA Entries"),
+}
+HORIZONS = (7, 14)
+DEFAULT_WINDOW = 28
+BATCH_SIZE = 4096
+
+
+def forecast_column(horizon):
+    return "{} days Ahead Forecasted Values".format(horizon)
+
+
+def difference_columns(horizon):
+    return "{} day Difference".format(horizon), "Abs {} day Difference".format(horizon)
+
+
+def sliding_windows(values, window, horizon):
+    """Row ``i`` is the ``window`` values ending ``horizon`` rows before ``i``.
+
+    A read-only view, nothing is copied; the history before the first value is
+    taken to be the first value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    padded = np.concatenate([np.full(window + horizon - 1, values[0] if len(values) else 0.0), values])
+    return np.lib.stride_tricks.sliding_window_view(padded, window)[:len(values)]
+
+
+class Forecaster(ABC):
+    """Predicts the value ``horizon`` days after each of a batch of windows."""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+
+    def fit(self, values, horizons=HORIZONS):
+        return self
+
+    @abstractmethod
+    def predict(self, windows, horizon):
+        """``windows`` is (n, window); returns n predictions."""
+
+
+class Persistence(Forecaster):
+    def predict(self, windows, horizon):
+        return windows[:, -1].copy()
+
+
+class LinearTrend(Forecaster):
+    def predict(self, windows, horizon):
+        # the fitted line evaluated at window - 1 + horizon is a fixed linear
+        # combination of the window, so a batch is one matrix-vector product
+        t = np.arange(self.window, dtype=np.float64)
+        design = np.column_stack([t, np.ones(self.window)])
+        weights = np.array([self.window - 1 + horizon, 1.0]) @ np.linalg.pinv(design)
+        return windows @ weights
+
+
+class Autoregressive(Forecaster):
+    """Ridge regression of the log change over ``horizon`` days on the window's
+    log values relative to its last one.
+
+    The predicted change is clipped to the range of the changes it was fitted
+    on: windows unlike any seen in fitting, such as the padded ones at the start
+    of a series, otherwise extrapolate to many times the largest value.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, ridge=1e-3):
+        super().__init__(window)
+        self.ridge = ridge
+        self.coef = {}
+        self.bounds = {}
+
+    def fit(self, values, horizons=HORIZONS):
+        values = np.asarray(values, dtype=np.float64)
+        for horizon in horizons:
+            windows = sliding_windows(values, self.window, horizon)
+            # only windows made of real history
+            full = slice(self.window + horizon - 1, None)
+            features, last = self._features(windows[full])
+            target = np.log1p(np.maximum(values[full], 0)) - last
+            if not len(target):
+                self.coef[horizon] = np.zeros(self.window)
+                self.bounds[horizon] = (0.0, 0.0)
+                continue
+            gram = features.T @ features + self.ridge * np.eye(self.window)
+            self.coef[horizon] = np.linalg.solve(gram, features.T @ target)
+            self.bounds[horizon] = (target.min(), target.max())
+        return self
+
+    def predict(self, windows, horizon):
+        features, last = self._features(windows)
+        return np.expm1(last + np.clip(features @ self.coef[horizon], *self.bounds[horizon]))
+
+    @staticmethod
+    def _features(windows):
+        logs = np.log1p(np.maximum(windows, 0))
+        last = logs[:, -1]
+        # relative to the last value, plus an intercept in place of the (all zero) last column
+        features = logs - last[:, None]
+        features[:, -1] = 1.0
+        return features, last
+
+
+FORECASTERS = {
+    "persistence": Persistence,
+    "trend": LinearTrend,
+    "ar": Autoregressive,
+}
+DEFAULT_FORECASTER = "ar"
+
+
+def forecaster_for(name=DEFAULT_FORECASTER, **kwargs):
+    """A forecaster by ``FORECASTERS`` name or ``module:Class`` path."""
+    if ":" in name:
+        module, attr = name.split(":", 1)
+        cls = getattr(importlib.import_module(module), attr)
+    else:
+        cls = FORECASTERS[name]
+    return cls(**kwargs)
+
+
+def predict(forecaster, values, horizon, batch_size=BATCH_SIZE):
+    """``horizon`` days ahead forecast for every row of ``values``, in batches."""
+    windows = sliding_windows(values, forecaster.window, horizon)
+    out = np.empty(len(windows))
+    for start in range(0, len(windows), batch_size):
+        out[start:start + batch_size] = forecaster.predict(windows[start:start + batch_size], horizon)
+    return out
+
+
+def fill_forecasts(frame, value_col, forecaster, horizons=HORIZONS):
+    """Set the forecast and difference columns of ``frame`` for every horizon."""
+    values = frame[value_col].values.astype(np.float64)
+    forecaster.fit(values, horizons)
+    for horizon in horizons:
+        forecast = predict(forecaster, values, horizon)
+        difference, absolute = difference_columns(horizon)
+        frame[forecast_column(horizon)] = forecast
+        frame[difference] = values - forecast
+        frame[absolute] = np.abs(values - forecast)
+    return frame
+
+
+def refresh(forecaster, output_dir, root=ROOT, horizons=HORIZONS):
+    """Write every ``PREDICTED_SERIES`` file of ``root`` to ``output_dir`` with new
+    forecast columns; returns the paths."""
+    import pandas as pd
+
+    from files import atomic_write
+
+    paths = []
+    for source, value_col in PREDICTED_SERIES.values():
+        # index_col=0 keeps the unnamed index column as it was written
+        frame = pd.read_csv(os.path.join(root, source), index_col=0)
+        fill_forecasts(frame, value_col, forecaster, horizons)
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, source)
+        with atomic_write(path) as f:
+            frame.to_csv(f)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--model", default=DEFAULT_FORECASTER,
+                        help="one of {} or module:Class".format(", ".join(FORECASTERS)))
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(HORIZONS))
+    parser.add_argument("--output-dir", required=True,
+                        help="where to write the files; the checkout to replace the bundled ones")
+    args = parser.parse_args()
+    for path in refresh(forecaster_for(args.model, window=args.window), args.output_dir,
+                        horizons=args.horizons):
+        print(path)
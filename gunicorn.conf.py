@@ -0,0 +1,31 @@
+# gunicorn picks this file up automatically from the working directory
+import gc
+import os
+
+# Import the app and build its data, change point index and pages once in the
+# master, then fork workers from it, so they share that memory instead of each
+# building a copy.
+# GUNICORN_PRELOAD=0 goes back to importing the app in every worker.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    # the master is the one process that writes the event store, workers only read it
+    import data
+    data.write_event_store()
+    if preload_app:
+        import app
+        app.warm_changepoints()
+        app.warm_pages()
+        import compression
+        compression.warm(app.app)
+        # keep the collector from touching (and so copying) the preloaded objects
+        gc.collect()
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    # load (or fit and persist) the change point index before serving requests;
+    # a no-op when the master already did it
+    import app
+    app.warm_changepoints()
@@ -0,0 +1,59 @@
+"""Event impacts: the series rows at the detected change points."""
+import numpy as np
+
+IMPACT_COLUMNS = {7: "Abs 7 day Difference", 14: "Abs 14 day Difference"}
+
+
+def event_impacts(data, cps):
+    """Rows of ``data`` at the change points ``cps``, the first one per event."""
+    impacts = data.loc[data.index.isin(cps)]
+    return impacts.groupby("Event Descriptions").nth(0).reset_index()
+
+
+def top_impacts(impacts, days=7, n=10):
+    """The ``n`` largest impacts by the ``days`` ahead difference."""
+    return impacts.sort_values(by=[IMPACT_COLUMNS[days]], ascending=False).head(n)
+
+
+def impact_table(top, days=7):
+    return top[["Date", IMPACT_COLUMNS[days], "Event Descriptions"]]
+
+
+class ImpactIndex:
+    """Impacts of one series sorted by date, for "impact in effect at date d".
+
+    The impact in effect at d is the latest one on or before d, found with a
+    binary search instead of filtering and sorting the impacts for every pick.
+    """
+
+    def __init__(self, impacts):
+        self.impacts = impacts
+        self.order = np.argsort(impacts["Date"].values, kind="stable")
+        self.dates = impacts["Date"].values[self.order]
+        self.columns = {days: impacts[column].values[self.order] for days, column in IMPACT_COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def positions(self, dates):
+        """Sorted position of the impact in effect at each of ``dates``, -1 before the first."""
+        return np.searchsorted(self.dates, np.asarray(dates, dtype="datetime64[ns]"), side="right") - 1
+
+    def values_at(self, dates, days=7):
+        """Impact in effect at each of ``dates``, NaN before the first impact."""
+        position = self.positions(dates)
+        if not len(self.dates):
+            return np.full(len(position), np.nan)
+        values = self.columns[days][np.maximum(position, 0)].astype(float)
+        values[position < 0] = np.nan
+        return values
+
+    def impacts_at(self, dates, days=7):
+        """Impacts in effect at ``dates``; dates before the first impact are left out."""
+        position = self.positions(dates)
+        return self.columns[days][position[position >= 0]]
+
+    def rows_at(self, dates):
+        """Rows of ``impacts`` in effect at ``dates``; dates before the first impact are left out."""
+        position = self.positions(dates)
+        return self.impacts.iloc[self.order[position[position >= 0]]]
@@ -0,0 +1,163 @@
+"""Online change point detection on the streamed daily series.
+
+Dynp (detectors.py) refits the whole history. ``Cusum`` instead looks at one new
+day at a time and keeps a constant amount of state: a two-sided CUSUM of the
+standardized log moving average against a baseline that is learned over the
+first ``warmup`` days of a regime and then follows slow drift with an
+exponentially weighted mean and variance. When either sum crosses ``threshold``
+a change point is flagged at the day that sum started rising, and a new regime
+starts from scratch.
+
+``OnlineChangePoints`` runs one detector per daily series (daily.py) and
+checkpoints each to ``ONLINE_CP_DIR`` after it took in new days. A restart
+resumes from the checkpoint and only reads the days after it; a checkpoint whose
+last day no longer matches the series (the CSV was regenerated) is dropped and
+the history replayed.
+"""
+import json
+import math
+import os
+import threading
+
+from files import atomic_write
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.environ.get("ONLINE_CP_DIR", os.path.join(ROOT, ".online"))
+FORMAT_VERSION = 1
+
+
+class Cusum:
+    """Two-sided CUSUM over ``log1p`` of the values, O(1) per update."""
+
+    PARAMS = ("warmup", "drift", "threshold", "alpha", "min_std")
+
+    def __init__(self, warmup=14, drift=0.5, threshold=8.0, alpha=0.05, min_std=0.02):
+        self.warmup = warmup
+        self.drift = drift
+        self.threshold = threshold
+        self.alpha = alpha
+        # log scale, so at least a 2% move per standard deviation
+        self.min_std = min_std
+        # rows seen, and the date and value of the last one (to validate a resume)
+        self.rows = 0
+        self.last = None
+        # (row that raised the alarm, date the change started)
+        self.changepoints = []
+        self._reset()
+
+    def _reset(self):
+        self.n = 0
+        self.mean = self.m2 = self.var = 0.0
+        self.high = self.low = 0.0
+        self.high_start = self.low_start = None
+
+    def update(self, day, value):
+        """Take in the next day; returns the change point date it flags, or None."""
+        row = self.rows
+        self.rows += 1
+        self.last = [day, value]
+        if value != value or (self.n == 0 and value <= 0):
+            # nothing to learn from (a moving average still filling up)
+            return None
+        x = math.log1p(max(value, 0.0))
+        if self.n < self.warmup:
+            # Welford over the first days of a regime
+            self.n += 1
+            delta = x - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (x - self.mean)
+            self.var = self.m2 / max(self.n - 1, 1)
+            return None
+        z = (x - self.mean) / max(math.sqrt(self.var), self.min_std)
+        if self.high == 0:
+            self.high_start = day
+        if self.low == 0:
+            self.low_start = day
+        self.high = max(0.0, self.high + z - self.drift)
+        self.low = max(0.0, self.low - z - self.drift)
+        if self.high > self.threshold or self.low > self.threshold:
+            start = self.high_start if self.high > self.threshold else self.low_start
+            self.changepoints.append((row, start))
+            self._reset()
+            return start
+        delta = x - self.mean
+        self.mean += self.alpha * delta
+        self.var = (1 - self.alpha) * (self.var + self.alpha * delta * delta)
+        return None
+
+    def flagged(self, start=0, stop=None):
+        """Dates of the change points raised by rows ``start`` to ``stop``."""
+        stop = self.rows if stop is None else stop
+        return [day for row, day in self.changepoints if start <= row < stop]
+
+    def state(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_state(cls, state):
+        detector = cls(**{name: state[name] for name in cls.PARAMS})
+        vars(detector).update(state)
+        detector.changepoints = [tuple(cp) for cp in state["changepoints"]]
+        return detector
+
+
+class OnlineChangePoints:
+    """A ``Cusum`` per series of ``streams`` (daily.DailyStreams), kept in step."""
+
+    def __init__(self, streams, directory=CHECKPOINT_DIR, **params):
+        self.streams = streams
+        self.directory = directory
+        self.params = params
+        self.lock = threading.Lock()
+        self.detectors = {name: self._resume(name) for name in streams.streams}
+        self.sync()
+
+    def __getitem__(self, name):
+        return self.detectors[name]
+
+    def sync(self):
+        """Feed every detector the days its series gained since the last sync."""
+        with self.lock:
+            for name, detector in self.detectors.items():
+                stream = self.streams[name]
+                if detector.rows >= len(stream):
+                    continue
+                rows = stream.frame.iloc[detector.rows:]
+                for day, value in zip(rows[stream.spec.date].astype(str), rows[stream.spec.mean].tolist()):
+                    detector.update(day, value)
+                self._checkpoint(name, detector)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".json")
+
+    def _resume(self, name):
+        fresh = Cusum(**self.params)
+        try:
+            with open(self._path(name)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return fresh
+        if state.get("format") != FORMAT_VERSION or any(state["detector"].get(p) != getattr(fresh, p)
+                                                        for p in Cusum.PARAMS):
+            # another version or other parameters, start over
+            return fresh
+        detector = Cusum.from_state(state["detector"])
+        stream = self.streams[name]
+        frame = stream.frame
+        if not 0 < detector.rows <= len(frame):
+            return fresh
+        last = frame.iloc[detector.rows - 1]
+        if [str(last[stream.spec.date]), last[stream.spec.mean]] != detector.last:
+            # not the history this state was built from
+            return fresh
+        return detector
+
+    def _checkpoint(self, name, detector):
+        state = {"format": FORMAT_VERSION, "detector": detector.state()}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with atomic_write(self._path(name)) as f:
+                json.dump(state, f)
+        except OSError:
+            # read-only checkout, detection still runs in memory
+            pass
@@ -0,0 +1,189 @@
+"""Offline batch of change points for many series, detectors and K or penalties.
+
+The change point pages fit on the request thread, one series and one setting at
+a time. This runs the same fits ahead of time over every (series, detector,
+K or penalty) combination in a process pool, and writes each result to an
+artifact store the callbacks read before fitting (``detectors.detect``):
+
+* exact Dynp goes through ``ChangePointIndex``, whose one fit yields every K, so
+  its entries land in ``CP_INDEX_DIR`` where the pages already look
+* every other detector is fitted once per series and mode, then each K or
+  penalty is predicted and stored as its own file under ``CP_STORE_DIR``
+
+The store is versioned twice over: ``FORMAT_VERSION`` names its top directory,
+and results are filed under the digest of the series values ChangePointIndex
+uses as well (``series_key``), so changed data never reads stale breakpoints.
+Every result is written atomically as soon as it is computed and the runner only
+submits the ones missing, so an interrupted run is resumed by running it again.
+
+    python precompute.py [--series NAME ...] [--detectors dynp binseg pelt]
+                         [--n-bkps 1 2 ...] [--penalties 0.5 1 2 5 10] [--workers N]
+
+covers the registered series (app.SERIES, including SERIES_DIR) by default and
+prints the throughput per core when done.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from changepoint_index import MAX_BKPS, series_key
+from detectors import DETECTORS, bad_parameters
+from files import atomic_write
+from segmentation import BadSegmentationParameters
+
+STORE_DIR = os.environ.get(
+    "CP_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cp_store")
+)
+FORMAT_VERSION = 2
+DEFAULT_DETECTORS = ("dynp", "binseg", "pelt")
+# what the pages can ask for: the dropdowns go up to K = 159
+DEFAULT_N_BKPS = tuple(range(1, MAX_BKPS))
+DEFAULT_PENALTIES = (0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+class ArtifactStore:
+    """Breakpoints by series digest, detector, mode and parameter, one file each."""
+
+    def __init__(self, directory=STORE_DIR):
+        self.root = os.path.join(directory, "v{}".format(FORMAT_VERSION))
+
+    def path(self, key, detector, mode, param):
+        return os.path.join(self.root, key[:2], key, detector, "{}-{!r}.json".format(mode, param))
+
+    def breakpoints(self, values, detector, mode, param, jump=1):
+        """Stored breakpoints, or None when this combination was not computed."""
+        try:
+            with open(self.path(series_key(values, jump=jump), detector, mode, param)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored["breakpoints"] is None:
+            raise BadSegmentationParameters
+        return stored["breakpoints"]
+
+    def missing(self, key, detector, mode, params):
+        return [p for p in params if not os.path.exists(self.path(key, detector, mode, p))]
+
+    def put(self, key, detector, mode, param, bkps):
+        path = self.path(key, detector, mode, param)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path) as f:
+            # None records parameters the series is too short for
+            json.dump({"format": FORMAT_VERSION, "detector": detector, "mode": mode,
+                       "param": param, "breakpoints": bkps}, f)
+
+
+def run_task(task):
+    """Fit one series with one detector and mode, store each of ``params``.
+
+    Runs in a pool worker; returns (name, detector, results, cpu seconds).
+    """
+    from changepoint_index import ChangePointIndex
+    from detectors import fitted, predict
+
+    name, values, detector, mode, params, jump, store_dir, index_dir = task
+    start = time.process_time()
+    if detector == "dynp":
+        # every K in one program, stored where the pages look for it
+        ChangePointIndex(cache_dir=index_dir, jump=jump).all_breakpoints(values)
+        return name, detector, len(params), time.process_time() - start
+    store, key = ArtifactStore(store_dir), series_key(values, jump=jump)
+    algo = fitted(values, detector, mode, jump)
+    for param in params:
+        try:
+            bkps = predict(algo, mode, param)
+        except bad_parameters():
+            bkps = None
+        store.put(key, detector, mode, param, bkps)
+    return name, detector, len(params), time.process_time() - start
+
+
+def plan(series, detectors=DEFAULT_DETECTORS, n_bkps=DEFAULT_N_BKPS, penalties=DEFAULT_PENALTIES,
+         jump=1, store_dir=STORE_DIR, index_dir=None):
+    """The tasks still to run for ``series`` ({name: values}), longest first."""
+    from changepoint_index import CACHE_DIR, ChangePointIndex
+
+    index_dir = CACHE_DIR if index_dir is None else index_dir
+    store, index = ArtifactStore(store_dir), ChangePointIndex(cache_dir=index_dir, jump=jump)
+    tasks = []
+    for name, values in series.items():
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        key = series_key(values, jump=jump)
+        for detector in detectors:
+            if detector == "dynp":
+                if not index.stored(values):
+                    tasks.append((name, values, detector, "n_bkps", list(n_bkps), jump, store_dir, index_dir))
+                continue
+            for mode, params in (("n_bkps", n_bkps), ("pen", penalties)):
+                if mode not in DETECTORS[detector].modes:
+                    continue
+                todo = store.missing(key, detector, mode, [float(p) if mode == "pen" else int(p) for p in params])
+                if todo:
+                    tasks.append((name, values, detector, mode, todo, jump, store_dir, index_dir))
+    # Dynp is quadratic in the length, so the longest fits start first
+    tasks.sort(key=lambda task: (task[2] == "dynp", len(task[1])), reverse=True)
+    return tasks
+
+
+def run(tasks, workers=None, progress=None):
+    """Run ``tasks`` on ``workers`` processes (in this one for 1); returns a summary."""
+    workers = workers or os.cpu_count() or 1
+    start, results, cpu = time.perf_counter(), 0, 0.0
+    if workers == 1:
+        done = map(run_task, tasks)
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        pool = ProcessPoolExecutor(max_workers=workers)
+        done = (future.result() for future in as_completed([pool.submit(run_task, task) for task in tasks]))
+    try:
+        for name, detector, count, seconds in done:
+            results += count
+            cpu += seconds
+            if progress is not None:
+                progress(name, detector, count)
+    finally:
+        if workers > 1:
+            pool.shutdown(cancel_futures=True)
+    wall = time.perf_counter() - start
+    return {"tasks": len(tasks), "results": results, "workers": workers, "wall": wall, "cpu": cpu,
+            "per_second": results / wall if wall else 0.0,
+            "per_core": results / (wall * workers) if wall else 0.0}
+
+
+def registered_series(names=None):
+    """Values of the registered series (all of them, or ``names``)."""
+    from app import SERIES
+
+    names = names or [s.name for s in SERIES]
+    series = {}
+    for name in names:
+        frame, value = SERIES.load(name)
+        series[name] = frame[value].values
+    return series
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--series", nargs="+", default=None, help="registered series names (default: all)")
+    parser.add_argument("--detectors", nargs="+", default=list(DEFAULT_DETECTORS), choices=list(DETECTORS))
+    parser.add_argument("--n-bkps", type=int, nargs="+", default=list(DEFAULT_N_BKPS))
+    parser.add_argument("--penalties", type=float, nargs="+", default=list(DEFAULT_PENALTIES))
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    tasks = plan(registered_series(args.series), args.detectors, args.n_bkps, args.penalties, store_dir=args.store)
+    report = None if args.quiet else lambda name, detector, count: print("{} {} {}".format(name, detector, count))
+    try:
+        summary = run(tasks, args.workers, report)
+    except KeyboardInterrupt:
+        raise SystemExit("interrupted; the results stored so far are kept, run again to resume")
+    print("{results} results in {tasks} tasks, {wall:.2f} s on {workers} workers: {per_second:.1f}/s, "
+          "{per_core:.1f}/s per core, {utilization:.0%} busy".format(
+              utilization=summary["cpu"] / (summary["wall"] * summary["workers"]) if summary["wall"] else 0.0,
+              **summary))
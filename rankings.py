@@ -0,0 +1,89 @@
+"""Top-K impact rankings, computed once per data version.
+
+Every series' impacts are sorted once per horizon (7 and 14 days ahead). The
+table columns and records the events page sends are kept ready to send, so
+"Calculate Top 10" only slices lists, and any K is a slice of the same ranking.
+``version`` is a digest of the impacts the rankings were built from. It tags the
+JSON payloads served from ``/rankings/<series>/<days>.json?k=<K>``, and with the
+series, days and K it is their ETag, so clients can keep them until the data
+changes.
+"""
+import hashlib
+import json
+from functools import lru_cache
+
+FORMAT_VERSION = 1
+RANKINGS_ROUTE = "/rankings/<series>/<int:days>.json"
+DEFAULT_K = 10
+
+
+class Rankings:
+    def __init__(self, impacts):
+        """``impacts`` maps series name -> impacts frame (impacts.event_impacts)."""
+        # pandas only when rankings are built, so registering the route stays cheap
+        import pandas as pd
+
+        from impacts import IMPACT_COLUMNS, impact_table
+
+        digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+        self.ranked = {}
+        self._records = {}
+        self._columns = {days: [{"name": c, "id": c} for c in ("Date", column, "Event Descriptions")]
+                         for days, column in IMPACT_COLUMNS.items()}
+        for series in sorted(impacts):
+            digest.update(series.encode("utf-8"))
+            digest.update(pd.util.hash_pandas_object(impacts[series], index=False).values.tobytes())
+            for days, column in IMPACT_COLUMNS.items():
+                # the same sort as impacts.top_impacts, done once instead of per click
+                ranked = impacts[series].sort_values(by=[column], ascending=False)
+                self.ranked[series, days] = ranked
+                self._records[series, days] = _records(impact_table(ranked, days))
+        self.version = digest.hexdigest()[:16]
+        self.payload = lru_cache(maxsize=64)(self._payload)
+
+    def columns(self, days):
+        return self._columns[days]
+
+    def top(self, series, days, k=DEFAULT_K):
+        """Top ``k`` impact rows (full frame rows) of ``series``."""
+        return self.ranked[series, days].head(k)
+
+    def records(self, series, days, k=DEFAULT_K):
+        """Top ``k`` table records, JSON ready. Shared between calls; do not mutate."""
+        return self._records[series, days][:k]
+
+    def _payload(self, series, days, k=DEFAULT_K):
+        return json.dumps({
+            "version": self.version, "series": series, "days": days, "k": k,
+            "columns": self.columns(days), "data": self.records(series, days, k),
+        }).encode("utf-8")
+
+
+def _records(table):
+    records = table.to_dict("records")
+    for record in records:
+        # what Dash's JSON encoder turns timestamps and NaN into
+        record["Date"] = record["Date"].isoformat()
+        for key, value in record.items():
+            if isinstance(value, float) and value != value:
+                record[key] = None
+    return records
+
+
+def register(server, load):
+    """Serve ranking payloads from ``server``; ``load()`` returns the Rankings."""
+    from flask import Response, abort, request
+
+    @server.route(RANKINGS_ROUTE)
+    def download_ranking(series, days):
+        rankings = load()
+        k = request.args.get("k", DEFAULT_K, type=int)
+        if (series, days) not in rankings.ranked or k < 0:
+            abort(404)
+        response = Response(rankings.payload(series, days, k), mimetype="application/json")
+        response.set_etag("{}-{}-{}-{}".format(rankings.version, series, days, k))
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    return download_ranking
@@ -0,0 +1,189 @@
+"""Downsampling of long chart traces to about the chart's width in points.
+
+A line chart cannot show more points than it has pixels across, so traces longer
+than ``RESAMPLE_POINTS`` are sent as a shape-preserving subset:
+
+* ``lttb`` (default): Largest-Triangle-Three-Buckets, one point per bucket,
+  the one making the largest triangle with its neighbours' picks
+* ``minmax``: the lowest and highest point of every bucket, which keeps every
+  spike at twice the points
+
+When a Graph's ``relayoutData`` reports a zoomed x range, the traces are
+resampled again within that range (plus one point either side so the lines
+reach the edges), so a zoom shows the full resolution once few enough points are
+in view. The payload then depends on ``RESAMPLE_POINTS``, not on the series.
+Figures get a fixed ``uirevision`` so the browser keeps the zoom when the
+resampled traces replace the old ones. ``resample_figure`` gives the figure as
+the pages send it, so it also switches dense figures to WebGL (figures.webgl),
+counting the points before resampling.
+
+Traces are plotly JSON dicts (``figure.to_plotly_json()``); only scatter traces
+with ordered x are resampled, and never the change point overlay. Turning a
+trace's dates into positions is most of the work, so the positions of the last
+``POSITIONS_CACHE`` x arrays are kept: zooming into a cached figure only costs
+the resampling.
+"""
+import os
+import threading
+from numbers import Number
+
+import numpy as np
+from cachetools import LRUCache
+
+from figures import CHANGEPOINTS_UID, webgl
+
+RESAMPLE_POINTS = int(os.environ.get("RESAMPLE_POINTS", "2000"))
+RESAMPLE_METHOD = os.environ.get("RESAMPLE_METHOD", "lttb")
+POSITIONS_CACHE = 32
+UIREVISION = "resample"
+
+
+def lttb(x, y, points):
+    """Indices of the ``points`` LTTB picks of ``(x, y)``, first and last included."""
+    length = len(y)
+    if points >= length or points < 3:
+        return np.arange(length)
+    y = _filled(y)
+    # points - 2 buckets between the first and the last point
+    edges = np.linspace(1, length - 1, points - 1).astype(np.int64)
+    out = np.empty(points, dtype=np.int64)
+    out[0], out[-1] = 0, length - 1
+    picked = 0
+    for i in range(points - 2):
+        start, stop = edges[i], edges[i + 1]
+        # the average of the next bucket stands in for its (unknown) pick
+        following = slice(stop, edges[i + 2] if i + 2 < len(edges) else length)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        area = np.abs((x[picked] - mean_x) * (y[start:stop] - y[picked])
+                      - (x[picked] - x[start:stop]) * (mean_y - y[picked]))
+        picked = start + int(np.argmax(area))
+        out[i + 1] = picked
+    return out
+
+
+def minmax(x, y, points):
+    """Indices of the lowest and highest point of ``points // 2`` buckets."""
+    length = len(y)
+    if points >= length or points < 2:
+        return np.arange(length)
+    y = _filled(y)
+    starts = np.linspace(0, length, points // 2 + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, length)))
+    picks = [np.array([0, length - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        hits = np.flatnonzero(y == extreme[bucket])
+        # the first hit of every bucket
+        picks.append(hits[np.unique(bucket[hits], return_index=True)[1]])
+    return np.unique(np.concatenate(picks))
+
+
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+
+def _filled(y):
+    # gaps take the last value before them, so they never win a bucket
+    y = np.asarray(y, dtype=np.float64)
+    missing = ~np.isfinite(y)
+    if not missing.any():
+        return y
+    last = np.where(missing, 0, np.arange(len(y)))
+    np.maximum.accumulate(last, out=last)
+    filled = y[last]
+    filled[~np.isfinite(filled)] = 0.0
+    return filled
+
+
+def positions(x):
+    """``x`` as float positions: numbers as they are, dates as nanoseconds."""
+    if isinstance(x, np.ndarray) and x.dtype.kind in "iuf" or len(x) and isinstance(x[0], Number):
+        return np.asarray(x, dtype=np.float64)
+    import pandas as pd
+
+    return pd.to_datetime(_objects(x)).values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+
+
+def _objects(x):
+    if isinstance(x, np.ndarray):
+        return x
+    try:
+        # numpy >= 1.23; np.asarray is much slower on a list of datetimes
+        return np.fromiter(x, dtype=object, count=len(x))
+    except ValueError:
+        return np.asarray(x, dtype=object)
+
+
+_positions = LRUCache(POSITIONS_CACHE)
+_positions_lock = threading.Lock()
+
+
+def cached_positions(x):
+    # keyed by the array itself, which the entry keeps alive so its id stays unique
+    with _positions_lock:
+        entry = _positions.get(id(x))
+    if entry is None or entry[0] is not x:
+        entry = (x, positions(x))
+        with _positions_lock:
+            _positions[id(x)] = entry
+    return entry[1]
+
+
+def zoom_range(relayout, axis="xaxis"):
+    """What ``relayoutData`` says about the x range: ``(low, high)`` positions,
+    None for the full range (double click, autorange), False for nothing."""
+    if not relayout:
+        return False
+    if relayout.get(axis + ".autorange"):
+        return None
+    if axis + ".range[0]" in relayout and axis + ".range[1]" in relayout:
+        bounds = [relayout[axis + ".range[0]"], relayout[axis + ".range[1]"]]
+    elif axis + ".range" in relayout:
+        bounds = relayout[axis + ".range"]
+    else:
+        return False
+    low, high = positions(np.array(bounds, dtype=object))
+    return low, high
+
+
+def resamplable(trace, points=RESAMPLE_POINTS):
+    return (trace.get("type", "scatter") in ("scatter", "scattergl") and trace.get("uid") != CHANGEPOINTS_UID
+            and trace.get("x") is not None and trace.get("y") is not None and len(trace["y"]) > points)
+
+
+def resample_trace(trace, x_range=None, points=RESAMPLE_POINTS, method=RESAMPLE_METHOD, stop=None):
+    """A copy of ``trace`` with at most about ``points`` of its first ``stop``
+    points in ``x_range``."""
+    x, y = trace["x"], np.asarray(trace["y"])
+    pos = cached_positions(x)
+    low, high = 0, len(pos) if stop is None else min(stop, len(pos))
+    if x_range:
+        low = max(int(np.searchsorted(pos[:high], x_range[0], "left")) - 1, 0)
+        high = min(int(np.searchsorted(pos[:high], x_range[1], "right")) + 1, high)
+    picks = low + METHODS[method](pos[low:high], y[low:high], points)
+    return dict(trace, x=x[picks] if isinstance(x, np.ndarray) else [x[i] for i in picks], y=y[picks])
+
+
+def resample_figure(figure, x_range=None, points=RESAMPLE_POINTS, method=RESAMPLE_METHOD):
+    """A copy of the figure (dict or go.Figure) with its long traces resampled,
+    in WebGL when the full traces are dense."""
+    if not isinstance(figure, dict):
+        figure = figure.to_plotly_json()
+    # decided on the full traces: resampled, none is longer than RESAMPLE_POINTS,
+    # and a zoom must not switch the trace type under the browser
+    figure = webgl(figure)
+    data = [resample_trace(trace, x_range, points, method) if resamplable(trace, points) else trace
+            for trace in figure["data"]]
+    return dict(figure, data=data, layout=dict(figure.get("layout", {}), uirevision=UIREVISION))
+
+
+def zoom_patch(figure, relayout, points=RESAMPLE_POINTS, method=RESAMPLE_METHOD, stop=None):
+    """The long traces of ``figure`` (up to ``stop`` points) resampled for a zoom,
+    as a patch for ``figures.patched`` in assets/figure_patches.js; None when
+    the relayout did not change the x range or no trace is long."""
+    x_range = zoom_range(relayout)
+    indices = [i for i, trace in enumerate(figure["data"]) if resamplable(trace, points)]
+    if x_range is False or not indices:
+        return None
+    traces = [resample_trace(figure["data"][i], x_range, points, method, stop) for i in indices]
+    return {"op": "resample", "indices": indices,
+            "x": [trace["x"] for trace in traces], "y": [trace["y"] for trace in traces]}
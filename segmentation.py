@@ -0,0 +1,231 @@
+"""Vectorized l2 change point segmentation.
+
+``L2Dynp`` is a drop-in replacement for ``rpt.Dynp(model="l2", ...)``: it returns
+the same breakpoints, but segment costs come from cumulative sums and cumulative
+sums of squares and the dynamic program runs one NumPy array operation per
+number of breakpoints instead of one Python call per segment. ``L2Pelt`` and
+``L2Binseg`` do the same for ``rpt.Pelt`` and ``rpt.Binseg``.
+
+When several partitions have exactly the same cost (piecewise constant or
+integer valued signals) the one returned is still optimal, but can differ from
+the one ruptures happens to pick.
+"""
+from math import ceil
+
+import numpy as np
+
+# ends are processed in column blocks so memory stays O(n * BLOCK_SIZE)
+BLOCK_SIZE = 2048
+# relative tolerance under which two candidate partitions count as a tie; ties go
+# to the earliest breakpoint, which is what ruptures picks for exact ties
+TIE_RTOL = 1e-10
+
+
+class BadSegmentationParameters(Exception):
+    pass
+
+
+def sanity_check(n_samples, n_bkps, jump, min_size):
+    # same admissibility rule as ruptures.utils.sanity_check
+    if n_bkps > n_samples // jump:
+        return False
+    if n_bkps * ceil(min_size / jump) * jump + min_size > n_samples:
+        return False
+    return True
+
+
+class _L2Cost:
+    """Least squared deviation cost on cumulative sums, shared by the detectors below."""
+
+    def __init__(self, min_size=2, jump=5):
+        # CostL2 itself accepts one-sample segments, as in ruptures
+        self.min_size = max(min_size, 1)
+        self.jump = jump
+        self.n_samples = None
+
+    def fit(self, signal):
+        signal = np.asarray(signal, dtype=np.float64)
+        if signal.ndim == 1:
+            signal = signal.reshape(-1, 1)
+        # l2 costs do not depend on the offset, centering keeps the sums small
+        signal = signal - signal.mean(axis=0)
+        n = signal.shape[0]
+        self.n_samples = n
+        self._csum = np.zeros((n + 1, signal.shape[1]))
+        np.cumsum(signal, axis=0, out=self._csum[1:])
+        self._csum_sq = np.zeros(n + 1)
+        np.cumsum((signal ** 2).sum(axis=1), out=self._csum_sq[1:])
+        return self
+
+    def error(self, start, end):
+        seg_sum = self._csum[end] - self._csum[start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cost = self._csum_sq[end] - self._csum_sq[start] - (seg_sum ** 2).sum(axis=-1) / (end - start)
+        return np.maximum(cost, 0.0)
+
+    def sum_of_costs(self, bkps):
+        bkps = np.asarray(bkps)
+        return float(self.error(np.r_[0, bkps[:-1]], bkps).sum())
+
+
+class L2Dynp(_L2Cost):
+    """Exact segmentation with a fixed number of breakpoints, like ``rpt.Dynp``."""
+
+    def __init__(self, min_size=2, jump=5):
+        super().__init__(min_size, jump)
+        self._tables = None
+
+    def fit(self, signal):
+        super().fit(signal)
+        # admissible breakpoints are multiples of jump, the last end is n
+        self._bkps = np.arange(0, self.n_samples, self.jump)
+        self._ends = np.append(self._bkps, self.n_samples)
+        self._tables = None
+        return self
+
+    def predict(self, n_bkps):
+        if not sanity_check(self.n_samples, n_bkps, self.jump, self.min_size):
+            raise BadSegmentationParameters
+        self._solve(n_bkps)
+        return self._backtrack(n_bkps)
+
+    def predict_all(self, max_bkps):
+        """Return ``{K: predict(K)}`` for every feasible K up to ``max_bkps`` from one pass."""
+        feasible = [k for k in range(1, max_bkps + 1)
+                    if sanity_check(self.n_samples, k, self.jump, self.min_size)]
+        if not feasible:
+            return {}
+        self._solve(feasible[-1])
+        return {k: self._backtrack(k) for k in feasible}
+
+    def fit_predict(self, signal, n_bkps):
+        self.fit(signal)
+        return self.predict(n_bkps)
+
+    def _solve(self, n_bkps):
+        if self._tables is not None and len(self._tables[1]) > n_bkps:
+            return
+        ends, bkps = self._ends, self._bkps
+        # best[k][i]: optimal cost of signal[:ends[i]] with k breakpoints
+        best = [self.error(0, ends)]
+        # last[k][i]: last breakpoint of that optimal partition
+        last = [None]
+        for k in range(1, n_bkps + 1):
+            # the left part signal[:b] must itself fit k - 1 breakpoints
+            left_ok = ((bkps // self.jump >= k - 1)
+                       & ((k - 1) * ceil(self.min_size / self.jump) * self.jump + self.min_size <= bkps))
+            cand = bkps[left_ok]
+            prev = best[k - 1][np.searchsorted(ends, cand)]
+            cost = np.full(len(ends), np.inf)
+            arg = np.full(len(ends), -1, dtype=np.int64)
+            for lo in range(0, len(ends) if len(cand) else 0, BLOCK_SIZE):
+                blk = ends[lo:lo + BLOCK_SIZE]
+                total = prev[:, None] + self.error(cand[:, None], blk[None, :])
+                # and the last segment must be at least min_size long
+                total[blk[None, :] - cand[:, None] < self.min_size] = np.inf
+                low = total.min(axis=0)
+                tied = total <= low + TIE_RTOL * np.abs(low)
+                cost[lo:lo + BLOCK_SIZE] = low
+                arg[lo:lo + BLOCK_SIZE] = np.where(np.isfinite(low), cand[tied.argmax(axis=0)], -1)
+            best.append(cost)
+            last.append(arg)
+        self._tables = (best, last)
+
+    def _backtrack(self, n_bkps):
+        last = self._tables[1]
+        end = self.n_samples
+        bkps = [end]
+        for k in range(n_bkps, 0, -1):
+            end = int(last[k][np.searchsorted(self._ends, end)])
+            bkps.append(end)
+        return sorted(bkps)
+
+
+class L2Pelt(_L2Cost):
+    """Penalized segmentation with pruning, like ``rpt.Pelt``.
+
+    One vectorized cost evaluation over the surviving candidates per sample, so
+    the run time is close to linear in the series length.
+    """
+
+    def predict(self, pen):
+        if not sanity_check(self.n_samples, 1, self.jump, self.min_size):
+            raise BadSegmentationParameters
+        n, jump, min_size = self.n_samples, self.jump, self.min_size
+        # best[t]: penalized cost of the best partition of signal[:t]
+        best = np.full(n + 1, np.nan)
+        best[0] = 0.0
+        last = np.zeros(n + 1, dtype=np.int64)
+        admissible = np.empty(0, dtype=np.int64)
+        ends = [k for k in range(0, n, jump) if k >= min_size] + [n]
+        for end in ends:
+            new_adm = (end - min_size) // jump * jump
+            if not np.isnan(best[new_adm]):
+                admissible = np.append(admissible, new_adm)
+            crit = best[admissible] + (self.error(admissible, end) + pen)
+            low = crit.min()
+            pick = int(np.argmax(crit <= low + TIE_RTOL * abs(low)))
+            best[end] = low
+            last[end] = admissible[pick]
+            # candidates that cannot win anymore are dropped for good
+            admissible = admissible[crit <= low + pen]
+        bkps = [n]
+        while bkps[-1] > 0:
+            bkps.append(int(last[bkps[-1]]))
+        return sorted(bkps[:-1])
+
+    def fit_predict(self, signal, pen):
+        self.fit(signal)
+        return self.predict(pen)
+
+
+class L2Binseg(_L2Cost):
+    """Greedy binary segmentation, like ``rpt.Binseg``."""
+
+    def fit(self, signal):
+        super().fit(signal)
+        self._splits = {}
+        return self
+
+    def predict(self, n_bkps=None, pen=None, epsilon=None):
+        assert n_bkps is not None or pen is not None or epsilon is not None, \
+            "Give a parameter."
+        if n_bkps is not None and not sanity_check(self.n_samples, n_bkps, self.jump, self.min_size):
+            raise BadSegmentationParameters
+        bkps = [self.n_samples]
+        while True:
+            starts = [0] + bkps[:-1]
+            splits = [self._single_bkp(start, end) for start, end in zip(starts, bkps)]
+            bkp, gain = max(splits, key=lambda x: x[1])
+            if bkp is None:
+                break
+            if n_bkps is not None:
+                go_on = len(bkps) - 1 < n_bkps
+            elif pen is not None:
+                go_on = gain > pen
+            else:
+                go_on = self.sum_of_costs(bkps) > epsilon
+            if not go_on:
+                break
+            bkps.append(bkp)
+            bkps.sort()
+        return bkps
+
+    def fit_predict(self, signal, n_bkps=None, pen=None, epsilon=None):
+        self.fit(signal)
+        return self.predict(n_bkps=n_bkps, pen=pen, epsilon=epsilon)
+
+    def _single_bkp(self, start, end):
+        key = (start, end)
+        if key not in self._splits:
+            cand = np.arange(start, end, self.jump)
+            cand = cand[(cand - start >= self.min_size) & (end - cand >= self.min_size)]
+            if not len(cand):
+                self._splits[key] = (None, 0)
+            else:
+                gain = self.error(start, end) - self.error(start, cand) - self.error(cand, end)
+                top = gain.max()
+                # ruptures keeps the last breakpoint among equal gains
+                pick = len(cand) - 1 - int(np.argmax((gain >= top - TIE_RTOL * abs(top))[::-1]))
+                self._splits[key] = (int(cand[pick]), float(gain[pick]))
+        return self._splits[key]
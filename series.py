@@ -0,0 +1,111 @@
+"""Registry of the time series the change point pages are built from.
+
+Every series is described once, by its name, label, value column and a loader.
+Pages and callbacks are generated from these descriptions (``/series/<name>`` in
+app.py, with pattern-matching callbacks shared by all series), so adding a
+series does not add code. The series with ``events`` set are the ones the
+events page, the rankings and the exports cover.
+
+Loading is lazy: describing a series reads nothing, and its frame is loaded on
+first access and kept in an LRU of ``SERIES_CACHE_SIZE`` frames, so memory and
+startup grow with the series actually viewed rather than the series known.
+
+Besides the series registered in app.py, every ``<name>.csv`` in ``SERIES_DIR``
+is registered with ``discover``. Such a file needs a ``Date`` column; its value
+column is the one named in an optional ``series.json`` in the same directory
+(``{"<name>": {"label": ..., "value": ...}}``), or else its first column other
+than ``Date`` and the index.
+"""
+import glob
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from cachetools import LRUCache
+
+SERIES_DIR = os.environ.get("SERIES_DIR") or None
+CACHE_SIZE = int(os.environ.get("SERIES_CACHE_SIZE", "64"))
+MANIFEST = "series.json"
+FORECAST_COLUMN = "7 days Ahead Forecasted Values"
+
+Series = namedtuple("Series", ["name", "label", "value", "load", "events"])
+# a loaded series: its frame (sorted by Date) and the resolved value column
+LoadedSeries = namedtuple("LoadedSeries", ["frame", "value"])
+
+
+class SeriesRegistry:
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.series = OrderedDict()
+        self.loaded = LRUCache(cache_size)
+        # tag of the discovered files, part of the callback cache version
+        self.version = ""
+        self.lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.series
+
+    def __getitem__(self, name):
+        return self.series[name]
+
+    def __iter__(self):
+        return iter(self.series.values())
+
+    def __len__(self):
+        return len(self.series)
+
+    def register(self, name, label, value, load, events=False):
+        """Describe a series; ``load()`` returns its frame, ``value`` may be None
+        to take the first column other than Date."""
+        self.series[name] = Series(name, label, value, load, events)
+        return self.series[name]
+
+    def event_series(self):
+        return [series for series in self if series.events]
+
+    def load(self, name):
+        """The ``LoadedSeries`` of ``name``, loading it on first access."""
+        with self.lock:
+            loaded = self.loaded.get(name)
+        if loaded is None:
+            series = self.series[name]
+            frame = series.load()
+            loaded = LoadedSeries(frame, series.value or value_column(frame.columns))
+            with self.lock:
+                self.loaded[name] = loaded
+        return loaded
+
+    def discover(self, directory):
+        """Register every ``<name>.csv`` in ``directory``; reads no data."""
+        import hashlib
+        from functools import partial
+
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        digest = hashlib.sha1(self.version.encode("utf-8"))
+        for path in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+            stat = os.stat(path)
+            digest.update("{}:{}:{}\n".format(path, stat.st_size, stat.st_mtime_ns).encode("utf-8"))
+            name = os.path.basename(path)[:-len(".csv")]
+            if name in self.series:
+                continue
+            entry = manifest.get(name, {})
+            self.register(name, entry.get("label", name.replace("_", " ")), entry.get("value"),
+                          partial(read_series, path), events=False)
+        self.version = digest.hexdigest()[:12]
+        return self
+
+
+def value_column(columns):
+    return next(c for c in columns if c not in ("Date", "") and not c.startswith("Unnamed"))
+
+
+def read_series(path):
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    frame["Date"] = pd.to_datetime(frame["Date"])
+    return frame.sort_values("Date").reset_index(drop=True)
@@ -0,0 +1,130 @@
+"""Columnar binary snapshot of the prepared data frames.
+
+Every column is stored as its own ``.npy`` file and memory-mapped on load, so a
+booting worker skips CSV parsing, date conversion and the event merge. Numeric
+and date columns stay backed by the mapped files, so every worker reads the
+same pages of the OS page cache. Text columns are dictionary encoded (int32
+codes per row plus one UTF-8 blob with offsets) and decoded into memory on load.
+
+Snapshots live in ``SNAPSHOT_DIR/<digest of the source CSVs>/``, so editing a CSV
+simply makes the app look for (and write) a new one. Events are not part of it:
+they come from the event store (events.py) and are attached on load, so adding
+events does not invalidate the snapshot. Build it ahead of time with
+
+    python snapshot.py
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data import EVENT_SERIES, ROOT, SOURCES, prepare_frames
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(ROOT, ".snapshot"))
+FORMAT_VERSION = 2
+
+
+def sources_digest(root=ROOT):
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    for name in sorted(SOURCES):
+        if name == "events":
+            continue
+        with open(os.path.join(root, SOURCES[name]), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def snapshot_path(root=ROOT, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, sources_digest(root))
+
+
+def write(frames, root=ROOT, snapshot_dir=SNAPSHOT_DIR):
+    """Write ``frames`` (name -> DataFrame) as the snapshot of the current CSVs."""
+    target = snapshot_path(root, snapshot_dir)
+    if os.path.isdir(target):
+        return target
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=snapshot_dir, prefix=".tmp-")
+    except OSError:
+        # read-only checkout, keep parsing the CSVs
+        return None
+    manifest = {"version": FORMAT_VERSION, "frames": {}}
+    for name, frame in frames.items():
+        if name == "events":
+            continue
+        columns = []
+        for position, column in enumerate(frame.columns):
+            if name in EVENT_SERIES and column == "Event Descriptions":
+                continue
+            stem = "{}.{}".format(name, position)
+            kind = _write_column(os.path.join(tmp, stem), frame[column])
+            columns.append({"name": column, "file": stem, "kind": kind})
+        manifest["frames"][name] = {"columns": columns, "rows": len(frame)}
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # another worker finished the same snapshot first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return target
+
+
+def load(root=ROOT, snapshot_dir=SNAPSHOT_DIR):
+    """Return the frames of the current snapshot, or None when there is none."""
+    path = snapshot_path(root, snapshot_dir)
+    try:
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != FORMAT_VERSION:
+        return None
+    frames = {}
+    for name, spec in manifest["frames"].items():
+        # copy=False keeps one block per column on top of the mapped file; the
+        # default would consolidate them into new arrays on the heap
+        frames[name] = pd.DataFrame(
+            {c["name"]: _read_column(os.path.join(path, c["file"]), c["kind"]) for c in spec["columns"]},
+            index=pd.RangeIndex(spec["rows"]), copy=False,
+        )
+    return frames
+
+
+def _write_column(stem, series):
+    values = series.values
+    if np.issubdtype(values.dtype, np.datetime64):
+        np.save(stem + ".npy", values.astype("datetime64[ns]").view(np.int64))
+        return "datetime"
+    if values.dtype != object:
+        np.save(stem + ".npy", values)
+        return "numeric"
+    codes, uniques = pd.factorize(series)
+    encoded = [str(value).encode("utf-8") for value in uniques]
+    np.save(stem + ".npy", codes.astype(np.int32))
+    np.save(stem + ".offsets.npy", np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64))
+    np.save(stem + ".text.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    return "text"
+
+
+def _read_column(stem, kind):
+    values = np.load(stem + ".npy", mmap_mode="r")
+    if kind == "datetime":
+        return values.view("datetime64[ns]")
+    if kind == "numeric":
+        return values
+    offsets = np.load(stem + ".offsets.npy")
+    blob = np.load(stem + ".text.npy", mmap_mode="r").tobytes()
+    uniques = np.array([blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])] + [np.nan],
+                       dtype=object)
+    # code -1 (missing) picks the trailing NaN
+    return uniques[values]
+
+
+if __name__ == "__main__":
+    print(write(prepare_frames()) or "snapshot directory is not writable")
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# the app's modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def daily_root(tmp_path):
+    """A copy of the daily series CSVs, and their frames as data.load_frames reads them."""
+    from daily import DAILY_SERIES
+
+    frames = {}
+    for name, spec in DAILY_SERIES.items():
+        frames[name] = pd.read_csv(os.path.join(ROOT, spec.source))
+        frames[name].to_csv(str(tmp_path / spec.source), index=False)
+    return str(tmp_path), frames
+
+
+def impacts(scale):
+    return pd.DataFrame({"Date": pd.date_range("2020-03-01", periods=12),
+                         "Abs 7 day Difference": [scale * i for i in range(12)],
+                         "Abs 14 day Difference": [scale * (12 - i) for i in range(12)],
+                         "Event Descriptions": ["event {}".format(i) for i in range(12)]})
+
+
+@pytest.fixture
+def event_rankings():
+    """Rankings of two made-up event series, subway's impacts twice covid's."""
+    from rankings import Rankings
+
+    return Rankings({"covid": impacts(1.0), "subway": impacts(2.0)})
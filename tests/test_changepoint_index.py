@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from changepoint_index import ChangePointIndex, series_key
+from segmentation import BadSegmentationParameters, L2Dynp
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(1)
+    return np.repeat([0.0, 5.0, -3.0, 2.0], 25) + rng.normal(size=100)
+
+
+def test_fits_on_a_miss_and_stores_every_k(tmp_path, values):
+    index = ChangePointIndex(cache_dir=str(tmp_path), max_bkps=6)
+    assert not index.stored(values)
+    assert index.breakpoints(values, 3) == L2Dynp(jump=1).fit(values).predict(3)
+    assert index.stored(values)
+    assert sorted(index.all_breakpoints(values)) == list(range(1, 7))
+
+
+def test_reads_back_from_disk(tmp_path, values, monkeypatch):
+    expected = ChangePointIndex(cache_dir=str(tmp_path), max_bkps=6).breakpoints(values, 4)
+    restarted = ChangePointIndex(cache_dir=str(tmp_path), max_bkps=6)
+    monkeypatch.setattr(restarted, "_fit", lambda values: pytest.fail("refitted a stored series"))
+    assert restarted.breakpoints(values, 4) == expected
+
+
+def test_clear_forgets_only_the_memory(tmp_path, values, monkeypatch):
+    index = ChangePointIndex(cache_dir=str(tmp_path), max_bkps=6)
+    expected = index.breakpoints(values, 4)
+    index.clear()
+    monkeypatch.setattr(index, "_fit", lambda values: pytest.fail("refitted a stored series"))
+    monkeypatch.setattr(index, "_load", lambda key, load=index._load: loaded.append(key) or load(key))
+    loaded = []
+    assert index.breakpoints(values, 4) == expected
+    assert len(loaded) == 1
+
+
+def test_other_values_miss(tmp_path, values):
+    index = ChangePointIndex(cache_dir=str(tmp_path), max_bkps=6)
+    index.all_breakpoints(values)
+    changed = values.copy()
+    changed[-1] += 1
+    assert series_key(changed, max_bkps=6) != series_key(values, max_bkps=6)
+    assert not index.stored(changed)
+
+
+def test_k_beyond_the_index_raises(tmp_path, values):
+    index = ChangePointIndex(cache_dir=str(tmp_path), max_bkps=6)
+    with pytest.raises(BadSegmentationParameters):
+        index.breakpoints(values, 7)
+
+
+def test_k_beyond_the_series_raises(tmp_path):
+    index = ChangePointIndex(cache_dir=str(tmp_path), max_bkps=6)
+    with pytest.raises(BadSegmentationParameters):
+        index.breakpoints(np.arange(5.0), 4)
+
+
+def test_unwritable_cache_dir_still_answers(tmp_path, values):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    index = ChangePointIndex(cache_dir=str(blocker / "index"), max_bkps=6)
+    assert index.breakpoints(values, 2) == L2Dynp(jump=1).fit(values).predict(2)
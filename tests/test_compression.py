@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import brotli
+import dash
+import dash_html_components as html
+import flask
+import pytest
+
+import compression
+import rankings
+
+BODY = json.dumps({"values": list(range(2000))})
+
+
+@pytest.fixture
+def client(event_rankings):
+    app = dash.Dash(__name__, compress=False)
+    app.layout = html.Div()
+    store = compression.register(app)
+
+    @app.server.route("/tagged.json")
+    def tagged():
+        response = flask.Response(BODY, mimetype="application/json")
+        response.set_etag("v1")
+        return response
+
+    @app.server.route("/other.json")
+    def other():
+        # another resource that happens to use the same ETag
+        response = flask.Response(BODY.replace("values", "others"), mimetype="application/json")
+        response.set_etag("v1")
+        return response
+
+    rankings.register(app.server, lambda: event_rankings)
+
+    @app.server.route("/plain.json")
+    def plain():
+        return flask.Response(BODY, mimetype="application/json")
+
+    @app.server.route("/small.json")
+    def small():
+        return flask.Response("{}", mimetype="application/json")
+
+    client = app.server.test_client()
+    client.store = store
+    return client
+
+
+def test_prefers_brotli(client):
+    response = client.get("/plain.json", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.get_data()).decode() == BODY
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_gzip(client):
+    response = client.get("/plain.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()).decode() == BODY
+
+
+def test_identity_and_small_bodies_are_left_alone(client):
+    assert "Content-Encoding" not in client.get("/plain.json").headers
+    response = client.get("/small.json", headers={"Accept-Encoding": "br"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == b"{}"
+
+
+def test_strong_etag_is_precompressed_and_tagged_per_encoding(client):
+    response = client.get("/tagged.json", headers={"Accept-Encoding": "gzip"})
+    assert response.get_etag() == ("v1:gzip", False)
+    assert gzip.decompress(response.get_data()).decode() == BODY
+    assert len(client.store.cache) == 1
+    client.get("/tagged.json", headers={"Accept-Encoding": "gzip"})
+    assert len(client.store.cache) == 1
+    # per-request bodies are not kept
+    client.get("/plain.json", headers={"Accept-Encoding": "gzip"})
+    assert len(client.store.cache) == 1
+
+
+def test_not_modified_per_encoding(client):
+    response = client.get("/tagged.json", headers={"Accept-Encoding": "br", "If-None-Match": '"v1:br"'})
+    assert response.status_code == 304
+    assert response.get_etag() == ("v1:br", False)
+    response = client.get("/tagged.json", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1:br"'})
+    assert response.status_code == 200
+
+
+def test_precompressed_bodies_are_per_url(client):
+    gzipped = {"Accept-Encoding": "gzip"}
+    assert gzip.decompress(client.get("/tagged.json", headers=gzipped).get_data()).decode() == BODY
+    other = gzip.decompress(client.get("/other.json", headers=gzipped).get_data()).decode()
+    assert other == BODY.replace("values", "others")
+
+
+def test_rankings_are_compressed_per_resource(client):
+    gzipped = {"Accept-Encoding": "gzip"}
+    urls = ["/rankings/covid/7.json?k=10", "/rankings/subway/14.json?k=10", "/rankings/covid/7.json?k=5"]
+    bodies = [client.get(url, headers=gzipped) for url in urls]
+    assert all(response.headers["Content-Encoding"] == "gzip" for response in bodies[:2])
+    payloads = [json.loads(gzip.decompress(response.get_data()) if response.headers.get("Content-Encoding")
+                           else response.get_data()) for response in bodies]
+    assert [(p["series"], p["days"], p["k"]) for p in payloads] == [("covid", 7, 10), ("subway", 14, 10),
+                                                                    ("covid", 7, 5)]
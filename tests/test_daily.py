@@ -0,0 +1,35 @@
+import os
+
+from daily import DailyStreams, append_rows, sources_version
+
+
+def test_dropped_rows_extend_the_series(daily_root):
+    root, frames = daily_root
+    drop = os.path.join(root, "drop")
+    streams = DailyStreams(frames, root=root, drop_dir=drop)
+    stream = streams["rt_covid"]
+    length, window = len(stream), stream.frame["CASE_COUNT"].tolist()[-6:]
+    append_rows("rt_covid", [("2021-08-28", 1400), ("2021-08-27", 1), ("2021-08-29", 1500)], drop_dir=drop)
+    streams.poll(force=True)
+    # the row dated before the last day is skipped
+    assert len(stream) == length + 2
+    assert stream.frame["MA Cases"].iloc[-1] == (sum(window[1:]) + 1400 + 1500) / 7
+    assert frames["rt_covid"] is stream.frame
+    assert streams.version == sources_version(root, drop)
+
+
+def test_restart_reads_the_drop_directory_again(daily_root):
+    root, frames = daily_root
+    drop = os.path.join(root, "drop")
+    append_rows("rt_subway", [("2021-08-30", 1400000)], drop_dir=drop)
+    streams = DailyStreams(dict(frames), root=root, drop_dir=drop)
+    assert streams["rt_subway"].frame["Date"].iloc[-1] == "2021-08-30"
+    # a row written in two parts is only read once it is complete
+    with open(os.path.join(drop, "rt_subway.csv"), "a") as f:
+        f.write("2021-08-31,15")
+    assert streams.poll(force=True) == streams.version
+    assert streams["rt_subway"].frame["Date"].iloc[-1] == "2021-08-30"
+    with open(os.path.join(drop, "rt_subway.csv"), "a") as f:
+        f.write("00000\n")
+    streams.poll(force=True)
+    assert streams["rt_subway"].frame["Subways: Total Estimated Ridership"].iloc[-1] == 1500000
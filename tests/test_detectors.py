@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from detectors import DETECTORS, bad_parameters, detect, max_bkps
+
+
+@pytest.mark.parametrize("detector", [name for name, d in DETECTORS.items() if "n_bkps" in d.modes])
+@pytest.mark.parametrize("n", [8, 13, 40])
+def test_max_bkps_is_the_limit(detector, n):
+    values = np.r_[np.zeros(n // 2), np.ones(n - n // 2)] + np.random.default_rng(n).normal(scale=0.1, size=n)
+    bkps = detect(values, detector, n_bkps=max_bkps(n))
+    # the greedy detectors can run out of splits before K
+    assert bkps[-1] == n and len(bkps) <= max_bkps(n) + 1
+    if detector == "dynp":
+        assert len(bkps) == max_bkps(n) + 1
+    with pytest.raises(bad_parameters()):
+        detect(values, detector, n_bkps=max_bkps(n) + 1)
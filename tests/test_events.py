@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+
+from events import EventStore
+
+
+def write(path, rows, mode="w"):
+    with open(path, mode) as f:
+        if mode == "w":
+            f.write("Date,Event Descriptions\n")
+        f.writelines("{},{}\n".format(day, text) for day, text in rows)
+
+
+def descriptions(store):
+    return dict(zip(store.event_data()["Date"].dt.strftime("%Y-%m-%d"), store.event_data()["Event Descriptions"]))
+
+
+def test_appended_rows(tmp_path):
+    source = tmp_path / "events.csv"
+    write(source, [("2020-03-03", "a"), ("2020-03-05", "b")])
+    store = EventStore(str(tmp_path / "store"))
+    assert store.sync(str(source)) == pd.Timestamp("2020-03-03")
+    assert store.sync(str(source)) is None
+    write(source, [("2020-03-04", "c"), ("2020-03-05", "b")], mode="a")
+    assert store.sync(str(source)) == pd.Timestamp("2020-03-04")
+    assert descriptions(store) == {"2020-03-03": "a", "2020-03-04": "c", "2020-03-05": "b"}
+
+
+def test_edited_and_removed_rows_rebuild(tmp_path):
+    source = tmp_path / "events.csv"
+    write(source, [("2020-03-03", "a"), ("2020-03-05", "b"), ("2020-03-07", "c")])
+    store = EventStore(str(tmp_path / "store"))
+    store.sync(str(source))
+    write(source, [("2020-03-05", "b edited"), ("2020-03-07", "c")])
+    assert store.sync(str(source)) == pd.Timestamp("2020-03-03")
+    assert descriptions(store) == {"2020-03-05": "b edited", "2020-03-07": "c"}
+    # and so does a restarted store reading it back
+    assert descriptions(EventStore(str(tmp_path / "store"))) == descriptions(store)
+
+
+def test_sync_without_new_rows_writes_nothing(tmp_path):
+    source = tmp_path / "events.csv"
+    write(source, [("2020-03-03", "a")])
+    store = EventStore(str(tmp_path / "store"))
+    store.sync(str(source))
+    os.utime(str(tmp_path / "store" / "state.json"), ns=(0, 0))
+    assert store.sync(str(source)) is None
+    assert (tmp_path / "store" / "state.json").stat().st_mtime_ns == 0
+
+
+def test_readers_follow_the_source_without_writing(tmp_path):
+    source, directory = tmp_path / "events.csv", tmp_path / "store"
+    write(source, [("2020-03-03", "a")])
+    EventStore(str(directory)).sync(str(source))
+    before = {path.name: path.read_bytes() for path in directory.iterdir()}
+    reader = EventStore(str(directory), read_only=True)
+    assert descriptions(reader) == {"2020-03-03": "a"}
+    write(source, [("2020-03-04", "b")], mode="a")
+    assert reader.sync(str(source)) == pd.Timestamp("2020-03-04")
+    write(source, [("2020-03-05", "c")])
+    assert reader.sync(str(source)) == pd.Timestamp("2020-03-03")
+    assert descriptions(reader) == {"2020-03-05": "c"}
+    assert {path.name: path.read_bytes() for path in directory.iterdir()} == before
+
+
+def test_readers_load_only_the_rows_the_state_covers(tmp_path):
+    source, directory = tmp_path / "events.csv", tmp_path / "store"
+    write(source, [("2020-03-03", "a")])
+    EventStore(str(directory)).sync(str(source))
+    # rows the writer appended but has not recorded in the state yet
+    with open(str(directory / "events.csv"), "a") as f:
+        f.write("2020-03-04,b\n2020-03-05,unfinish")
+    assert descriptions(EventStore(str(directory), read_only=True)) == {"2020-03-03": "a"}
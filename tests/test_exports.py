@@ -0,0 +1,14 @@
+from exports import TopTable, export_specs
+from series import SeriesRegistry
+
+
+def test_every_event_series_is_exported():
+    series = SeriesRegistry()
+    series.register("covid", "COVID-19", "MA Cases", None, events=True)
+    series.register("flights", "Flights", "MA Flights", None, events=True)
+    series.register("other", "Other", "value", None)
+    assert export_specs(series) == {
+        "all_events": None,
+        "covidhead": TopTable("covid", "MA Cases", 7), "covid14head": TopTable("covid", "MA Cases", 14),
+        "flightshead": TopTable("flights", "MA Flights", 7), "flights14head": TopTable("flights", "MA Flights", 14),
+    }
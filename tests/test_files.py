@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from files import atomic_write, tail_lines
+
+
+def test_atomic_write_replaces(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("old")
+    with atomic_write(str(path)) as f:
+        f.write("new")
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_atomic_write_leaves_nothing_on_error(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("old")
+    with pytest.raises(ValueError):
+        with atomic_write(str(path)) as f:
+            f.write("half")
+            raise ValueError
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_tail_lines(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_bytes(b"date,value\n2021-01-01,1\n2021-01-02,")
+    with open(path, "rb") as f:
+        header, body, end = tail_lines(f, 0)
+    assert (header, body, end) == (b"date,value\n", b"2021-01-01,1\n", 24)
+    with open(path, "ab") as f:
+        f.write(b"2\n")
+    with open(path, "rb") as f:
+        assert tail_lines(f, end, header) == (header, b"2021-01-02,2\n", 37)
+        assert tail_lines(f, 37, header) == (header, b"", 37)
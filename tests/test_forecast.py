@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast
+from data import ROOT
+
+
+@pytest.mark.parametrize("source,column", forecast.PREDICTED_SERIES.values())
+def test_ar_stays_within_the_fitted_changes(source, column):
+    values = pd.read_csv(ROOT + "/" + source)[column].values.astype(np.float64)
+    forecaster = forecast.forecaster_for("ar").fit(values)
+    for horizon in forecast.HORIZONS:
+        predicted = forecast.predict(forecaster, values, horizon)
+        assert np.isfinite(predicted).all()
+        assert predicted.max() < 2 * values.max()
+
+
+def test_batched_matches_per_window():
+    values = np.linspace(1.0, 100.0, 90) + np.sin(np.arange(90))
+    forecaster = forecast.forecaster_for("ar", window=14).fit(values, (7,))
+    windows = forecast.sliding_windows(values, 14, 7)
+    one_by_one = [forecaster.predict(np.array(window)[None, :], 7)[0] for window in windows]
+    assert np.allclose(forecast.predict(forecaster, values, 7, batch_size=16), one_by_one)
+
+
+def test_forecaster_needs_predict():
+    with pytest.raises(TypeError):
+        forecast.Forecaster()
+
+
+def test_refresh_writes_to_the_output_dir(tmp_path):
+    paths = forecast.refresh(forecast.forecaster_for("persistence"), str(tmp_path))
+    assert sorted(paths) == sorted(str(tmp_path / source) for source, _ in forecast.PREDICTED_SERIES.values())
+    frame = pd.read_csv(paths[0], index_col=0)
+    assert (frame["7 days Ahead Forecasted Values"].values[7:] == frame["MA Cases"].values[:-7]).all()
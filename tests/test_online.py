@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+import pytest
+
+from daily import DAILY_SERIES, DailyStreams, append_rows
+from online import Cusum, OnlineChangePoints
+
+
+def streams(root):
+    frames = {name: pd.read_csv(os.path.join(root, spec.source)) for name, spec in DAILY_SERIES.items()}
+    return DailyStreams(frames, root=root, drop_dir=os.path.join(root, "drop"))
+
+
+def replayed(stream):
+    detector = Cusum()
+    for day, value in zip(stream.frame[stream.spec.date].astype(str), stream.frame[stream.spec.mean].tolist()):
+        detector.update(day, value)
+    return detector
+
+
+def test_checkpoint_and_resume(daily_root, monkeypatch):
+    root, _ = daily_root
+    directory = os.path.join(root, "online")
+    # a fresh checkout: nothing checkpointed yet
+    online = OnlineChangePoints(streams(root), directory)
+    for name in ("rt_covid", "rt_subway"):
+        assert os.path.exists(os.path.join(directory, name + ".json"))
+
+    # a restart resumes every detector instead of replaying the history
+    def update(*args):
+        pytest.fail("replayed the history")
+
+    monkeypatch.setattr(Cusum, "update", update)
+    resumed = OnlineChangePoints(streams(root), directory)
+    monkeypatch.undo()
+    for name in ("rt_covid", "rt_subway"):
+        assert resumed[name].state() == online[name].state()
+
+    # and takes in the days added since, as if it had replayed them all
+    append_rows("rt_covid", [("2021-08-28", 1400), ("2021-08-29", 1500)], drop_dir=os.path.join(root, "drop"))
+    resumed.streams.poll(force=True)
+    resumed.sync()
+    assert resumed["rt_covid"].state() == replayed(resumed.streams["rt_covid"]).state()
+    assert OnlineChangePoints(streams(root), directory)["rt_covid"].rows == resumed["rt_covid"].rows
+
+
+def test_regenerated_history_is_replayed(daily_root):
+    root, frames = daily_root
+    directory = os.path.join(root, "online")
+    OnlineChangePoints(streams(root), directory)
+    source = os.path.join(root, "rt_covid.csv")
+    frames["rt_covid"].assign(**{"MA Cases": frames["rt_covid"]["MA Cases"] * 2}).to_csv(source, index=False)
+    regenerated = streams(root)
+    assert OnlineChangePoints(regenerated, directory)["rt_covid"].state() == replayed(regenerated["rt_covid"]).state()
@@ -0,0 +1,27 @@
+import flask
+import pytest
+
+import rankings
+
+
+@pytest.fixture
+def client(event_rankings):
+    server = flask.Flask(__name__)
+    rankings.register(server, lambda: event_rankings)
+    return server.test_client()
+
+
+def test_payload(client):
+    payload = client.get("/rankings/subway/14.json?k=3").get_json()
+    assert (payload["series"], payload["days"], payload["k"]) == ("subway", 14, 3)
+    assert [row["Abs 14 day Difference"] for row in payload["data"]] == [24.0, 22.0, 20.0]
+    assert client.get("/rankings/other/7.json").status_code == 404
+
+
+def test_etag_is_per_resource(client):
+    etag = client.get("/rankings/covid/7.json?k=10").headers["ETag"]
+    assert client.get("/rankings/covid/7.json?k=10", headers={"If-None-Match": etag}).status_code == 304
+    for other in ("/rankings/subway/7.json?k=10", "/rankings/covid/14.json?k=10", "/rankings/covid/7.json?k=5"):
+        response = client.get(other, headers={"If-None-Match": etag})
+        assert response.status_code == 200, other
+        assert response.headers["ETag"] != etag
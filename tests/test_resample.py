@@ -0,0 +1,25 @@
+import numpy as np
+
+from figures import WEBGL_POINTS
+from resample import RESAMPLE_POINTS, resample_figure
+
+
+def line_figure(length):
+    x = np.arange(length, dtype=np.float64)
+    return {"data": [{"type": "scatter", "x": x, "y": np.sin(x / 50)}], "layout": {}}
+
+
+def test_webgl_counts_the_points_before_resampling():
+    figure = resample_figure(line_figure(WEBGL_POINTS + 1))
+    trace, = figure["data"]
+    assert trace["type"] == "scattergl"
+    assert len(trace["y"]) <= RESAMPLE_POINTS
+
+
+def test_zoom_keeps_the_trace_type():
+    figure = line_figure(WEBGL_POINTS + 1)
+    assert resample_figure(figure, x_range=(100.0, 200.0))["data"][0]["type"] == "scattergl"
+
+
+def test_short_figures_stay_svg():
+    assert resample_figure(line_figure(RESAMPLE_POINTS))["data"][0]["type"] == "scatter"
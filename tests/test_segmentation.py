@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ruptures as rpt
+
+from data import ROOT
+from segmentation import BadSegmentationParameters, L2Binseg, L2Dynp, L2Pelt
+
+
+def synthetic(n, n_regimes=6, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = np.sort(rng.choice(np.arange(1, n), size=n_regimes - 1, replace=False))
+    means = rng.normal(scale=10.0, size=n_regimes)
+    return np.repeat(means, np.diff(np.r_[0, bounds, n])) + rng.normal(size=n)
+
+
+@pytest.fixture(scope="module")
+def signal():
+    return synthetic(120)
+
+
+@pytest.mark.parametrize("jump", [1, 5])
+@pytest.mark.parametrize("n_bkps", [1, 2, 5, 10])
+def test_dynp_matches_ruptures(signal, n_bkps, jump):
+    expected = rpt.Dynp(model="l2", jump=jump).fit(signal).predict(n_bkps)
+    assert L2Dynp(jump=jump).fit(signal).predict(n_bkps) == expected
+
+
+def test_dynp_predict_all_matches_predict(signal):
+    algo = L2Dynp(jump=1).fit(signal)
+    solutions = algo.predict_all(12)
+    assert sorted(solutions) == list(range(1, 13))
+    for n_bkps, bkps in solutions.items():
+        assert bkps == L2Dynp(jump=1).fit(signal).predict(n_bkps)
+
+
+def test_dynp_matches_ruptures_on_bundled_series():
+    values = pd.read_csv(ROOT + "/covid_preds.csv")["MA Cases"].values[:150]
+    algo = rpt.Dynp(model="l2", jump=1).fit(values)
+    ours = L2Dynp(jump=1).fit(values).predict_all(8)
+    assert all(ours[k] == algo.predict(k) for k in ours)
+
+
+def test_dynp_rejects_too_many_breakpoints(signal):
+    with pytest.raises(BadSegmentationParameters):
+        L2Dynp(jump=1).fit(signal[:10]).predict(6)
+
+
+@pytest.mark.parametrize("pen", [1, 10, 100])
+def test_pelt_matches_ruptures(signal, pen):
+    expected = rpt.Pelt(model="l2", min_size=2, jump=1).fit(signal).predict(pen=pen)
+    assert L2Pelt(min_size=2, jump=1).fit(signal).predict(pen) == expected
+
+
+@pytest.mark.parametrize("n_bkps", [1, 3, 5, 10])
+def test_binseg_matches_ruptures(signal, n_bkps):
+    expected = rpt.Binseg(model="l2", jump=1).fit(signal).predict(n_bkps=n_bkps)
+    assert L2Binseg(jump=1).fit(signal).predict(n_bkps=n_bkps) == expected
+
+
+def test_binseg_penalty_matches_ruptures(signal):
+    expected = rpt.Binseg(model="l2", jump=1).fit(signal).predict(pen=50)
+    assert L2Binseg(jump=1).fit(signal).predict(pen=50) == expected
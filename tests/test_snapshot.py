@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot
+from data import EVENT_SERIES, prepare_frames
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return prepare_frames()
+
+
+def test_round_trip(frames, tmp_path):
+    assert snapshot.load(snapshot_dir=str(tmp_path)) is None
+    path = snapshot.write(frames, snapshot_dir=str(tmp_path))
+    assert path == snapshot.snapshot_path(snapshot_dir=str(tmp_path))
+    loaded = snapshot.load(snapshot_dir=str(tmp_path))
+    assert set(loaded) == set(frames) - {"events"}
+    for name, frame in loaded.items():
+        if name in EVENT_SERIES:
+            # events are attached on load, from the event store
+            expected = frames[name].drop(columns=["Event Descriptions"])
+        else:
+            expected = frames[name]
+        pd.testing.assert_frame_equal(frame, expected)
+
+
+def test_other_format_version_is_ignored(frames, tmp_path, monkeypatch):
+    snapshot.write(frames, snapshot_dir=str(tmp_path))
+    monkeypatch.setattr(snapshot, "FORMAT_VERSION", snapshot.FORMAT_VERSION + 1)
+    assert snapshot.load(snapshot_dir=str(tmp_path)) is None
+
+
+def mapped_file(values):
+    """The memory-mapped file ``values`` is a view of, if any."""
+    base = values
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return base.filename if np.shares_memory(values, base) else None
+        base = base.base
+    return None
+
+
+def test_numeric_columns_stay_mapped(frames, tmp_path):
+    path = snapshot.write(frames, snapshot_dir=str(tmp_path))
+    for name, frame in snapshot.load(snapshot_dir=str(tmp_path)).items():
+        for column in frame.columns:
+            if frame[column].dtype.kind in "fiM":
+                assert (mapped_file(frame[column].values) or "").startswith(path), (name, column)
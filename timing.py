@@ -0,0 +1,193 @@
+"""Phase timings of the Dash callbacks, as Server-Timing headers and histograms.
+
+Callbacks registered after ``register(app)`` are timed, and the code they run
+marks where the time goes with ``phase``:
+
+* ``fit``: change point detection (the Dynp index, the other detectors)
+* ``query``: loading, filtering and ranking the series frames
+* ``figure``: building figures, patches and page layouts
+* ``serialize``: from the callback's return to the response, which is Dash
+  checking the outputs and encoding them to JSON
+* ``callback`` is the whole callback and ``total`` the whole request
+
+Every ``/_dash-update-component`` response lists them in a ``Server-Timing``
+header, which the browser shows in the network panel, with the size of the body
+in bytes as ``payload;desc=...``. A response from the response cache
+(callback_cache.py) only has ``cache``, the time it took.
+
+The same timings and payload sizes go into histograms by callback and phase,
+served at ``METRICS_ROUTE`` in the Prometheus text format. They are kept per
+process: under gunicorn each worker answers with its own, labelled with its pid.
+Timing a request costs a few perf_counter calls and a bisect per phase, so it
+stays on; ``CALLBACK_TIMING=0`` turns it off.
+"""
+import bisect
+import inspect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+import flask
+
+ENABLED = os.environ.get("CALLBACK_TIMING", "1") != "0"
+METRICS_ROUTE = "/metrics"
+# upper bounds of the histogram buckets
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def lines(self, metric, labels):
+        total = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            total += count
+            yield '{}_bucket{{{},le="{}"}} {}'.format(metric, labels, bound, total)
+        yield "{}_sum{{{}}} {}".format(metric, labels, self.sum)
+        yield "{}_count{{{}}} {}".format(metric, labels, total)
+
+
+class Metrics:
+    """Histograms of phase durations and payload sizes by callback."""
+
+    def __init__(self):
+        self.seconds = {}
+        self.bytes = {}
+        self.lock = threading.Lock()
+
+    def observe(self, callback, phases, size=None):
+        with self.lock:
+            for name, seconds in phases.items():
+                if (callback, name) not in self.seconds:
+                    self.seconds[callback, name] = Histogram(SECONDS)
+                self.seconds[callback, name].observe(seconds)
+            if size is not None:
+                if callback not in self.bytes:
+                    self.bytes[callback] = Histogram(BYTES)
+                self.bytes[callback].observe(size)
+
+    def text(self):
+        pid = os.getpid()
+        lines = ["# HELP dash_callback_seconds Time spent in each phase of a callback request",
+                 "# TYPE dash_callback_seconds histogram"]
+        with self.lock:
+            for (callback, name), histogram in sorted(self.seconds.items()):
+                labels = 'callback="{}",phase="{}",pid="{}"'.format(callback, name, pid)
+                lines.extend(histogram.lines("dash_callback_seconds", labels))
+            lines += ["# HELP dash_callback_response_bytes Size of the callback responses",
+                      "# TYPE dash_callback_response_bytes histogram"]
+            for callback, histogram in sorted(self.bytes.items()):
+                lines.extend(histogram.lines("dash_callback_response_bytes", 'callback="{}",pid="{}"'.format(callback, pid)))
+        return "\n".join(lines) + "\n"
+
+
+def _current():
+    return flask.g.get("callback_timing") if flask.has_request_context() else None
+
+
+class _Phase:
+    __slots__ = ("phases", "name", "start")
+
+    def __init__(self, phases, name):
+        self.phases, self.name = phases, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.phases[self.name] = self.phases.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+_OUTSIDE = nullcontext()
+
+
+def phase(name):
+    """Context manager counting the time spent in the block towards ``name`` of
+    the current callback request; does nothing outside of one."""
+    timing = _current()
+    return _OUTSIDE if timing is None else _Phase(timing["phases"], name)
+
+
+def timed(func):
+    @wraps(func)
+    def callback(*args, **kwargs):
+        timing = _current()
+        if timing is None:
+            return func(*args, **kwargs)
+        timing["callback"] = func.__name__
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timing["returned"] = time.perf_counter()
+            timing["phases"]["callback"] = timing["returned"] - start
+    return callback
+
+
+def register(app, metrics=None, enabled=ENABLED):
+    """Time the callbacks of ``app`` and serve the histograms; call before the
+    first ``app.callback`` and before callback_cache.register, and after
+    compression.register so the payload sizes are the uncompressed ones."""
+    metrics = Metrics() if metrics is None else metrics
+    if not enabled:
+        return metrics
+    path = app.config.routes_pathname_prefix + "_dash-update-component"
+    register_callback = app.callback
+    names = {}
+
+    def callback(*args, **kwargs):
+        decorator = register_callback(*args, **kwargs)
+        return lambda func: decorator(timed(func))
+
+    app.callback = callback
+
+    def callback_name(output):
+        # for the responses that never reach a callback (the response cache)
+        if not names:
+            names.update((key, inspect.unwrap(spec["callback"]).__name__)
+                         for key, spec in app.callback_map.items() if "callback" in spec)
+        return names.get(output, "unknown")
+
+    @app.server.before_request
+    def start_timing():
+        if flask.request.path == path and flask.request.method == "POST":
+            flask.g.callback_timing = {"start": time.perf_counter(), "phases": {}, "callback": None, "returned": None}
+
+    @app.server.after_request
+    def server_timing(response):
+        timing = flask.g.pop("callback_timing", None)
+        if timing is None:
+            return response
+        end = time.perf_counter()
+        phases = timing["phases"]
+        if timing["callback"] is None:
+            name = callback_name((flask.request.get_json(silent=True) or {}).get("output"))
+            phases = {"cache": end - timing["start"]}
+        else:
+            name = timing["callback"]
+            if response.status_code == 200:
+                phases["serialize"] = end - timing["returned"]
+            phases["total"] = end - timing["start"]
+        size = None if response.direct_passthrough else response.content_length
+        header = ", ".join("{};dur={:.2f}".format(phase, seconds * 1e3) for phase, seconds in phases.items())
+        if size is not None:
+            header += ", payload;desc={}".format(size)
+        response.headers.add("Server-Timing", header)
+        metrics.observe(name, phases, size)
+        return response
+
+    @app.server.route(METRICS_ROUTE)
+    def callback_metrics():
+        return flask.Response(metrics.text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return metrics